@@ -4,16 +4,17 @@ from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import Config
+from .utils.database import RoutingSession, configure_engines, init_pool_metrics
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 migrate = Migrate()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from .models.user import User
-    return User.query.get(int(user_id))
+    from .utils.identity_cache import get_identity_cache
+    return get_identity_cache().get(int(user_id))
 
 def create_app():
     app = Flask(__name__)
@@ -22,7 +23,9 @@ def create_app():
     app.config.from_object(Config)
 
     # Initialize extensions
+    configure_engines(app)
     db.init_app(app)
+    init_pool_metrics(app, db)
     bcrypt.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
@@ -33,20 +36,51 @@ def create_app():
     # Register blueprints
     from .api.users_api import users_bp
     from .api.matakuliah_api import matkul_bp
+    from .api.uploads_api import uploads_bp
+    from .api.events_api import events_bp
+    from .api.search_api import search_bp
     from .routes import main_bp
     from .blueprints.elearning import elearning_bp
     from .blueprints.pengajuan import pengajuan_bp
     from .blueprints.akademik import akademik_bp
     from .blueprints.admin import admin_bp
+    from .utils import grade_summary  # noqa: F401 - registers Grade flush listeners
+    from .utils import search  # noqa: F401 - registers User/Course search change listeners
+    from .utils.watch_buffer import init_watch_buffer
+    from .utils.identity_cache import init_identity_cache
+    from .utils.schedule_index import init_schedule_index
+    from .utils.background import init_background_worker
+    from .utils.storage import init_storage
+    from .utils.video_delivery import init_video_delivery
+    from .utils.file_catalog import init_file_catalog
+    from .utils.uploads import init_upload_store
+    from .utils.query_log import init_query_log
+    from .utils.event_bus import init_event_broker
+    from .utils.fulltext import init_fulltext_index
 
     app.register_blueprint(users_bp, url_prefix='/api')
     app.register_blueprint(matkul_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api')
+    app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
     app.register_blueprint(main_bp)
     app.register_blueprint(elearning_bp)
     app.register_blueprint(pengajuan_bp)
     app.register_blueprint(akademik_bp)
     app.register_blueprint(admin_bp)
 
+    init_watch_buffer(app)
+    init_identity_cache(app)
+    init_schedule_index(app)
+    init_background_worker(app)
+    init_storage(app)
+    init_video_delivery(app)
+    init_file_catalog(app)
+    init_upload_store(app)
+    init_event_broker(app)
+    init_fulltext_index(app)
+    init_query_log(app, db)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
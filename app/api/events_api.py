@@ -0,0 +1,89 @@
+import time
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import login_required, current_user
+from .. import db
+from ..models.matkul import ForumPost
+from ..utils.course_content import accessible_courses
+from ..utils.event_bus import format_sse, get_event_broker
+from ..utils.video_delivery import can_watch
+
+events_bp = Blueprint('events', __name__)
+
+
+def requested_channels():
+    """
+    Channel untuk koneksi ini: selalu `user:<id>` (status pengajuan/KRS, balasan ke post
+    sendiri), ditambah ?course=<id> (boleh berulang, atau `all`) dan ?post=<id>.
+
+    :return: set channel, atau None jika course/post tidak boleh diikuti
+    """
+    channels = {f'user:{current_user.id}'}
+    courses = request.args.getlist('course')
+    if courses:
+        allowed = {course.id for course in accessible_courses(current_user)}
+        if 'all' in courses:
+            channels.update(f'course:{course_id}' for course_id in allowed)
+        else:
+            try:
+                requested = {int(course_id) for course_id in courses}
+            except ValueError:
+                return None
+            if not requested <= allowed:
+                return None
+            channels.update(f'course:{course_id}' for course_id in requested)
+    post_id = request.args.get('post', type=int)
+    if post_id:
+        post = db.session.get(ForumPost, post_id)
+        if post is None or not can_watch(current_user, post.course_id):
+            return None
+        channels.add(f'post:{post_id}')
+    return channels
+
+
+@events_bp.route('/events', methods=['GET'])
+@login_required
+def stream_events():
+    """
+    Stream Server-Sent Events. Koneksi ditutup setelah EVENTS_STREAM_TIMEOUT detik dan
+    EventSource menyambung lagi otomatis dengan Last-Event-ID.
+    """
+    channels = requested_channels()
+    if channels is None:
+        return jsonify({'status': 'error', 'message': 'Channel tidak ditemukan'}), 404
+
+    broker = get_event_broker()
+    try:
+        subscription = broker.subscribe(channels, request.headers.get('Last-Event-ID'))
+    except OverflowError:
+        response = jsonify({'status': 'error', 'message': 'Terlalu banyak koneksi, coba lagi nanti'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    config = current_app.config
+    heartbeat = config.get('EVENTS_HEARTBEAT', 15)
+    timeout = config.get('EVENTS_STREAM_TIMEOUT', 300)
+    retry_ms = config.get('EVENTS_RETRY_MS', 3000)
+    # Stream bisa terbuka beberapa menit; kembalikan koneksi database ke pool sekarang
+    db.session.remove()
+
+    def generate():
+        try:
+            yield f'retry: {retry_ms}\n\n'
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                events, overflowed = subscription.get(heartbeat)
+                if overflowed:
+                    yield format_sse('resync', {})
+                for event in events:
+                    yield format_sse(event.type, event.data, event.id)
+                if not events and not overflowed:
+                    yield ': ping\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx: jangan buffer respons stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,32 +1,76 @@
 from flask import Blueprint, request, jsonify
 from ..models.matkul import Course
 from .. import db
+from ..utils.queries import courses_with_dosen
+from ..utils.search import search_page, search_keyset
+from ..utils.pagination import InvalidCursor, clamp_per_page, keyset_paginate
+from ..utils.database import replica_reads
 from flask_login import login_required, current_user
 
 matkul_bp = Blueprint('matkul', __name__)
 
+# Urutan yang didukung mode cursor (?after=); Course tidak punya kolom created_at
+COURSE_CURSOR_ORDERS = {
+    'id': (Course.id,)
+}
+
 @matkul_bp.route('/matakuliah', methods=['GET'])
 @login_required
+@replica_reads
 def get_courses():
-    """Get all courses with pagination and search"""
+    """Get all courses with pagination and search.
+
+    Mode cursor aktif jika parameter `after` dikirim (kosong untuk halaman pertama):
+    tanpa OFFSET dan tanpa COUNT kecuali `include_total=1`.
+    """
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = clamp_per_page(request.args.get('per_page', type=int))
         search = request.args.get('search', '')
         semester = request.args.get('semester', type=int)
+        cursor_mode = 'after' in request.args
 
-        query = Course.query
-
-        if search:
-            query = query.filter(
-                (Course.nama.contains(search)) |
-                (Course.kode.contains(search))
-            )
-
-        if semester:
-            query = query.filter(Course.semester == semester)
-
-        courses = query.paginate(page=page, per_page=per_page, error_out=False)
+        if cursor_mode:
+            order = request.args.get('order', 'id')
+            if order not in COURSE_CURSOR_ORDERS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f"Invalid order, use one of: {', '.join(COURSE_CURSOR_ORDERS)}"
+                }), 400
+            after = request.args.get('after')
+            include_total = request.args.get('include_total') == '1'
+            if search:
+                courses = search_keyset('course', search, after=after, per_page=per_page, include_total=include_total,
+                                        filters={'semester': semester} if semester else None,
+                                        base_query=courses_with_dosen())
+            else:
+                query = courses_with_dosen()
+                if semester:
+                    query = query.filter(Course.semester == semester)
+                courses = keyset_paginate(query, order, COURSE_CURSOR_ORDERS[order], after=after,
+                                          per_page=per_page, include_total=include_total)
+        elif search:
+            # Pencarian memakai inverted index, hasil diurutkan berdasarkan relevansi
+            courses = search_page('course', search, page=page, per_page=per_page,
+                                  filters={'semester': semester} if semester else None,
+                                  base_query=courses_with_dosen())
+        else:
+            query = courses_with_dosen()
+            if semester:
+                query = query.filter(Course.semester == semester)
+            courses = query.paginate(page=page, per_page=per_page, error_out=False)
+
+        if cursor_mode:
+            pagination = courses.to_dict()
+        else:
+            pagination = {
+                'page': courses.page,
+                'per_page': courses.per_page,
+                'total': courses.total,
+                'pages': courses.pages,
+                'has_next': courses.has_next,
+                'has_prev': courses.has_prev
+            }
 
         result = {
             'status': 'success',
@@ -44,19 +88,17 @@ def get_courses():
                         'nim': course.dosen.nim
                     } if course.dosen else None
                 } for course in courses.items],
-                'pagination': {
-                    'page': courses.page,
-                    'per_page': courses.per_page,
-                    'total': courses.total,
-                    'pages': courses.pages,
-                    'has_next': courses.has_next,
-                    'has_prev': courses.has_prev
-                }
+                'pagination': pagination
             }
         }
 
         return jsonify(result), 200
 
+    except InvalidCursor as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
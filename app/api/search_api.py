@@ -0,0 +1,49 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required, current_user
+from ..utils.fulltext import DOC_TYPES, search_for_user
+from ..utils.pagination import InvalidCursor
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search', methods=['GET'])
+@search_bp.route('/matakuliah/<int:course_id>/search', methods=['GET'])
+@login_required
+def search_content(course_id=None):
+    """
+    Full-text search isi forum, deskripsi materi/video dan abstrak skripsi, urut BM25.
+
+    Global lewat /api/search (semua mata kuliah yang bisa dilihat user, ditambah skripsi),
+    atau per mata kuliah lewat /api/matakuliah/<id>/search atau ?course_id=<id>.
+    Parameter: q, type (boleh dipisah koma: forum_post, material, video, thesis),
+    after (cursor dari next_cursor), per_page.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'status': 'error', 'message': 'Parameter q wajib diisi'}), 400
+
+    types = {name for value in request.args.getlist('type') for name in value.split(',') if name}
+    if types - set(DOC_TYPES):
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid type, use one of: {', '.join(DOC_TYPES)}"
+        }), 400
+    per_page = min(max(request.args.get('per_page', current_app.config.get('FULLTEXT_RESULTS_PER_PAGE', 10), type=int), 1), 50)
+    course_id = course_id or request.args.get('course_id', type=int)
+
+    try:
+        page = search_for_user(current_user, query, course_id=course_id, types=types or None,
+                               after=request.args.get('after'), per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if page is None:
+        return jsonify({'status': 'error', 'message': 'Mata kuliah tidak ditemukan'}), 404
+
+    return jsonify({
+        'status': 'success',
+        'message': 'Search results retrieved successfully',
+        'data': {
+            'results': page.items,
+            'pagination': page.to_dict()
+        }
+    }), 200
@@ -0,0 +1,74 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from ..utils.uploads import UploadError, get_upload_store
+
+uploads_bp = Blueprint('uploads', __name__)
+
+# Field metadata yang boleh dilihat klien. Key storage dan status dedup tidak ikut: keduanya
+# membocorkan apakah isi yang sama sudah pernah diupload user lain (attach memakai key di server)
+PUBLIC_FIELDS = ('id', 'category', 'filename', 'size', 'offset', 'status', 'sha256', 'scan')
+
+
+def upload_json(meta, chunk_size=None):
+    data = {field: meta[field] for field in PUBLIC_FIELDS if field in meta}
+    if chunk_size:
+        data['chunk_size'] = chunk_size
+    return data
+
+
+def upload_error(e):
+    return jsonify({'status': 'error', 'message': str(e), **e.details}), e.status_code
+
+
+@uploads_bp.route('/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """Mulai upload bertahap: {category, filename, size} -> upload_id dan ukuran chunk"""
+    data = request.get_json() or {}
+    store = get_upload_store()
+    try:
+        size = int(data.get('size') or 0)
+        meta = store.create(current_user.id, data.get('category'), data.get('filename'), size)
+    except (TypeError, ValueError) as e:
+        if isinstance(e, UploadError):
+            return upload_error(e)
+        return jsonify({'status': 'error', 'message': 'size harus berupa angka'}), 400
+    return jsonify({'status': 'success', 'data': upload_json(meta, store.chunk_size)}), 201
+
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def get_upload(upload_id):
+    """Status upload; dipakai klien untuk melanjutkan dari offset terakhir"""
+    store = get_upload_store()
+    try:
+        meta = store.load(upload_id, current_user.id)
+    except UploadError as e:
+        return upload_error(e)
+    return jsonify({'status': 'success', 'data': upload_json(meta, store.chunk_size)})
+
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+@login_required
+def append_chunk(upload_id):
+    """Kirim satu chunk (body mentah) dengan header Upload-Offset"""
+    offset = request.headers.get('Upload-Offset', request.args.get('offset'), type=int)
+    if offset is None:
+        return jsonify({'status': 'error', 'message': 'Header Upload-Offset wajib diisi'}), 400
+    try:
+        meta = get_upload_store().append(upload_id, current_user.id, offset, request.stream, request.content_length)
+    except UploadError as e:
+        return upload_error(e)
+    return jsonify({'status': 'success', 'data': upload_json(meta)})
+
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    store = get_upload_store()
+    try:
+        store.load(upload_id, current_user.id)
+    except UploadError as e:
+        return upload_error(e)
+    store.discard(upload_id)
+    return jsonify({'status': 'success', 'message': 'Upload dibatalkan'})
@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from ..models.user import User
 from .. import db, bcrypt
+from ..utils.search import search_page, search_keyset
+from ..utils.pagination import InvalidCursor, clamp_per_page, keyset_paginate
+from ..utils.database import replica_reads
 from flask_login import login_required, current_user
 import re
 
@@ -13,29 +16,67 @@ def validate_email(email):
 def validate_nim(nim):
     return len(nim) >= 5 and nim.isalnum()
 
+# Urutan yang didukung mode cursor (?after=); kolom terakhir harus unik
+USER_CURSOR_ORDERS = {
+    'id': (User.id,),
+    'created_at': (User.created_at, User.id)
+}
+
 @users_bp.route('/users', methods=['GET'])
 @login_required
+@replica_reads
 def get_users():
-    """Get all users with pagination and search"""
+    """Get all users with pagination and search.
+
+    Mode cursor aktif jika parameter `after` dikirim (kosong untuk halaman pertama):
+    tanpa OFFSET dan tanpa COUNT kecuali `include_total=1`.
+    """
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = clamp_per_page(request.args.get('per_page', type=int))
         search = request.args.get('search', '')
         role = request.args.get('role', '')
+        cursor_mode = 'after' in request.args
 
-        query = User.query
-
-        if search:
-            query = query.filter(
-                (User.nama.contains(search)) |
-                (User.nim.contains(search)) |
-                (User.email.contains(search))
-            )
-
-        if role:
-            query = query.filter(User.role == role)
-
-        users = query.paginate(page=page, per_page=per_page, error_out=False)
+        if cursor_mode:
+            order = request.args.get('order', 'id')
+            if order not in USER_CURSOR_ORDERS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f"Invalid order, use one of: {', '.join(USER_CURSOR_ORDERS)}"
+                }), 400
+            after = request.args.get('after')
+            include_total = request.args.get('include_total') == '1'
+            if search:
+                users = search_keyset('user', search, after=after, per_page=per_page, include_total=include_total,
+                                      filters={'role': role} if role else None)
+            else:
+                query = User.query
+                if role:
+                    query = query.filter(User.role == role)
+                users = keyset_paginate(query, order, USER_CURSOR_ORDERS[order], after=after,
+                                        per_page=per_page, include_total=include_total)
+        elif search:
+            # Pencarian memakai inverted index, hasil diurutkan berdasarkan relevansi
+            users = search_page('user', search, page=page, per_page=per_page,
+                                filters={'role': role} if role else None)
+        else:
+            query = User.query
+            if role:
+                query = query.filter(User.role == role)
+            users = query.paginate(page=page, per_page=per_page, error_out=False)
+
+        if cursor_mode:
+            pagination = users.to_dict()
+        else:
+            pagination = {
+                'page': users.page,
+                'per_page': users.per_page,
+                'total': users.total,
+                'pages': users.pages,
+                'has_next': users.has_next,
+                'has_prev': users.has_prev
+            }
 
         result = {
             'status': 'success',
@@ -50,19 +91,17 @@ def get_users():
                     'role': user.role,
                     'created_at': user.created_at.isoformat() if user.created_at else None
                 } for user in users.items],
-                'pagination': {
-                    'page': users.page,
-                    'per_page': users.per_page,
-                    'total': users.total,
-                    'pages': users.pages,
-                    'has_next': users.has_next,
-                    'has_prev': users.has_prev
-                }
+                'pagination': pagination
             }
         }
 
         return jsonify(result), 200
 
+    except InvalidCursor as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -187,6 +226,94 @@ def create_user():
             'message': f'Failed to create user: {str(e)}'
         }), 500
 
+@users_bp.route('/users/import', methods=['POST'])
+@login_required
+def import_users():
+    """Bulk import users from a CSV/JSON file upload or a JSON body.
+
+    Import dijalankan di worker background: respons 202 berisi job, status dan laporan
+    per baris dibaca lewat GET /users/import/<job_id>. `dry_run=1` hanya memvalidasi
+    (tanpa hashing) dan langsung mengembalikan laporan.
+    """
+    try:
+        if current_user.role != 'admin':
+            return jsonify({
+                'status': 'error',
+                'message': 'Unauthorized access'
+            }), 403
+
+        from ..utils.user_import import ImportFormatError, detect_format, import_users as run_import, parse_import, submit_import
+
+        file = request.files.get('file')
+        if file:
+            rows = parse_import(file.read(), detect_format(file.filename, file.mimetype))
+        else:
+            rows = parse_import(request.get_data(), 'json')
+
+        if not rows:
+            return jsonify({
+                'status': 'error',
+                'message': 'No users to import'
+            }), 400
+
+        if request.args.get('dry_run') == '1':
+            report = run_import(rows, dry_run=True)
+            return jsonify({
+                'status': 'success',
+                'message': f"{report['created']} of {report['total']} users valid",
+                'data': report
+            }), 200
+
+        job = submit_import(rows, requested_by=current_user.id)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Import queue is full, try again later'
+            }), 503
+
+        return jsonify({
+            'status': 'success',
+            'message': f"Import of {job['total']} users queued",
+            'data': dict(job, status_url=url_for('users.get_import_job', job_id=job['id']))
+        }), 202
+
+    except ImportFormatError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'status': 'error',
+            'message': f'Failed to import users: {str(e)}'
+        }), 500
+
+@users_bp.route('/users/import/<job_id>', methods=['GET'])
+@login_required
+def get_import_job(job_id):
+    """Status job import (queued, running, done, failed) beserta laporan jika sudah selesai"""
+    if current_user.role != 'admin':
+        return jsonify({
+            'status': 'error',
+            'message': 'Unauthorized access'
+        }), 403
+
+    from ..utils.user_import import load_import_job
+
+    job = load_import_job(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Import job not found'
+        }), 404
+
+    return jsonify({
+        'status': 'success',
+        'message': 'Import job retrieved successfully',
+        'data': job
+    }), 200
+
 @users_bp.route('/users/<int:user_id>', methods=['PUT'])
 @login_required
 def update_user(user_id):
@@ -1,8 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app.models.user import User
 from app.models.matkul import Course, Grade, Submission, SystemSetting
 from app import db, bcrypt
+from app.utils.queries import submissions_with_relations
+from app.utils.reports import user_role_counts, course_report
+from app.utils.identity_cache import get_identity_cache
+from app.utils.database import get_pool_metrics, replica_reads
+from app.utils.query_log import get_query_log
+from app.utils.schedule_conflicts import get_conflict_detector
+from app.utils.schedule_index import current_tahun_ajaran
+from app.utils.krs_registration import get_quotas, set_quota
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -11,9 +19,10 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 def dashboard():
     if current_user.role != 'admin':
         return redirect(url_for('main.index'))
-    total_users = User.query.count()
-    total_students = User.query.filter_by(role='mahasiswa').count()
-    total_lecturers = User.query.filter_by(role='dosen').count()
+    role_counts = user_role_counts()
+    total_users = role_counts['total']
+    total_students = role_counts.get('mahasiswa', 0)
+    total_lecturers = role_counts.get('dosen', 0)
     total_courses = Course.query.count()
     new_users = User.query.order_by(User.created_at.desc()).limit(3).all()
     new_courses = Course.query.order_by(Course.id.desc()).limit(2).all()
@@ -89,25 +98,19 @@ def add_course():
 
 @admin_bp.route('/reports')
 @login_required
+@replica_reads
 def reports():
     if current_user.role != 'admin':
         return redirect(url_for('main.index'))
-    total_users = User.query.count()
-    total_students = User.query.filter_by(role='mahasiswa').count()
-    total_lecturers = User.query.filter_by(role='dosen').count()
-    total_courses = Course.query.count()
-    total_submissions = Submission.query.count()
-    recent_submissions = Submission.query.order_by(Submission.submitted_at.desc()).limit(10).all()
-    courses_stats = []
+    role_counts = user_role_counts()
+    total_users = role_counts['total']
+    total_students = role_counts.get('mahasiswa', 0)
+    total_lecturers = role_counts.get('dosen', 0)
     courses = Course.query.all()
-    for course in courses:
-        student_count = Grade.query.filter_by(course_id=course.id).count()
-        submission_count = Submission.query.filter_by(course_id=course.id).count()
-        courses_stats.append({
-            'course': course,
-            'student_count': student_count,
-            'submission_count': submission_count
-        })
+    total_courses = len(courses)
+    courses_stats = course_report(courses)
+    total_submissions = sum(stat['submission_count'] for stat in courses_stats)
+    recent_submissions = submissions_with_relations().order_by(Submission.submitted_at.desc()).limit(10).all()
     return render_template('admin_reports.html',
                          total_users=total_users,
                          total_students=total_students,
@@ -139,3 +142,80 @@ def settings():
     settings_obj = SystemSetting.query.all()
     current_settings = {s.setting_key: s.setting_value for s in settings_obj}
     return render_template('admin_settings.html', settings=current_settings)
+
+@admin_bp.route('/metrics/identity-cache')
+@login_required
+def identity_cache_metrics():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    return jsonify({'status': 'success', 'data': get_identity_cache().metrics()})
+
+@admin_bp.route('/metrics/db-pool')
+@login_required
+def db_pool_metrics():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    return jsonify({'status': 'success', 'data': get_pool_metrics()})
+
+@admin_bp.route('/metrics/queries')
+@login_required
+def query_metrics():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    query_log = get_query_log()
+    if query_log is None:
+        return jsonify({'status': 'error', 'message': 'Query instrumentation is disabled (QUERY_LOG_ENABLED=0)'}), 404
+    data = query_log.snapshot()
+    if request.args.get('reset') == '1':
+        query_log.reset()
+    return jsonify({'status': 'success', 'data': data})
+
+@admin_bp.route('/schedule/conflicts')
+@login_required
+def schedule_conflicts():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    return jsonify({'status': 'success', 'data': get_conflict_detector(request.args.get('tahun_ajaran')).report()})
+
+@admin_bp.route('/schedule/check', methods=['POST'])
+@login_required
+def schedule_check():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    data = request.get_json() or {}
+    required = ['hari', 'waktu_mulai', 'waktu_selesai']
+    if not all(data.get(field) for field in required):
+        return jsonify({'status': 'error', 'message': 'hari, waktu_mulai, dan waktu_selesai wajib diisi'}), 400
+
+    dosen_id = data.get('dosen_id')
+    if dosen_id is None and data.get('course_id'):
+        course = Course.query.get_or_404(data['course_id'])
+        dosen_id = course.dosen_id
+    try:
+        conflicts = get_conflict_detector(data.get('tahun_ajaran')).check_entry(
+            data['hari'], data['waktu_mulai'], data['waktu_selesai'],
+            ruangan=data.get('ruangan'), dosen_id=dosen_id, exclude_id=data.get('schedule_id')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'data': {'conflict': bool(conflicts), 'conflicts': conflicts}})
+
+@admin_bp.route('/krs/quotas', methods=['GET', 'POST'])
+@login_required
+def krs_quotas():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 403
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        course = Course.query.get_or_404(data.get('course_id'))
+        kapasitas = data.get('kapasitas')
+        if kapasitas is not None and (not isinstance(kapasitas, int) or kapasitas < 0):
+            return jsonify({'status': 'error', 'message': 'kapasitas harus bilangan bulat >= 0 atau null'}), 400
+        set_quota(course.id, data.get('tahun_ajaran') or current_tahun_ajaran(), kapasitas)
+
+    tahun_ajaran = request.args.get('tahun_ajaran') or current_tahun_ajaran()
+    quotas = get_quotas(tahun_ajaran)
+    return jsonify({'status': 'success', 'data': [
+        {'course_id': quota.course_id, 'tahun_ajaran': quota.tahun_ajaran, 'kapasitas': quota.kapasitas, 'terisi': quota.terisi}
+        for quota in sorted(quotas.values(), key=lambda quota: quota.course_id)
+    ]})
@@ -1,40 +1,150 @@
-from flask import Blueprint, render_template, redirect, url_for, jsonify, request, flash, current_app
+from flask import Blueprint, render_template, redirect, url_for, jsonify, request, flash, abort, current_app
 from flask_login import login_required, current_user
 from app.models.matkul import Course, Material, Video, VideoWatch, KRS, Grade, Submission, ForumPost, ForumReply
 from app import db
-import os
+from app.utils.progress import student_progress, cohort_progress
+from app.utils.queries import krs_with_course, materials_with_course, forum_posts_with_relations
+from app.utils.file_catalog import get_file_catalog
+from app.utils.video_delivery import authorize_stream, can_watch, video_response
+from app.utils.course_content import (accessible_courses, material_json, video_json, week_materials, week_summary,
+                                      week_videos)
+from app.utils.pagination import InvalidCursor, clamp_per_page, encode_cursor
+from app.utils.forum import reply_page, thread_page
+from app.utils.fulltext import DOC_TYPES, search_for_user
 
 
 elearning_bp = Blueprint('elearning', __name__, url_prefix='/elearning')
 
+def _course_scope():
+    """
+    Mata kuliah yang bisa dilihat user ({id: Course}) dan id yang dipilih lewat
+    ?course_id= (semua jika kosong). None jika course_id bukan milik user.
+    Dipakai halaman materi dan forum.
+    """
+    courses = {course.id: course for course in accessible_courses(current_user)}
+    course_id = request.args.get('course_id', type=int)
+    if course_id:
+        if course_id not in courses:
+            return courses, None
+        return courses, [course_id]
+    return courses, list(courses)
+
+
+def _week_page(weeks):
+    """Potong ringkasan minggu per halaman (MATERI_WEEKS_PER_PAGE minggu)."""
+    per_page = current_app.config.get('MATERI_WEEKS_PER_PAGE', 4)
+    pages = max(1, -(-len(weeks) // per_page))
+    page = min(max(request.args.get('page', 1, type=int), 1), pages)
+    pagination = {'page': page, 'per_page': per_page, 'total': len(weeks), 'pages': pages,
+                  'has_next': page < pages, 'has_prev': page > 1}
+    return weeks[(page - 1) * per_page:page * per_page], pagination
+
+
+def _week_contents(courses, course_ids, week, tipe=None, after=None, per_page=None):
+    """Isi satu minggu dalam bentuk JSON (dipakai render awal dan API lazy-load)."""
+    per_page = per_page or current_app.config.get('MATERI_ITEMS_PER_PAGE', 20)
+    data = {'minggu': week}
+    if tipe in (None, 'materi'):
+        page = week_materials(course_ids, week, after=after if tipe else None, per_page=per_page)
+        data['materials'] = [material_json(material, courses) for material in page.items]
+        data['materials_pagination'] = page.to_dict()
+    if tipe in (None, 'video'):
+        page = week_videos(course_ids, week, after=after if tipe else None, per_page=per_page)
+        data['videos'] = [video_json(video, courses) for video in page.items]
+        data['videos_pagination'] = page.to_dict()
+    return data
+
+
 @elearning_bp.route('/materi')
 @login_required
 def materi():
     if current_user.role not in ['mahasiswa', 'dosen']:
         return redirect(url_for('main.index'))
 
-    courses = Course.query.all()
-    materials = Material.query.order_by(Material.minggu, Material.created_at).all()
-    videos = Video.query.order_by(Video.minggu, Video.created_at).all()
-
-    materials_by_week = {}
-    for material in materials:
-        week = material.minggu or 1
-        if week not in materials_by_week:
-            materials_by_week[week] = []
-        materials_by_week[week].append(material)
-
-    videos_by_week = {}
-    for video in videos:
-        week = video.minggu or 1
-        if week not in videos_by_week:
-            videos_by_week[week] = []
-        videos_by_week[week].append(video)
+    # Hanya mata kuliah di KRS (mahasiswa) / yang diampu (dosen); isi minggu lain dimuat lewat API
+    courses, course_ids = _course_scope()
+    if course_ids is None:
+        abort(404)
+    weeks, pagination = _week_page(week_summary(course_ids))
+
+    # Minggu pertama di halaman langsung dirender, sisanya dimuat saat kartu terlihat
+    first_week = _week_contents(courses, course_ids, weeks[0]['minggu']) if weeks else None
 
     return render_template('elearning_materi.html',
+                         courses=list(courses.values()),
+                         course_id=request.args.get('course_id', type=int),
+                         weeks=weeks,
+                         pagination=pagination,
+                         first_week=first_week)
+
+@elearning_bp.route('/api/materi')
+@login_required
+def materi_weeks():
+    """Ringkasan minggu (jumlah materi dan video) per halaman."""
+    courses, course_ids = _course_scope()
+    if course_ids is None:
+        return jsonify({'status': 'error', 'message': 'Mata kuliah tidak ditemukan'}), 404
+    weeks, pagination = _week_page(week_summary(course_ids))
+    return jsonify({
+        'status': 'success',
+        'message': 'Weeks retrieved successfully',
+        'data': {'weeks': weeks, 'pagination': pagination}
+    }), 200
+
+@elearning_bp.route('/api/materi/minggu/<int:week>')
+@login_required
+def materi_week(week):
+    """
+    Isi satu minggu. Materi dan video dipaginasi terpisah dengan cursor:
+    ?tipe=materi&after=<cursor> atau ?tipe=video&after=<cursor>; tanpa tipe keduanya
+    dikembalikan mulai dari awal.
+    """
+    courses, course_ids = _course_scope()
+    if course_ids is None:
+        return jsonify({'status': 'error', 'message': 'Mata kuliah tidak ditemukan'}), 404
+    tipe = request.args.get('tipe')
+    if tipe not in (None, 'materi', 'video'):
+        return jsonify({'status': 'error', 'message': 'Invalid tipe, use materi or video'}), 400
+    per_page = clamp_per_page(request.args.get('per_page', type=int), default=current_app.config.get('MATERI_ITEMS_PER_PAGE', 20))
+    after = request.args.get('after')
+
+    try:
+        data = _week_contents(courses, course_ids, week, tipe=tipe, after=after, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return jsonify({'status': 'success', 'message': 'Week contents retrieved successfully', 'data': data}), 200
+
+@elearning_bp.route('/cari')
+@login_required
+def cari():
+    """Pencarian full-text forum, materi, video dan skripsi; per mata kuliah lewat ?course_id=."""
+    if current_user.role not in ['mahasiswa', 'dosen']:
+        return redirect(url_for('main.index'))
+
+    query = request.args.get('q', '').strip()
+    course_id = request.args.get('course_id', type=int)
+    tipe = request.args.get('type')
+    if tipe not in DOC_TYPES:
+        tipe = None
+    courses = accessible_courses(current_user)
+    page = None
+    if query:
+        try:
+            page = search_for_user(current_user, query, course_id=course_id, types={tipe} if tipe else None,
+                                   after=request.args.get('after'),
+                                   per_page=current_app.config.get('FULLTEXT_RESULTS_PER_PAGE', 10))
+        except InvalidCursor:
+            abort(400)
+        if page is None:
+            abort(404)
+
+    return render_template('elearning_cari.html',
                          courses=courses,
-                         materials_by_week=materials_by_week,
-                         videos_by_week=videos_by_week)
+                         course_id=course_id,
+                         tipe=tipe,
+                         query=query,
+                         page=page)
 
 @elearning_bp.route('/video', defaults={'video_id': None})
 @elearning_bp.route('/video/<int:video_id>')
@@ -43,54 +153,22 @@ def video(video_id):
     if current_user.role not in ['mahasiswa', 'dosen']:
         return redirect(url_for('main.index'))
 
-    # Database videos
-    videos_db = Video.query.order_by(Video.minggu, Video.created_at).all()
-
-    # Filesystem fallback videos (from app/static/videos)
-    video_dir = os.path.join(current_app.root_path, 'static', 'videos')
-    fs_videos = []
-    if os.path.isdir(video_dir):
-        for f in sorted(os.listdir(video_dir)):
-            if f.lower().endswith(('.mp4', '.webm', '.ogg', '.m4v')):
-                fs_videos.append(f)
-
-    playlist = []
-    current_video_url = None
-    current_title = None
-
-    if videos_db:
-        # Build playlist from DB
-        for v in videos_db:
-            # Ensure path attribute name is correct (model uses video_path)
-            path = v.video_path or ''
-            # If stored path is like 'videos/xxx.mp4', use it; else prepend 'videos/' if needed
-            if not path.startswith('videos/') and not path.startswith('http'):
-                path = f"videos/{path}"
-            url = url_for('static', filename=path)
-            playlist.append({'title': v.judul or os.path.basename(path), 'url': url, 'id': v.id})
-        # Determine current video
+    # Playlist video database (URL stream sudah jadi); file di static/videos tanpa baris Video
+    # tidak punya mata kuliah untuk dicek KRS-nya, jadi tidak ditampilkan
+    catalog = get_file_catalog()
+    playlist = catalog.playlist()
+    current = None
+
+    if playlist:
         if video_id:
-            main_video = Video.query.get_or_404(video_id)
-            path = main_video.video_path or ''
-            if not path.startswith('videos/') and not path.startswith('http'):
-                path = f"videos/{path}"
-            current_video_url = url_for('static', filename=path)
-            current_title = main_video.judul or os.path.basename(path)
-        else:
-            current_video_url = playlist[0]['url']
-            current_title = playlist[0]['title']
-    elif fs_videos:
-        # Build playlist from filesystem
-        for f in fs_videos:
-            url = url_for('static', filename=f'videos/{f}')
-            playlist.append({'title': os.path.splitext(f)[0], 'url': url, 'id': None})
-        current_video_url = playlist[0]['url']
-        current_title = playlist[0]['title']
-    else:
-        # No videos available
-        playlist = []
-        current_video_url = None
-        current_title = None
+            current = next((entry for entry in playlist if entry.id == video_id), None)
+            if current is None:
+                # Video baru dari worker lain yang belum masuk cache playlist
+                Video.query.get_or_404(video_id)
+                catalog.invalidate_playlist()
+                playlist = catalog.playlist()
+                current = next((entry for entry in playlist if entry.id == video_id), None)
+        current = current or playlist[0]
 
     # Get video watch progress for current user (DB videos only)
     video_watches = VideoWatch.query.filter_by(student_id=current_user.id).all()
@@ -98,10 +176,21 @@ def video(video_id):
 
     return render_template('elearning_video.html',
                          playlist=playlist,
-                         current_video_url=current_video_url,
-                         current_title=current_title,
+                         current_video_url=current.url if current else None,
+                         current_title=current.title if current else None,
                          watch_progress=watch_progress)
 
+@elearning_bp.route('/video/<int:video_id>/stream')
+@login_required
+def stream_video(video_id):
+    try:
+        resolved = authorize_stream(current_user, video_id)
+    except LookupError:
+        abort(404)
+    except PermissionError:
+        abort(403)
+    return video_response(*resolved)
+
 @elearning_bp.route('/download')
 @login_required
 def download():
@@ -110,19 +199,10 @@ def download():
 
     # Materials from DB
     courses = Course.query.all()
-    materials = Material.query.all()
-
-    # Filesystem modules from app/static/modul
-    modul_dir = os.path.join(current_app.root_path, 'static', 'modul')
-    modul_files = []
-    if os.path.isdir(modul_dir):
-        for f in sorted(os.listdir(modul_dir)):
-            # Allow common doc types and pdf
-            if f.lower().endswith(('.pdf', '.doc', '.docx', '.ppt', '.pptx', '.zip')):
-                modul_files.append({
-                    'name': f,
-                    'url': url_for('static', filename=f'modul/{f}')
-                })
+    materials = materials_with_course().all()
+
+    # File modul dari app/static/modul (listing di-cache)
+    modul_files = get_file_catalog().modules.entries()
 
     return render_template('elearning_download.html', courses=courses, materials=materials, modul_files=modul_files)
 
@@ -133,7 +213,7 @@ def progress():
         return redirect(url_for('main.index'))
 
     # Get courses the student is enrolled in
-    krs_entries = KRS.query.filter_by(student_id=current_user.id).all()
+    krs_entries = krs_with_course().filter_by(student_id=current_user.id).all()
     if krs_entries:
         courses = [krs.course for krs in krs_entries if krs.course]
     else:
@@ -154,23 +234,20 @@ def progress():
         }]
     }
 
+    stats_by_course = student_progress(current_user.id, [course.id for course in courses])
     for course in courses:
-        video_total = Video.query.filter_by(course_id=course.id).count()
-        watched_video_ids = [watch.video_id for watch in VideoWatch.query.filter_by(student_id=current_user.id).all()]
-        video_completed = Video.query.filter(Video.id.in_(watched_video_ids), Video.course_id == course.id).count() if watched_video_ids else 0
-        
-        total_items = video_total
-        completed_items = video_completed
-        
-        progress_percentage = int((completed_items / total_items * 100) if total_items > 0 else 0)
-
+        stats = stats_by_course[course.id]
         progress_data.append({
             'nama': course.nama,
-            'progress': progress_percentage,
+            'progress': stats['progress'],
+            'video_total': stats['video_total'],
+            'video_completed': stats['video_completed'],
+            'material_total': stats['material_total'],
+            'submission_total': stats['submission_total']
         })
         
         chart_data['labels'].append(course.nama)
-        chart_data['datasets'][0]['data'].append(progress_percentage)
+        chart_data['datasets'][0]['data'].append(stats['progress'])
 
     # Fallback dummy data to avoid empty chart
     if not chart_data['labels']:
@@ -179,20 +256,52 @@ def progress():
 
     return render_template('elearning_progress.html', progress_data=progress_data, chart_data=chart_data)
 
+@elearning_bp.route('/progress/cohort')
+@login_required
+def cohort_progress_matrix():
+    if current_user.role != 'dosen':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).filter_by(dosen_id=current_user.id)]
+    course_id = request.args.get('course_id', type=int)
+    if course_id:
+        if course_id not in course_ids:
+            return jsonify({'status': 'error', 'message': 'Mata kuliah tidak ditemukan'}), 404
+        course_ids = [course_id]
+
+    data = cohort_progress(course_ids)
+    return jsonify({
+        'status': 'success',
+        'message': 'Cohort progress retrieved successfully',
+        'data': {
+            'courses': [{'id': cid, **info} for cid, info in data['courses'].items()],
+            'students': [{'id': sid, **info} for sid, info in data['students'].items()],
+            'matrix': {str(cid): {str(sid): pct for sid, pct in row.items()} for cid, row in data['matrix'].items()}
+        }
+    }), 200
+
 @elearning_bp.route('/forum', methods=['GET', 'POST'])
 @login_required
 def forum():
     if current_user.role not in ['mahasiswa', 'dosen']:
         return redirect(url_for('main.index'))
 
+    # Forum per mata kuliah: hanya mata kuliah di KRS (mahasiswa) / yang diampu (dosen)
+    courses, course_ids = _course_scope()
+    if course_ids is None:
+        abort(404)
+
     if request.method == 'POST':
         title = request.form.get('title')
         content = request.form.get('content')
-        course_id = request.form.get('course_id')
+        course_id = request.form.get('course_id', type=int)
 
         if not all([title, content, course_id]):
             flash('Semua field harus diisi.', 'error')
             return redirect(url_for('elearning.forum'))
+        if course_id not in courses:
+            flash('Mata kuliah tidak ditemukan.', 'error')
+            return redirect(url_for('elearning.forum'))
 
         post = ForumPost(
             student_id=current_user.id,
@@ -203,11 +312,18 @@ def forum():
         db.session.add(post)
         db.session.commit()
         flash('Postingan berhasil dibuat!', 'success')
-        return redirect(url_for('elearning.forum'))
-
-    posts = ForumPost.query.order_by(ForumPost.created_at.desc()).all()
-    courses = Course.query.all()
-    return render_template('elearning_forum.html', forum_posts=posts, courses=courses)
+        return redirect(url_for('elearning.forum', course_id=request.args.get('course_id', type=int)))
+
+    try:
+        threads = thread_page(course_ids, after=request.args.get('after'),
+                              per_page=current_app.config.get('FORUM_THREADS_PER_PAGE', 20)) if course_ids else None
+    except InvalidCursor:
+        abort(400)
+    return render_template('elearning_forum.html',
+                         forum_posts=threads.items if threads else [],
+                         next_cursor=threads.next_cursor if threads else None,
+                         courses=list(courses.values()),
+                         course_id=request.args.get('course_id', type=int))
 
 @elearning_bp.route('/forum/post/<int:post_id>', methods=['GET', 'POST'])
 @login_required
@@ -215,7 +331,9 @@ def forum_post(post_id):
     if current_user.role != 'mahasiswa':
         return redirect(url_for('main.index'))
 
-    post = ForumPost.query.get_or_404(post_id)
+    post = forum_posts_with_relations().get_or_404(post_id)
+    if not can_watch(current_user, post.course_id):
+        abort(404)
 
     if request.method == 'POST':
         content = request.form.get('content')
@@ -231,7 +349,14 @@ def forum_post(post_id):
         db.session.add(reply)
         db.session.commit()
         flash('Balasan berhasil dikirim!', 'success')
-        return redirect(url_for('elearning.forum_post', post_id=post_id))
-
-    replies = ForumReply.query.filter_by(post_id=post.id).order_by(ForumReply.created_at.asc()).all()
-    return render_template('elearning_forum_post.html', post=post, replies=replies)
+        # Halaman yang dimulai dari balasan baru (cursor "setelah id sebelumnya")
+        return redirect(url_for('elearning.forum_post', post_id=post_id,
+                                after=encode_cursor('id', [reply.id - 1])) + f'#reply-{reply.id}')
+
+    try:
+        replies = reply_page(post.id, after=request.args.get('after'),
+                             per_page=current_app.config.get('FORUM_REPLIES_PER_PAGE', 20))
+    except InvalidCursor:
+        abort(400)
+    return render_template('elearning_forum_post.html', post=post, replies=replies.items,
+                           next_cursor=replies.next_cursor, paged=bool(request.args.get('after')))
@@ -2,11 +2,28 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models.matkul import Course, Submission, LetterSubmission, InternshipApplication, ThesisApplication
 from app import db
+from app.utils.queries import submissions_with_relations
+from app.utils.uploads import UploadError, get_upload_store
 from datetime import datetime
-import os
 
 pengajuan_bp = Blueprint('pengajuan', __name__, url_prefix='/pengajuan')
 
+def save_upload(category):
+    """
+    Ambil file formulir: `upload_id` dari upload bertahap (chunked-upload.js) atau
+    field `file` biasa sebagai fallback. Mengembalikan path relatif terhadap static,
+    None jika tidak ada file. Melempar UploadError jika file ditolak.
+    """
+    store = get_upload_store()
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        return store.attach(upload_id, current_user.id, category)
+    file = request.files.get('file')
+    if file and file.filename:
+        return store.attach(store.store_file(file, current_user.id, category)['id'], current_user.id, category)
+    return None
+
+
 @pengajuan_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
 def upload_tugas():
@@ -17,9 +34,9 @@ def upload_tugas():
         course_id = request.form.get('course')
         title = request.form.get('title')
         description = request.form.get('description')
-        file = request.files.get('file')
+        has_file = request.form.get('upload_id') or request.files.get('file')
 
-        if not all([course_id, title, file]):
+        if not all([course_id, title, has_file]):
             flash('Mata kuliah, judul, dan file tugas harus diisi.', 'error')
             return redirect(url_for('pengajuan.upload_tugas'))
 
@@ -28,13 +45,11 @@ def upload_tugas():
             flash('Mata kuliah tidak ditemukan.', 'error')
             return redirect(url_for('pengajuan.upload_tugas'))
 
-        # Ensure the upload directory exists
-        upload_folder = 'app/static/uploads/tugas'
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        filename = f"{current_user.nim}_{course.kode}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        try:
+            file_path = save_upload('tugas')
+        except UploadError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('pengajuan.upload_tugas'))
 
         submission = Submission(
             student_id=current_user.id,
@@ -89,7 +104,7 @@ def status_pengajuan():
     if current_user.role != 'mahasiswa':
         return redirect(url_for('main.index'))
 
-    submissions = Submission.query.filter_by(student_id=current_user.id).order_by(Submission.submitted_at.desc()).all()
+    submissions = submissions_with_relations().filter_by(student_id=current_user.id).order_by(Submission.submitted_at.desc()).all()
     letter_submissions = LetterSubmission.query.filter_by(student_id=current_user.id).order_by(LetterSubmission.submitted_at.desc()).all()
     internships = InternshipApplication.query.filter_by(student_id=current_user.id).order_by(InternshipApplication.submitted_at.desc()).all()
     theses = ThesisApplication.query.filter_by(student_id=current_user.id).order_by(ThesisApplication.submitted_at.desc()).all()
@@ -111,15 +126,12 @@ def magang():
         start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
         end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d')
         reason = request.form.get('reason')
-        file = request.files.get('file')
 
-        file_path = None
-        if file:
-            upload_folder = 'app/static/uploads/magang'
-            os.makedirs(upload_folder, exist_ok=True)
-            filename = f"magang_{current_user.nim}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-            file_path = os.path.join(upload_folder, filename)
-            file.save(file_path)
+        try:
+            file_path = save_upload('magang')
+        except UploadError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('pengajuan.magang'))
 
         new_app = InternshipApplication(
             student_id=current_user.id,
@@ -149,15 +161,12 @@ def skripsi():
         peminatan = request.form.get('peminatan')
         abstrak = request.form.get('abstrak')
         dosen_pref = request.form.get('dosen_pref')
-        file = request.files.get('file')
-
-        file_path = None
-        if file:
-            upload_folder = 'app/static/uploads/skripsi'
-            os.makedirs(upload_folder, exist_ok=True)
-            filename = f"skripsi_{current_user.nim}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-            file_path = os.path.join(upload_folder, filename)
-            file.save(file_path)
+
+        try:
+            file_path = save_upload('skripsi')
+        except UploadError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('pengajuan.skripsi'))
 
         new_app = ThesisApplication(
             student_id=current_user.id,
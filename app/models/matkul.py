@@ -32,7 +32,26 @@ class Grade(db.Model):
     def __repr__(self):
         return f"Grade('{self.student_id}', '{self.course_id}', '{self.nilai}')"
 
+class GradeSummary(db.Model):
+    """Per-student, per-semester IP/IPK aggregate maintained from Grade writes."""
+    __table_args__ = (db.UniqueConstraint('student_id', 'semester', name='uq_grade_summary_student_semester'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    semester = db.Column(db.Integer, nullable=False)
+    total_bobot = db.Column(db.Float, nullable=False, default=0)
+    total_nilai_bobot = db.Column(db.Float, nullable=False, default=0)
+    course_count = db.Column(db.Integer, nullable=False, default=0)
+    ip = db.Column(db.Float, nullable=False, default=0)
+    ipk = db.Column(db.Float, nullable=False, default=0)  # kumulatif s.d. semester ini
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"GradeSummary('{self.student_id}', '{self.semester}', '{self.ip}', '{self.ipk}')"
+
 class Material(db.Model):
+    __table_args__ = (db.Index('ix_material_course_minggu', 'course_id', 'minggu'),)
+
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     judul = db.Column(db.String(200), nullable=False)
@@ -50,6 +69,8 @@ class Material(db.Model):
         return f"Material('{self.judul}', '{self.course_id}')"
 
 class Video(db.Model):
+    __table_args__ = (db.Index('ix_video_course_minggu', 'course_id', 'minggu'),)
+
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     judul = db.Column(db.String(200), nullable=False)
@@ -83,6 +104,8 @@ class Submission(db.Model):
         return f"Submission('{self.judul}', '{self.student_id}', '{self.status}')"
 
 class KRS(db.Model):
+    __table_args__ = (db.Index('ix_krs_tahun_ajaran_student', 'tahun_ajaran', 'student_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
@@ -101,7 +124,40 @@ class KRS(db.Model):
     def __repr__(self):
         return f"KRS('{self.student_id}', '{self.course_id}', '{self.semester}', '{self.status}')"
 
+class CourseQuota(db.Model):
+    """Kuota kursi per mata kuliah per tahun ajaran; `terisi` dijaga oleh app/utils/krs_registration.py."""
+    __table_args__ = (db.UniqueConstraint('course_id', 'tahun_ajaran', name='uq_course_quota_course_tahun_ajaran'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    tahun_ajaran = db.Column(db.String(20), nullable=False)
+    kapasitas = db.Column(db.Integer, nullable=False)
+    terisi = db.Column(db.Integer, nullable=False, default=0)  # KRS yang tidak ditolak
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    course = db.relationship('Course', backref='quotas', lazy=True)
+
+    def __repr__(self):
+        return f"CourseQuota('{self.course_id}', '{self.tahun_ajaran}', '{self.terisi}/{self.kapasitas}')"
+
+class KRSSubmission(db.Model):
+    """Token idempotensi pengajuan KRS; disimpan dalam transaksi yang sama dengan perubahan KRS."""
+    __tablename__ = 'krs_submission'
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(64), nullable=False, unique=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tahun_ajaran = db.Column(db.String(20), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 daftar course_id yang diajukan
+    response = db.Column(db.Text, nullable=False)  # JSON hasil pengajuan
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"KRSSubmission('{self.token}', '{self.student_id}')"
+
 class Schedule(db.Model):
+    __table_args__ = (db.Index('ix_schedule_tahun_ajaran_hari', 'tahun_ajaran', 'hari'),)
+
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     hari = db.Column(db.String(10), nullable=False)  # e.g., 'Senin', 'Selasa', etc.
@@ -119,6 +175,8 @@ class Schedule(db.Model):
         return f"Schedule('{self.course.nama}', '{self.hari}', '{self.waktu_mulai}-{self.waktu_selesai}')"
 
 class VideoWatch(db.Model):
+    __table_args__ = (db.UniqueConstraint('student_id', 'video_id', name='uq_video_watch_student_video'),)
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     video_id = db.Column(db.Integer, db.ForeignKey('video.id'), nullable=False)
@@ -135,13 +193,22 @@ class VideoWatch(db.Model):
         return f"VideoWatch('{self.student.nama}', '{self.video.judul}', '{self.watch_time}s')"
 
 class ForumPost(db.Model):
+    # Daftar thread diurutkan aktivitas terakhir, per mata kuliah atau gabungan
+    __table_args__ = (
+        db.Index('ix_forum_post_course_activity', 'course_id', 'last_activity_at', 'id'),
+        db.Index('ix_forum_post_activity', 'last_activity_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     tags = db.Column(db.String(500))
+    # Tiga kolom di bawah diperbarui oleh listener app/utils/forum.py saat balasan ditulis
     replies_count = db.Column(db.Integer, default=0)
+    last_reply_at = db.Column(db.DateTime)
+    last_activity_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -152,6 +219,8 @@ class ForumPost(db.Model):
         return f"ForumPost('{self.title}', '{self.student.nama}')"
 
 class ForumReply(db.Model):
+    __table_args__ = (db.Index('ix_forum_reply_post_id', 'post_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('forum_post.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -212,6 +281,41 @@ class ThesisApplication(db.Model):
 
     student = db.relationship('User', backref='thesis_applications', lazy=True)
 
+class StoredBlob(db.Model):
+    """File di storage content-addressed; `ref_count` dijaga oleh app/utils/storage.py dari kolom file_path model."""
+    __tablename__ = 'storage_blob'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), unique=True, nullable=False)  # path relatif terhadap static
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"StoredBlob('{self.key}', '{self.ref_count}')"
+
+class CourseReportSnapshot(db.Model):
+    """Snapshot jumlah mahasiswa dan tugas per mata kuliah untuk halaman laporan admin."""
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id', ondelete='CASCADE'), primary_key=True)
+    student_count = db.Column(db.Integer, nullable=False, default=0)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"CourseReportSnapshot('{self.course_id}', '{self.student_count}', '{self.submission_count}')"
+
+class SearchChange(db.Model):
+    """Log perubahan (index pencarian, full-text, jadwal) agar cache di setiap proses bisa disinkronkan."""
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"SearchChange('{self.entity}', '{self.entity_id}')"
+
 class SystemSetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     setting_key = db.Column(db.String(50), unique=True, nullable=False)
@@ -11,7 +11,7 @@ class User(db.Model, UserMixin):
     program_studi = db.Column(db.String(50), nullable=False)
     role = db.Column(db.String(20), default='mahasiswa')  # mahasiswa, dosen, admin
     advisor_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     advisor = db.relationship('User', remote_side=[id], backref='advisees')
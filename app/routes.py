@@ -1,7 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
 from .models.user import User
-from .models.matkul import Course, Grade, Material, Video, Submission, KRS, ForumPost, ForumReply, Schedule, VideoWatch
+from .models.matkul import Course, Grade, Material, Video, Submission, ForumPost, ForumReply, VideoWatch
 from . import db, bcrypt
+from .utils.course_content import accessible_courses
+from .utils.forum import reply_page, thread_page
+from .utils.grade_summary import get_student_summary
+from .utils.pagination import InvalidCursor, clamp_per_page
+from .utils.queries import submissions_with_relations
+from .utils.reports import course_counts
+from .utils.schedule_index import get_schedule_index, today_name
+from .utils.storage import storage_url
+from .utils.video_delivery import authorize_file, authorize_watch, can_watch, file_response
+from .utils.watch_buffer import get_watch_buffer
 from flask_login import login_user, login_required, logout_user, current_user
 
 main_bp = Blueprint('main', __name__)
@@ -84,15 +94,11 @@ def dashboard_mahasiswa():
     if current_user.role != 'mahasiswa':
         return redirect(url_for('main.index'))
     courses = Course.query.all()
-    grades = Grade.query.filter_by(student_id=current_user.id).all()
-    total_sks = sum(grade.bobot for grade in grades)
-    total_nilai_bobot = sum(grade.nilai * grade.bobot for grade in grades)
-    ipk = total_nilai_bobot / total_sks if total_sks > 0 else 0
-    # Fetch today's schedule (e.g., today is Senin for demo if none found)
-    import datetime
-    days_map = {0: 'Senin', 1: 'Selasa', 2: 'Rabu', 3: 'Kamis', 4: 'Jumat', 5: 'Sabtu', 6: 'Minggu'}
-    today_name = days_map[datetime.datetime.now().weekday()]
-    today_schedule = Schedule.query.filter_by(hari=today_name).all()
+    summary = get_student_summary(current_user.id)
+    total_sks = summary['total_bobot']
+    ipk = summary['ipk']
+    # Jadwal hari ini dari KRS mahasiswa (index jadwal tahun ajaran aktif)
+    today_schedule = get_schedule_index().for_student(current_user.id, today_name())
     
     # Real activities from DB
     submissions = Submission.query.filter_by(student_id=current_user.id).order_by(Submission.submitted_at.desc()).limit(3).all()
@@ -118,7 +124,6 @@ def dashboard_mahasiswa():
 
     return render_template('dashboard_mahasiswa.html',
                          courses=courses,
-                         grades=grades,
                          ipk=round(ipk, 2),
                          total_sks=total_sks,
                          presence_percent=presence_percent,
@@ -138,25 +143,22 @@ def dashboard_dosen():
     total_students_count = db.session.query(db.func.count(db.distinct(Grade.student_id))).filter(Grade.course_id.in_(course_ids)).scalar() or 0
     
     # Per course student counts
+    counts = course_counts(course_ids)
     course_stats = []
     for c in courses:
-        count = Grade.query.filter_by(course_id=c.id).count()
         course_stats.append({
             'id': c.id,
             'kode': c.kode,
             'nama': c.nama,
             'sks': c.sks,
-            'student_count': count
+            'student_count': counts.get(c.id, {}).get('student_count', 0)
         })
 
     # Recent unrated submissions
-    pending_submissions = Submission.query.filter(Submission.course_id.in_(course_ids), Submission.status == 'pending').order_by(Submission.submitted_at.desc()).limit(3).all()
+    pending_submissions = submissions_with_relations().filter(Submission.course_id.in_(course_ids), Submission.status == 'pending').order_by(Submission.submitted_at.desc()).limit(3).all()
     
     # Today's teaching schedule
-    import datetime
-    days_map = {0: 'Senin', 1: 'Selasa', 2: 'Rabu', 3: 'Kamis', 4: 'Jumat', 5: 'Sabtu', 6: 'Minggu'}
-    today_name = days_map[datetime.datetime.now().weekday()]
-    teaching_schedule = Schedule.query.filter(Schedule.course_id.in_(course_ids), Schedule.hari == today_name).all()
+    teaching_schedule = get_schedule_index().for_lecturer(current_user.id, today_name())
 
     return render_template('dashboard_dosen.html', 
                          courses=courses,
@@ -179,13 +181,10 @@ def dosen_courses():
     total_students_count = db.session.query(db.func.count(db.distinct(Grade.student_id))).filter(Grade.course_id.in_(course_ids)).scalar() or 0
     
     # Recent unrated submissions
-    pending_submissions = Submission.query.filter(Submission.course_id.in_(course_ids), Submission.status == 'pending').order_by(Submission.submitted_at.desc()).limit(3).all()
+    pending_submissions = submissions_with_relations().filter(Submission.course_id.in_(course_ids), Submission.status == 'pending').order_by(Submission.submitted_at.desc()).limit(3).all()
     
     # Today's teaching schedule
-    import datetime
-    days_map = {0: 'Senin', 1: 'Selasa', 2: 'Rabu', 3: 'Kamis', 4: 'Jumat', 5: 'Sabtu', 6: 'Minggu'}
-    today_name = days_map[datetime.datetime.now().weekday()]
-    teaching_schedule = Schedule.query.filter(Schedule.course_id.in_(course_ids), Schedule.hari == today_name).all()
+    teaching_schedule = get_schedule_index().for_lecturer(current_user.id, today_name())
 
     return render_template('dashboard_dosen.html', 
                          courses=courses,
@@ -201,9 +200,21 @@ def dosen_submissions():
         return redirect(url_for('main.index'))
     courses = Course.query.filter_by(dosen_id=current_user.id).all()
     course_ids = [c.id for c in courses]
-    submissions = Submission.query.filter(Submission.course_id.in_(course_ids)).order_by(Submission.submitted_at.desc()).all()
+    submissions = submissions_with_relations().filter(Submission.course_id.in_(course_ids)).order_by(Submission.submitted_at.desc()).all()
     return render_template('dosen_submissions.html', submissions=submissions, courses=courses)
 
+@main_bp.route('/files/<path:key>')
+@login_required
+def stored_file(key):
+    """File di storage (materi, tugas, lampiran pengajuan) setelah cek akses baris pengacunya."""
+    try:
+        resolved = authorize_file(current_user, key)
+    except LookupError:
+        abort(404)
+    except PermissionError:
+        abort(403)
+    return file_response(*resolved)
+
 # API Routes
 @main_bp.route('/api/material/<int:material_id>/download', methods=['POST'])
 @login_required
@@ -212,7 +223,7 @@ def download_material(material_id):
     return jsonify({
         'status': 'success',
         'message': f'Download {material.judul} berhasil',
-        'file_url': material.file_path
+        'file_url': storage_url(material.file_path, 'modul')
     })
 
 @main_bp.route('/api/submission/<int:submission_id>/status', methods=['POST'])
@@ -231,13 +242,25 @@ def update_submission_status(submission_id):
 @main_bp.route('/api/video/<int:video_id>/watch', methods=['POST'])
 @login_required
 def track_video_watch(video_id):
-    data = request.get_json()
-    watch_time = data.get('watch_time', 0)
-    total_duration = data.get('total_duration', 0)
+    data = request.get_json() or {}
+    try:
+        watch_time = max(int(data.get('watch_time', 0)), 0)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'watch_time harus berupa angka'}), 400
+    try:
+        # Durasi dari Video.durasi, bukan dari klien: status selesai tidak bisa dipalsukan
+        total_duration = authorize_watch(current_user, video_id)
+    except LookupError:
+        return jsonify({'status': 'error', 'message': 'Video not found'}), 404
+    except PermissionError:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    if total_duration:
+        watch_time = min(watch_time, total_duration)
+    get_watch_buffer().record(current_user.id, video_id, watch_time, total_duration or 0)
     return jsonify({
         'status': 'success',
         'message': 'Video watch time tracked',
-        'progress': (watch_time / total_duration * 100) if total_duration > 0 else 0
+        'progress': min(watch_time / total_duration * 100, 100) if total_duration else 0
     })
 
 @main_bp.route('/api/forum/post', methods=['POST'])
@@ -275,6 +298,9 @@ def create_forum_reply():
     data = request.get_json()
     post_id = data.get('post_id')
     content = data.get('content')
+    post = db.session.get(ForumPost, post_id) if post_id else None
+    if post is None or not can_watch(current_user, post.course_id):
+        return jsonify({'status': 'error', 'message': 'Post not found'}), 404
     forum_reply = ForumReply(student_id=current_user.id, post_id=post_id, content=content)
     db.session.add(forum_reply)
     db.session.commit()
@@ -288,3 +314,66 @@ def create_forum_reply():
             'time': forum_reply.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
     })
+
+def _thread_json(post):
+    return {
+        'id': post.id,
+        'title': post.title,
+        'author': post.student.nama,
+        'course_id': post.course_id,
+        'course': post.course.nama,
+        'replies_count': post.replies_count or 0,
+        'last_reply_at': post.last_reply_at.strftime('%Y-%m-%d %H:%M:%S') if post.last_reply_at else None,
+        'last_activity_at': post.last_activity_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'time': post.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+@main_bp.route('/api/forum/posts', methods=['GET'])
+@login_required
+def list_forum_posts():
+    """Thread per mata kuliah (?course_id=) atau semua mata kuliah user, urut aktivitas terakhir; cursor ?after=."""
+    courses = {course.id for course in accessible_courses(current_user)}
+    course_id = request.args.get('course_id', type=int)
+    if course_id and course_id not in courses:
+        return jsonify({'status': 'error', 'message': 'Course not found'}), 404
+    course_ids = [course_id] if course_id else sorted(courses)
+    per_page = clamp_per_page(request.args.get('per_page', type=int), default=20)
+    if not course_ids:
+        return jsonify({'status': 'success', 'message': 'Forum posts retrieved successfully',
+                        'data': {'posts': [], 'pagination': {'per_page': per_page, 'next_cursor': None, 'has_next': False}}})
+    try:
+        page = thread_page(course_ids, after=request.args.get('after'), per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({
+        'status': 'success',
+        'message': 'Forum posts retrieved successfully',
+        'data': {'posts': [_thread_json(post) for post in page.items], 'pagination': page.to_dict()}
+    })
+
+@main_bp.route('/api/forum/post/<int:post_id>/replies', methods=['GET'])
+@login_required
+def list_forum_replies(post_id):
+    """Balasan satu thread dari yang paling lama; cursor ?after=."""
+    post = db.session.get(ForumPost, post_id)
+    if post is None or not can_watch(current_user, post.course_id):
+        return jsonify({'status': 'error', 'message': 'Post not found'}), 404
+    per_page = clamp_per_page(request.args.get('per_page', type=int), default=20)
+    try:
+        page = reply_page(post_id, after=request.args.get('after'), per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({
+        'status': 'success',
+        'message': 'Forum replies retrieved successfully',
+        'data': {
+            'replies_count': post.replies_count or 0,
+            'replies': [{
+                'id': reply.id,
+                'content': reply.content,
+                'author': reply.student.nama,
+                'time': reply.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            } for reply in page.items],
+            'pagination': page.to_dict()
+        }
+    })
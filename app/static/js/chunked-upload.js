@@ -0,0 +1,136 @@
+// Upload bertahap (resumable) untuk form dengan atribut data-chunked-upload="<kategori>".
+// File dikirim per chunk ke /api/uploads; jika koneksi putus, upload dilanjutkan dari
+// offset terakhir. Setelah selesai, form dikirim dengan field upload_id (tanpa file).
+
+(function() {
+    const API_URL = '/api/uploads';
+    const MAX_RETRIES = 5;
+
+    function storageKey(category, file) {
+        return `chunked-upload:${category}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function requestJson(url, options) {
+        const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+        const data = await response.json().catch(() => ({}));
+        return { response, data };
+    }
+
+    async function startOrResume(category, file) {
+        const key = storageKey(category, file);
+        const savedId = localStorage.getItem(key);
+        if (savedId) {
+            const { response, data } = await requestJson(`${API_URL}/${savedId}`);
+            if (response.ok) {
+                return data.data;
+            }
+            localStorage.removeItem(key);
+        }
+        const { response, data } = await requestJson(API_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ category, filename: file.name, size: file.size })
+        });
+        if (!response.ok) {
+            throw new Error(data.message || 'Upload gagal dimulai');
+        }
+        localStorage.setItem(key, data.data.id);
+        return data.data;
+    }
+
+    async function uploadFile(category, file, onProgress) {
+        const upload = await startOrResume(category, file);
+        let offset = upload.offset;
+        let status = upload.status;
+        let retries = 0;
+
+        while (status !== 'complete' && offset < file.size) {
+            const chunk = file.slice(offset, offset + upload.chunk_size);
+            let result;
+            try {
+                result = await requestJson(`${API_URL}/${upload.id}`, {
+                    method: 'PUT',
+                    headers: { 'Upload-Offset': String(offset), 'Content-Type': 'application/octet-stream' },
+                    body: chunk
+                });
+            } catch (networkError) {
+                result = null;
+            }
+
+            if (result && result.response.ok) {
+                offset = result.data.data.offset;
+                status = result.data.data.status;
+                retries = 0;
+                onProgress(offset / file.size);
+                continue;
+            }
+            if (result && result.response.status === 409 && result.data.offset !== undefined) {
+                // Server punya offset lain (chunk sebelumnya ternyata sudah masuk)
+                offset = result.data.offset;
+                continue;
+            }
+            if (result && result.response.status < 500 && result.response.status !== 409) {
+                localStorage.removeItem(storageKey(category, file));
+                throw new Error(result.data.message || 'Upload ditolak');
+            }
+            if (++retries > MAX_RETRIES) {
+                throw new Error('Koneksi terputus, coba kirim ulang untuk melanjutkan upload');
+            }
+            await sleep(Math.min(1000 * 2 ** retries, 15000));
+        }
+
+        localStorage.removeItem(storageKey(category, file));
+        return upload.id;
+    }
+
+    function init(form) {
+        const category = form.dataset.chunkedUpload;
+        const input = form.querySelector('input[type="file"][name="file"]');
+        if (!input || !window.fetch || !window.Blob || !Blob.prototype.slice) {
+            return;
+        }
+        const progress = document.createElement('p');
+        progress.style.cssText = 'margin-top: 0.5rem; font-size: 0.85rem; color: var(--text-muted); display: none;';
+        input.insertAdjacentElement('afterend', progress);
+
+        form.addEventListener('submit', async function(e) {
+            if (!input.files.length || form.dataset.uploading) {
+                return;
+            }
+            e.preventDefault();
+            form.dataset.uploading = '1';
+            const submitButton = form.querySelector('[type="submit"]');
+            if (submitButton) submitButton.disabled = true;
+            progress.style.display = 'block';
+            progress.textContent = 'Mengunggah file...';
+
+            try {
+                const uploadId = await uploadFile(category, input.files[0], ratio => {
+                    progress.textContent = `Mengunggah file... ${Math.floor(ratio * 100)}%`;
+                });
+                const hidden = document.createElement('input');
+                hidden.type = 'hidden';
+                hidden.name = 'upload_id';
+                hidden.value = uploadId;
+                form.appendChild(hidden);
+                // File sudah di server; jangan dikirim ulang bersama form
+                input.disabled = true;
+                progress.textContent = 'Upload selesai, mengirim formulir...';
+                form.submit();
+            } catch (error) {
+                progress.textContent = error.message;
+                progress.style.color = 'var(--danger)';
+                delete form.dataset.uploading;
+                if (submitButton) submitButton.disabled = false;
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('form[data-chunked-upload]').forEach(init);
+    });
+})();
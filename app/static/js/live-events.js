@@ -0,0 +1,79 @@
+// Push real-time lewat Server-Sent Events (/api/events). Halaman yang memakai script ini
+// punya elemen [data-live-events="<query channel>"], mis. "course=all" atau "post=12",
+// dan [data-user-id] untuk mengabaikan event dari aksi sendiri. Status pengajuan/KRS
+// diperbarui di elemen [data-live-status="<jenis>-<id>"].
+
+(function() {
+    const root = document.querySelector('[data-live-events]');
+    if (!root || !window.EventSource) {
+        return;
+    }
+    const userId = Number(root.dataset.userId);
+    const seen = new Set();
+    let reloadShown = false;
+
+    const STATUS_LABELS = {
+        'submission.status': 'Status tugas',
+        'krs.status': 'Status KRS',
+        'letter.status': 'Status pengajuan surat'
+    };
+
+    function once(key) {
+        if (seen.has(key)) {
+            return false;
+        }
+        seen.add(key);
+        return true;
+    }
+
+    function escapeHtml(text) {
+        const span = document.createElement('span');
+        span.textContent = text == null ? '' : String(text);
+        return span.innerHTML;
+    }
+
+    function offerReload(message) {
+        if (reloadShown) {
+            return;
+        }
+        reloadShown = true;
+        showAlert(`${message} <a href="#" onclick="window.location.reload(); return false;">Muat ulang</a>`, 'info');
+        setTimeout(() => { reloadShown = false; }, 5000);
+    }
+
+    const source = new EventSource(`/api/events?${root.dataset.liveEvents || ''}`);
+
+    source.addEventListener('forum.reply', event => {
+        const data = JSON.parse(event.data);
+        if (data.student_id === userId || !once(`reply:${data.reply_id}`)) {
+            return;
+        }
+        offerReload(root.dataset.livePost && Number(root.dataset.livePost) === data.post_id
+            ? 'Ada balasan baru di diskusi ini.'
+            : 'Ada balasan baru di forum.');
+    });
+
+    source.addEventListener('forum.post', event => {
+        const data = JSON.parse(event.data);
+        if (data.student_id === userId || !once(`post:${data.post_id}`)) {
+            return;
+        }
+        offerReload(`Diskusi baru: ${escapeHtml(data.title)}.`);
+    });
+
+    Object.keys(STATUS_LABELS).forEach(type => {
+        source.addEventListener(type, event => {
+            const data = JSON.parse(event.data);
+            const kind = type.split('.')[0];
+            const badge = document.querySelector(`[data-live-status="${kind}-${data.id}"]`);
+            if (badge) {
+                badge.textContent = data.status;
+            }
+            const title = data.title ? ` "${escapeHtml(data.title)}"` : '';
+            showAlert(`${STATUS_LABELS[type]}${title} berubah menjadi <strong>${escapeHtml(data.status)}</strong>.`, 'info');
+        });
+    });
+
+    // Event hilang (klien tertinggal atau pindah worker): data di halaman mungkin basi
+    source.addEventListener('resync', () => offerReload('Ada pembaruan yang terlewat.'));
+})();
@@ -0,0 +1,110 @@
+// Isi kartu minggu di halaman materi (data-materi-week) dimuat saat kartu terlihat,
+// lewat /elearning/api/materi/minggu/<minggu>. Tombol "lainnya" mengambil halaman
+// berikutnya dengan cursor dari respons sebelumnya.
+
+(function() {
+    function itemLink(href, icon, color, title, meta, newTab) {
+        const link = document.createElement('a');
+        link.href = href || '#';
+        if (newTab) {
+            link.target = '_blank';
+        }
+        link.className = 'flex items-center justify-between p-3';
+        link.style.cssText = 'border: 1px solid var(--border-light); border-radius: var(--radius-md); text-decoration: none; color: inherit; transition: var(--transition);';
+        link.innerHTML =
+            '<div class="flex items-center gap-3">' +
+            `<div style="width: 36px; height: 36px; border-radius: 8px; background: ${color.background}; color: ${color.text}; display: flex; align-items: center; justify-content: center;"><i class="fas ${icon}"></i></div>` +
+            '<div><span style="display: block; font-weight: 600; font-size: 0.9rem;"></span><small class="text-muted"></small></div>' +
+            '</div><i class="fas fa-chevron-right" style="font-size: 0.8rem; color: var(--text-muted);"></i>';
+        link.querySelector('span').textContent = title;
+        link.querySelector('small').textContent = meta;
+        return link;
+    }
+
+    function renderMaterial(material) {
+        const meta = [material.course_kode, material.tipe].filter(Boolean).join(' • ');
+        return itemLink(material.url, 'fa-file-pdf', { background: 'rgba(37, 99, 235, 0.1)', text: 'var(--primary)' },
+            material.judul, meta, true);
+    }
+
+    function renderVideo(video) {
+        const meta = [video.course_kode, 'Video', video.durasi ? `${video.durasi} menit` : null].filter(Boolean).join(' • ');
+        return itemLink(video.url, 'fa-play', { background: 'rgba(220, 38, 38, 0.1)', text: '#dc2626' },
+            video.judul, meta, false);
+    }
+
+    function moreButton(card, tipe, cursor) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn-modern materi-more';
+        button.dataset.tipe = tipe;
+        button.dataset.after = cursor;
+        button.style.cssText = 'margin-top: 0.75rem; width: 100%;';
+        button.textContent = tipe === 'materi' ? 'Materi lainnya' : 'Video lainnya';
+        card.querySelector('.card-body').appendChild(button);
+    }
+
+    async function load(card, tipe, after) {
+        const url = new URL(card.dataset.url, window.location.origin);
+        if (tipe) {
+            url.searchParams.set('tipe', tipe);
+            url.searchParams.set('after', after);
+        }
+        const loading = card.querySelector('.materi-loading');
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            const payload = await response.json();
+            if (!response.ok) {
+                throw new Error(payload.message || 'Gagal memuat materi');
+            }
+            const data = payload.data;
+            const list = card.querySelector('.materi-items');
+            // Materi tambahan disisipkan sebelum video agar urutannya tetap materi lalu video
+            const firstVideo = list.querySelector('[data-kind="video"]');
+            (data.materials || []).forEach(material => list.insertBefore(renderMaterial(material), firstVideo));
+            (data.videos || []).forEach(video => {
+                const link = renderVideo(video);
+                link.dataset.kind = 'video';
+                list.appendChild(link);
+            });
+            if (data.materials_pagination && data.materials_pagination.next_cursor) {
+                moreButton(card, 'materi', data.materials_pagination.next_cursor);
+            }
+            if (data.videos_pagination && data.videos_pagination.next_cursor) {
+                moreButton(card, 'video', data.videos_pagination.next_cursor);
+            }
+            if (loading) {
+                loading.remove();
+            }
+        } catch (error) {
+            if (loading) {
+                loading.textContent = error.message;
+            }
+        }
+    }
+
+    document.addEventListener('click', event => {
+        const button = event.target.closest('.materi-more');
+        if (!button) {
+            return;
+        }
+        const card = button.closest('[data-materi-week]');
+        button.remove();
+        load(card, button.dataset.tipe, button.dataset.after);
+    });
+
+    const cards = Array.from(document.querySelectorAll('[data-materi-week]:not([data-loaded])'));
+    if (!('IntersectionObserver' in window)) {
+        cards.forEach(card => load(card));
+        return;
+    }
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                load(entry.target);
+            }
+        });
+    }, { rootMargin: '200px' });
+    cards.forEach(card => observer.observe(card));
+})();
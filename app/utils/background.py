@@ -0,0 +1,86 @@
+import atexit
+import queue
+import threading
+from flask import current_app
+
+
+class BackgroundWorker:
+    """
+    Antrian tugas ringan di dalam proses (thread daemon) untuk pekerjaan yang tidak
+    perlu ditunggu request, mis. pemrosesan file setelah upload.
+
+    Thread baru dimulai saat tugas pertama masuk (aman untuk server yang fork setelah
+    create_app). Tugas yang masih antre saat proses berhenti tidak dijamin selesai,
+    jadi tugas harus idempoten dan bisa diulang.
+    """
+
+    def __init__(self, app, workers=1, max_queue=1000):
+        self.app = app
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Masukkan tugas ke antrian; False jika antrian penuh (tugas dibuang dan dicatat)."""
+        self._ensure_threads()
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except queue.Full:
+            self.dropped += 1
+            self.app.logger.warning('Antrian background penuh, tugas %s dibuang', getattr(func, '__name__', func))
+            return False
+        return True
+
+    def _ensure_threads(self):
+        if len(self._threads) >= self.workers or self._stopped:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'background-worker-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            func, args, kwargs = task
+            with self.app.app_context():
+                try:
+                    func(*args, **kwargs)
+                    self.completed += 1
+                except Exception:
+                    self.failed += 1
+                    self.app.logger.exception('Tugas background %s gagal', getattr(func, '__name__', func))
+            self._queue.task_done()
+
+    def join(self):
+        """Tunggu sampai antrian kosong (dipakai script dan pengujian)."""
+        self._queue.join()
+
+    def stop(self):
+        self._stopped = True
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+
+def init_background_worker(app):
+    worker = BackgroundWorker(app, workers=app.config.get('BACKGROUND_WORKERS', 1),
+                              max_queue=app.config.get('BACKGROUND_MAX_QUEUE', 1000))
+    app.extensions['background_worker'] = worker
+    atexit.register(worker.stop)
+    return worker
+
+
+def get_background_worker():
+    return current_app.extensions['background_worker']
@@ -0,0 +1,103 @@
+import os
+from sqlalchemy import func, or_, select
+from flask import url_for
+from app import db
+from app.models.matkul import Course, KRS, Material, Video
+from app.utils.pagination import keyset_paginate
+from app.utils.schedule_index import EXCLUDED_KRS_STATUS
+from app.utils.storage import storage_url
+
+# Urutan isi satu minggu: per mata kuliah lalu id (index (course_id, minggu) + primary key)
+MATERIAL_ORDER = (Material.course_id, Material.id)
+VIDEO_ORDER = (Video.course_id, Video.id)
+
+
+def accessible_courses(user):
+    """
+    Mata kuliah yang materinya boleh dilihat: dosen hanya yang diampu, mahasiswa hanya
+    yang ada di KRS (status tidak ditolak). Aturannya sama dengan `can_watch`.
+
+    :return: list Course urut kode
+    """
+    query = Course.query
+    if user.role == 'dosen':
+        query = query.filter(Course.dosen_id == user.id)
+    elif user.role != 'admin':
+        enrolled = select(KRS.course_id).where(
+            KRS.student_id == user.id,
+            KRS.status.notin_(EXCLUDED_KRS_STATUS)
+        )
+        query = query.filter(Course.id.in_(enrolled))
+    return query.order_by(Course.kode).all()
+
+
+def _week(column):
+    # Materi tanpa minggu ditampilkan di minggu pertama (perilaku halaman lama)
+    return func.coalesce(column, 1)
+
+
+def _week_filter(column, week):
+    if week == 1:
+        return or_(column == 1, column.is_(None))
+    return column == week
+
+
+def week_summary(course_ids):
+    """
+    Jumlah materi dan video per minggu untuk `course_ids` (dua query GROUP BY lewat index
+    (course_id, minggu), tanpa memuat barisnya).
+
+    :return: list dict {'minggu', 'materials', 'videos'} urut minggu
+    """
+    if not course_ids:
+        return []
+    weeks = {}
+    for model, key in ((Material, 'materials'), (Video, 'videos')):
+        week = _week(model.minggu)
+        rows = db.session.execute(
+            select(week, func.count(model.id)).where(model.course_id.in_(course_ids)).group_by(week)
+        )
+        for minggu, count in rows:
+            weeks.setdefault(minggu, {'minggu': minggu, 'materials': 0, 'videos': 0})[key] = count
+    return [weeks[minggu] for minggu in sorted(weeks)]
+
+
+def week_materials(course_ids, week, after=None, per_page=20):
+    """Halaman Material minggu `week` (cursor keyset, lihat `keyset_paginate`)."""
+    query = Material.query.filter(Material.course_id.in_(course_ids), _week_filter(Material.minggu, week))
+    return keyset_paginate(query, 'course_id', MATERIAL_ORDER, after=after, per_page=per_page)
+
+
+def week_videos(course_ids, week, after=None, per_page=20):
+    """Halaman Video minggu `week` (cursor keyset, lihat `keyset_paginate`)."""
+    query = Video.query.filter(Video.course_id.in_(course_ids), _week_filter(Video.minggu, week))
+    return keyset_paginate(query, 'course_id', VIDEO_ORDER, after=after, per_page=per_page)
+
+
+def material_json(material, courses):
+    course = courses.get(material.course_id)
+    return {
+        'id': material.id,
+        'judul': material.judul,
+        'deskripsi': material.deskripsi,
+        'tipe': (material.tipe or os.path.splitext(material.file_path or '')[1].lstrip('.')).upper() or None,
+        'url': storage_url(material.file_path, 'modul') if material.file_path else None,
+        'course_id': material.course_id,
+        'course_kode': course.kode if course else None,
+        'uploaded_at': material.uploaded_at.isoformat() if material.uploaded_at else None
+    }
+
+
+def video_json(video, courses):
+    course = courses.get(video.course_id)
+    path = video.video_path or ''
+    return {
+        'id': video.id,
+        'judul': video.judul,
+        'deskripsi': video.deskripsi,
+        'durasi': video.durasi,
+        'url': path if path.startswith(('http://', 'https://')) else url_for('elearning.video', video_id=video.id),
+        'course_id': video.course_id,
+        'course_kode': course.kode if course else None,
+        'uploaded_at': video.uploaded_at.isoformat() if video.uploaded_at else None
+    }
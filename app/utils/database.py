@@ -0,0 +1,176 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+REPLICA_BIND = 'replica'
+
+
+def build_engine_options(config, url):
+    """
+    Opsi engine dari konfigurasi DB_POOL_* untuk URL tertentu.
+
+    SQLite (dipakai script dan pengujian lokal) memakai pool bawaan Flask-SQLAlchemy,
+    jadi opsi ukuran pool hanya diterapkan untuk server database.
+    """
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if make_url(url).get_backend_name() == 'sqlite':
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800)
+    })
+    timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+    if timeout_ms and make_url(url).get_backend_name() == 'mysql':
+        # MAX_EXECUTION_TIME hanya berlaku untuk SELECT (MySQL 5.7.8+)
+        options['connect_args'] = {'init_command': f'SET SESSION MAX_EXECUTION_TIME={int(timeout_ms)}'}
+    return options
+
+
+def configure_engines(app):
+    """Isi SQLALCHEMY_ENGINE_OPTIONS dan bind replica sebelum `db.init_app`."""
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(config, config['SQLALCHEMY_DATABASE_URI']))
+    replica_url = config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA_BIND, dict(build_engine_options(config, replica_url), url=replica_url))
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+class PoolMetrics:
+    """Statistik checkout pool per engine (jumlah, waktu tunggu, koneksi baru, invalidasi)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self, pool):
+        with self.lock:
+            data = {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_seconds * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3)
+            }
+        data['pool'] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checked_in': pool.checkedin()
+            })
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mencatat lama menunggu koneksi bebas (termasuk timeout)."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Pool dibuat ulang (mis. setelah dispose/fork); metrics tetap ikut
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument_engine(engine):
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics = metrics
+
+    event.listen(engine, 'checkout', lambda *args: metrics.incr('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: metrics.incr('checkins'))
+    event.listen(engine, 'connect', lambda *args: metrics.incr('connects'))
+    event.listen(engine, 'invalidate', lambda *args: metrics.incr('invalidations'))
+    return metrics
+
+
+def init_pool_metrics(app, db):
+    with app.app_context():
+        app.extensions['db_pool_metrics'] = {
+            bind or 'default': (engine, instrument_engine(engine)) for bind, engine in db.engines.items()
+        }
+
+
+def get_pool_metrics():
+    return {
+        name: metrics.to_dict(engine.pool)
+        for name, (engine, metrics) in current_app.extensions.get('db_pool_metrics', {}).items()
+    }
+
+
+class RoutingSession(Session):
+    """
+    Session yang mengarahkan SELECT ke bind replica selama view ditandai `replica_reads`.
+
+    Flush dan statement DML (insert/update/delete) tetap ke database utama.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and has_app_context()
+            and g.get('use_replica')
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(view):
+    """Dekorator untuk view read-only yang boleh membaca dari replica (data bisa tertinggal sedikit)."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapper
@@ -1,28 +1,286 @@
 import os
+import re
+import threading
+import time
+from flask import has_app_context
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from config import Config
+from app.utils.database import build_engine_options
 
-def run_sql_file(sql_file_path):
+_engine = None
+_engine_lock = threading.Lock()
+
+# Batas batch INSERT multi-baris (di bawah max_allowed_packet MySQL 5.7 = 4MB)
+INSERT_BATCH_ROWS = 500
+INSERT_BATCH_BYTES = 1024 * 1024
+
+DELIMITER_PATTERN = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.IGNORECASE)
+INSERT_PATTERN = re.compile(
+    r'^(INSERT\s+(?:IGNORE\s+)?INTO\s+[`"\w.]+\s*(?:\([^()]*\))?\s*VALUES)\s*(\(.*\))$',
+    re.IGNORECASE | re.DOTALL
+)
+ON_DUPLICATE_PATTERN = re.compile(r'\)\s*ON\s+DUPLICATE\s+KEY', re.IGNORECASE)
+DATABASE_STATEMENT_PATTERN = re.compile(r'^(CREATE\s+DATABASE|USE)\b', re.IGNORECASE)
+
+# Sentinel untuk cek skema saat startup
+SCHEMA_SENTINEL_TABLE = 'user'
+
+def get_engine():
+    """
+    Engine untuk utilitas database: engine aplikasi jika ada app context, selain itu
+    satu engine bersama per proses (dibuat sekali, memakai opsi pool yang sama).
+    """
+    global _engine
+    if has_app_context():
+        from app import db
+        return db.engine
+    with _engine_lock:
+        if _engine is None:
+            config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+            _engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, **build_engine_options(config, Config.SQLALCHEMY_DATABASE_URI))
+        return _engine
+
+class SqlTokenizer:
+    """
+    Pemecah statement SQL yang membaca per baris (streaming).
+
+    Paham string ('...', "...", `...` termasuk escape backslash), komentar (`--`, `#`,
+    `/* */`; komentar eksekusi MySQL `/*! */` dipertahankan) dan perintah DELIMITER.
+    """
+
+    def __init__(self, delimiter=';'):
+        self.delimiter = delimiter
+        self.state = None  # None, karakter kutip, 'comment', atau 'exec_comment'
+        self.buffer = []
+        self._compile()
+
+    def _compile(self):
+        self.normal_pattern = re.compile(r"""['"`]|--(?=\s|$)|#|/\*|""" + re.escape(self.delimiter))
+
+    def feed(self, line):
+        """Proses satu baris, kembalikan list statement yang selesai di baris ini."""
+        statements = []
+        if self.state is None and not ''.join(self.buffer).strip():
+            match = DELIMITER_PATTERN.match(line)
+            if match:
+                self.delimiter = match.group(1)
+                self._compile()
+                self.buffer = []
+                return statements
+
+        pos = 0
+        length = len(line)
+        while pos < length:
+            if self.state is None:
+                match = self.normal_pattern.search(line, pos)
+                if match is None:
+                    self.buffer.append(line[pos:])
+                    break
+                self.buffer.append(line[pos:match.start()])
+                token = match.group()
+                pos = match.end()
+                if token in ("'", '"', '`'):
+                    self.buffer.append(token)
+                    self.state = token
+                elif token in ('--', '#'):
+                    self.buffer.append('\n')
+                    break
+                elif token == '/*':
+                    if line.startswith('!', pos):
+                        self.buffer.append(token)
+                        self.state = 'exec_comment'
+                    else:
+                        self.state = 'comment'
+                else:
+                    statement = ''.join(self.buffer).strip()
+                    self.buffer = []
+                    if statement:
+                        statements.append(statement)
+            elif self.state in ('comment', 'exec_comment'):
+                end = line.find('*/', pos)
+                keep = self.state == 'exec_comment'
+                if end == -1:
+                    if keep:
+                        self.buffer.append(line[pos:])
+                    break
+                if keep:
+                    self.buffer.append(line[pos:end + 2])
+                else:
+                    self.buffer.append(' ')
+                pos = end + 2
+                self.state = None
+            else:
+                quote = self.state
+                index = pos
+                while index < length:
+                    char = line[index]
+                    if char == '\\' and quote != '`':
+                        index += 2
+                        continue
+                    if char == quote:
+                        break
+                    index += 1
+                if index >= length:
+                    self.buffer.append(line[pos:])
+                    break
+                self.buffer.append(line[pos:index + 1])
+                pos = index + 1
+                self.state = None
+        return statements
+
+    def finish(self):
+        """Statement terakhir tanpa delimiter penutup (jika ada)."""
+        statement = ''.join(self.buffer).strip()
+        self.buffer = []
+        if self.state not in (None, 'comment'):
+            raise ValueError(f'Unterminated {self.state} in SQL file')
+        return [statement] if statement else []
+
+def iter_sql_statements(file, progress=None):
+    """
+    Iterasi statement dari file biner tanpa membaca seluruh isi ke memori.
+
+    :param progress: callable(bytes_read) dipanggil setiap baris (opsional)
+    """
+    tokenizer = SqlTokenizer()
+    bytes_read = 0
+    for raw in file:
+        bytes_read += len(raw)
+        for statement in tokenizer.feed(raw.decode('utf-8')):
+            yield statement
+        if progress is not None:
+            progress(bytes_read)
+    yield from tokenizer.finish()
+
+def batch_inserts(statements, max_rows=INSERT_BATCH_ROWS, max_bytes=INSERT_BATCH_BYTES):
+    """
+    Gabungkan INSERT berurutan ke tabel dan kolom yang sama menjadi satu INSERT multi-baris.
+
+    :return: iterator (statement, jumlah_statement_asal)
+    """
+    prefix = None
+    values = []
+    size = 0
+    merged = 0
+
+    def flush():
+        return f"{prefix} {','.join(values)}", merged
+
+    for statement in statements:
+        match = INSERT_PATTERN.match(statement)
+        if match is None or ON_DUPLICATE_PATTERN.search(statement):
+            if values:
+                yield flush()
+                prefix, values, size, merged = None, [], 0, 0
+            yield statement, 1
+            continue
+
+        statement_prefix = ' '.join(match.group(1).split())
+        if values and (statement_prefix != prefix or len(values) >= max_rows or size + len(match.group(2)) > max_bytes):
+            yield flush()
+            values, size, merged = [], 0, 0
+        prefix = statement_prefix
+        values.append(match.group(2))
+        size += len(match.group(2))
+        merged += 1
+
+    if values:
+        yield flush()
+
+def run_sql_file(sql_file_path, skip_database_statements=False, progress=None, progress_interval=2.0, engine=None):
     """
     Executes the SQL statements in the given file.
 
+    File dibaca secara streaming, INSERT berurutan digabung per batch, dan semua
+    statement dijalankan dalam satu transaksi (catatan: DDL di MySQL tetap melakukan
+    implicit commit, jadi atomik penuh hanya untuk bagian DML).
+
     :param sql_file_path: Path to the SQL file to execute.
+    :param skip_database_statements: Lewati CREATE DATABASE/USE (bootstrap ke database dari konfigurasi).
+    :param progress: callable(dict) untuk laporan progress (statements, executed, bytes_read, total_bytes).
+    :param engine: Engine tujuan, default `get_engine()`.
+    :return: dict statistik eksekusi.
     """
     if not os.path.exists(sql_file_path):
         raise FileNotFoundError(f"SQL file not found: {sql_file_path}")
 
-    # Create a database engine
-    engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+    engine = engine or get_engine()
+    stats = {
+        'statements': 0,
+        'executed': 0,
+        'bytes_read': 0,
+        'total_bytes': os.path.getsize(sql_file_path),
+        'seconds': 0.0
+    }
+    started = time.perf_counter()
+    last_report = [started]
+
+    def track_bytes(bytes_read):
+        stats['bytes_read'] = bytes_read
 
+    with engine.begin() as connection, open(sql_file_path, 'rb') as file:
+        statements = iter_sql_statements(file, progress=track_bytes)
+        if skip_database_statements:
+            statements = (statement for statement in statements if not DATABASE_STATEMENT_PATTERN.match(statement))
+        for statement, merged in batch_inserts(statements):
+            # exec_driver_sql: tanpa parsing bind parameter (:nama) di dalam literal
+            connection.exec_driver_sql(statement)
+            stats['statements'] += merged
+            stats['executed'] += 1
+            now = time.perf_counter()
+            if progress is not None and now - last_report[0] >= progress_interval:
+                last_report[0] = now
+                progress(dict(stats, seconds=round(now - started, 2)))
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    if progress is not None:
+        progress(dict(stats))
+    return stats
+
+def schema_state(engine=None):
+    """
+    Cek skema yang murah (satu query, tanpa membaca metadata semua tabel).
+
+    :return: ('versioned', revisi) jika ada tabel alembic_version, ('unversioned', None)
+             jika tabel inti ada, atau ('empty', None) jika database belum diisi.
+    """
+    engine = engine or get_engine()
     with engine.connect() as connection:
-        with open(sql_file_path, 'r', encoding='utf-8') as file:
-            sql_commands = file.read()
+        try:
+            version = connection.execute(text('SELECT version_num FROM alembic_version')).scalar()
+            return 'versioned', version
+        except DBAPIError:
+            connection.rollback()
+        try:
+            connection.execute(text(f'SELECT 1 FROM {SCHEMA_SENTINEL_TABLE} LIMIT 1'))
+            return 'unversioned', None
+        except DBAPIError:
+            return 'empty', None
+
+def ensure_schema(sql_file_path, engine=None, progress=None):
+    """
+    Bootstrap database kosong dari file SQL. Di MySQL memakai GET_LOCK agar beberapa
+    worker yang start bersamaan tidak mengimport file yang sama berkali-kali.
+
+    :return: dict statistik jika bootstrap dijalankan, selain itu None.
+    """
+    engine = engine or get_engine()
+    if schema_state(engine)[0] != 'empty':
+        return None
+
+    if engine.dialect.name != 'mysql':
+        return run_sql_file(sql_file_path, skip_database_statements=True, progress=progress, engine=engine)
 
-        # Execute SQL commands
-        for statement in sql_commands.split(';'):
-            if statement.strip():  # Skip empty statements
-                connection.execute(text(statement))
+    with engine.connect() as lock_connection:
+        lock_connection.execute(text("SELECT GET_LOCK('siakad_bootstrap', 600)"))
+        try:
+            if schema_state(engine)[0] != 'empty':
+                return None
+            return run_sql_file(sql_file_path, skip_database_statements=True, progress=progress, engine=engine)
+        finally:
+            lock_connection.execute(text("SELECT RELEASE_LOCK('siakad_bootstrap')"))
 
 if __name__ == "__main__":
     # Example usage
-    run_sql_file("siakad.sql")
\ No newline at end of file
+    run_sql_file("siakad.sql")
@@ -0,0 +1,344 @@
+import itertools
+import json
+import queue
+import secrets
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from app.models.matkul import ForumPost, ForumReply, KRS, LetterSubmission, Submission
+
+Event = namedtuple('Event', 'id channels type data')
+
+# Perubahan status yang dikirim ke channel user pemiliknya
+STATUS_EVENTS = {
+    Submission: 'submission.status',
+    KRS: 'krs.status',
+    LetterSubmission: 'letter.status',
+}
+
+
+def format_sse(event_type, data, event_id=None):
+    """Satu frame Server-Sent Events."""
+    frame = f'id: {event_id}\n' if event_id else ''
+    return f"{frame}event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """
+    Antrian event satu koneksi SSE. `push` dipanggil thread dispatcher dan tidak pernah
+    menunggu; jika klien terlalu lambat dan antrian penuh, event dibuang dan klien
+    diminta sinkron ulang (event `resync`).
+    """
+
+    def __init__(self, channels, max_queue=256):
+        self.channels = frozenset(channels)
+        self.max_queue = max_queue
+        self._events = deque()
+        self._overflowed = False
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        with self._cond:
+            if len(self._events) >= self.max_queue:
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def mark_overflowed(self):
+        with self._cond:
+            self._overflowed = True
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Tunggu event hingga `timeout` detik. :return: (list Event, perlu resync)"""
+        with self._cond:
+            if not self._events and not self._overflowed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self._overflowed = self._overflowed, False
+        return events, overflowed
+
+
+class RedisEventBackend:
+    """
+    Broker bersama antar proses worker (opsional, butuh paket `redis`; cukup Redis lokal).
+    Semua event lewat satu channel pub/sub dan setiap proses menyebarkannya ke
+    koneksi SSE miliknya sendiri.
+    """
+
+    def __init__(self, url, channel='siakad:events'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def publish(self, channels, event_type, data):
+        self.client.publish(self.channel, json.dumps({'c': list(channels), 't': event_type, 'd': data}))
+
+    def listen(self, callback):
+        """Blok selamanya; dipanggil di thread listener broker."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            payload = json.loads(message['data'])
+            callback(payload['c'], payload['t'], payload['d'])
+
+
+class EventBroker:
+    """
+    Pub/sub in-process untuk push SSE.
+
+    `publish` hanya memasukkan event ke antrian; satu thread dispatcher yang menyebarkan
+    event ke Subscription per channel (dan meneruskannya ke backend bersama jika ada),
+    jadi request yang commit tidak pernah menunggu klien SSE maupun Redis.
+
+    Id event berbentuk `<instance>-<urutan>`. Event terakhir disimpan (`replay_size`)
+    agar klien yang reconnect dengan Last-Event-ID tidak kehilangan event; jika id
+    berasal dari proses lain atau sudah keluar dari buffer, klien diminta resync.
+    Thread dibuat saat pertama dipakai (aman untuk server yang fork setelah create_app).
+    """
+
+    def __init__(self, app, replay_size=1000, max_queue=256, max_subscribers=500, backend=None):
+        self.app = app
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.backend = backend
+        self.instance = secrets.token_hex(4)
+        self._seq = itertools.count(1)
+        self._queue = queue.SimpleQueue()
+        self._subscribers = defaultdict(set)
+        self._count = 0
+        self._recent = deque(maxlen=replay_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, channels, event_type, data):
+        """
+        Kirim event ke satu atau beberapa channel (mis. 'user:3', 'course:1', 'post:7');
+        koneksi yang mengikuti beberapa channel tersebut tetap menerima satu kali. Tidak pernah blok.
+        """
+        self._ensure_threads()
+        self._queue.put(('publish', (channels,) if isinstance(channels, str) else tuple(channels), event_type, data))
+
+    def _deliver_local(self, channels, event_type, data):
+        self._queue.put(('deliver', tuple(channels), event_type, data))
+
+    def subscribe(self, channels, last_event_id=None):
+        """
+        :raises OverflowError: jumlah koneksi di proses ini sudah mencapai max_subscribers
+        """
+        self._ensure_threads()
+        subscription = Subscription(channels, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise OverflowError('Terlalu banyak koneksi event')
+            self._count += 1
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+            if last_event_id:
+                self._replay(subscription, last_event_id)
+        return subscription
+
+    def _replay(self, subscription, last_event_id):
+        instance, _, seq = last_event_id.partition('-')
+        if instance != self.instance or not seq.isdigit():
+            subscription.mark_overflowed()
+            return
+        seq = int(seq)
+        if self._recent and seq < self._recent[0][0] - 1:
+            subscription.mark_overflowed()
+            return
+        for event_seq, event in self._recent:
+            if event_seq > seq and not subscription.channels.isdisjoint(event.channels):
+                subscription.push(event)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._count -= 1
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def _ensure_threads(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._threads.append(threading.Thread(target=self._dispatch, name='event-dispatcher', daemon=True))
+            if self.backend is not None:
+                self._threads.append(threading.Thread(target=self._listen, name='event-listener', daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def _dispatch(self):
+        while True:
+            action, channels, event_type, data = self._queue.get()
+            if action == 'publish':
+                self.published += 1
+                if self.backend is not None:
+                    try:
+                        self.backend.publish(channels, event_type, data)
+                        continue
+                    except Exception:
+                        # Backend tidak tersedia: minimal koneksi di proses ini tetap menerima event
+                        self.app.logger.exception('Event tidak bisa dikirim ke broker bersama')
+            seq = next(self._seq)
+            event = Event(f'{self.instance}-{seq}', channels, event_type, data)
+            with self._lock:
+                self._recent.append((seq, event))
+                subscribers = set()
+                for channel in channels:
+                    subscribers.update(self._subscribers.get(channel, ()))
+            for subscription in subscribers:
+                subscription.push(event)
+            self.delivered += len(subscribers)
+
+    def _listen(self):
+        while True:
+            try:
+                self.backend.listen(self._deliver_local)
+            except Exception:
+                self.app.logger.exception('Koneksi ke broker event terputus, mencoba lagi')
+                time.sleep(1)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'instance': self.instance,
+                'subscribers': self._count,
+                'channels': len(self._subscribers),
+                'shared_backend': self.backend is not None,
+                'published': self.published,
+                'delivered': self.delivered,
+                'queued': self._queue.qsize()
+            }
+
+
+def _async_worker():
+    """True jika threading sudah di-patch gevent/eventlet (stream hanya memakai greenlet)."""
+    for module, check in (('gevent.monkey', 'is_module_patched'), ('eventlet.patcher', 'is_monkey_patched')):
+        try:
+            patched = getattr(__import__(module, fromlist=[check]), check)
+        except ImportError:
+            continue
+        if patched('threading'):
+            return True
+    return False
+
+
+def subscriber_limit(config):
+    """
+    Batas stream SSE per proses. Di worker thread (gthread, server werkzeug) setiap stream
+    memegang satu thread sampai EVENTS_STREAM_TIMEOUT, jadi paling banyak separuh
+    WEB_THREADS boleh dipakai stream; sisanya untuk request biasa. EVENTS_MAX_SUBSCRIBERS
+    penuh hanya berlaku di worker async (gevent/eventlet, atau EVENTS_ASYNC_WORKER=1 jika
+    app dimuat sebelum monkey patch, mis. gunicorn --preload).
+    """
+    limit = config.get('EVENTS_MAX_SUBSCRIBERS', 500)
+    if config.get('EVENTS_ASYNC_WORKER') or _async_worker():
+        return limit
+    return min(limit, config.get('WEB_THREADS', 8) // 2)
+
+
+def init_event_broker(app):
+    backend = None
+    url = app.config.get('EVENTS_BROKER_URL')
+    if url:
+        try:
+            backend = RedisEventBackend(url)
+        except ImportError:
+            app.logger.warning('EVENTS_BROKER_URL diset tetapi paket redis tidak terpasang; event hanya dikirim di proses ini')
+    broker = EventBroker(
+        app,
+        replay_size=app.config.get('EVENTS_REPLAY_SIZE', 1000),
+        max_queue=app.config.get('EVENTS_QUEUE_SIZE', 256),
+        max_subscribers=subscriber_limit(app.config),
+        backend=backend
+    )
+    app.extensions['event_broker'] = broker
+    return broker
+
+
+def get_event_broker():
+    return current_app.extensions['event_broker']
+
+
+def _reply_posts(session, replies):
+    """{post_id: (course_id, student_id)} untuk balasan baru; dari identity map, sisanya satu query."""
+    posts = {}
+    missing = set()
+    for reply in replies:
+        post = session.identity_map.get(identity_key(ForumPost, reply.post_id))
+        if post is not None and 'course_id' in post.__dict__:
+            posts[reply.post_id] = (post.course_id, post.student_id)
+        else:
+            missing.add(reply.post_id)
+    if missing:
+        rows = session.connection().execute(
+            select(ForumPost.id, ForumPost.course_id, ForumPost.student_id).where(ForumPost.id.in_(missing)))
+        posts.update({row.id: (row.course_id, row.student_id) for row in rows})
+    return posts
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    if not has_app_context() or 'event_broker' not in current_app.extensions:
+        return
+    pending = session.info.setdefault('event_bus_pending', [])
+
+    replies = [obj for obj in session.new if isinstance(obj, ForumReply)]
+    posts = _reply_posts(session, replies) if replies else {}
+    for reply in replies:
+        if reply.post_id not in posts:
+            continue
+        course_id, author_id = posts[reply.post_id]
+        # Penulis post ikut diberi tahu lewat channel pribadinya
+        channels = (f'post:{reply.post_id}', f'course:{course_id}', f'user:{author_id}')
+        pending.append((channels, 'forum.reply',
+                        {'post_id': reply.post_id, 'reply_id': reply.id, 'course_id': course_id, 'student_id': reply.student_id}))
+
+    for obj in session.new:
+        if isinstance(obj, ForumPost):
+            pending.append((f'course:{obj.course_id}', 'forum.post',
+                            {'post_id': obj.id, 'course_id': obj.course_id, 'student_id': obj.student_id, 'title': obj.title}))
+
+    for obj in session.dirty:
+        event_type = STATUS_EVENTS.get(type(obj))
+        if event_type is None:
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.has_changes():
+            continue
+        data = {'id': obj.id, 'status': obj.status, 'previous': history.deleted[0] if history.deleted else None}
+        if isinstance(obj, KRS):
+            data['course_id'] = obj.course_id
+        else:
+            data['title'] = obj.judul if isinstance(obj, Submission) else obj.title
+        pending.append((f'user:{obj.student_id}', event_type, data))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    pending = session.info.pop('event_bus_pending', None)
+    if not pending or not has_app_context() or 'event_broker' not in current_app.extensions:
+        return
+    broker = get_event_broker()
+    for channels, event_type, data in pending:
+        broker.publish(channels, event_type, data)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop('event_bus_pending', None)
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from flask import current_app, has_app_context, url_for
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.matkul import Video
+
+MODULE_EXTENSIONS = ('.pdf', '.doc', '.docx', '.ppt', '.pptx', '.zip')
+
+CatalogEntry = namedtuple('CatalogEntry', 'name title size mtime url')
+PlaylistEntry = namedtuple('PlaylistEntry', 'id title url')
+
+
+class DirectoryCatalog:
+    """
+    Daftar file di satu folder static (difilter ekstensi) beserta ukuran, mtime dan URL.
+
+    Folder di-stat paling sering sekali per `check_interval` detik; daftar hanya dibaca
+    ulang jika mtime folder berubah (file ditambah, dihapus atau di-rename). Cek mtime
+    dipakai alih-alih inotify karena juga berlaku untuk perubahan dari host lain di
+    network storage.
+    """
+
+    def __init__(self, root, static_dir, extensions, check_interval=5):
+        self.root = root
+        self.static_dir = static_dir
+        self.extensions = extensions
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.scans = 0
+        self._entries = None
+        self._mtime = None
+        self._next_check = 0.0
+
+    def entries(self):
+        """Tuple CatalogEntry urut nama. URL dibuat dengan url_for, jadi butuh request context saat scan."""
+        if self._entries is not None and time.monotonic() < self._next_check:
+            return self._entries
+        with self.lock:
+            if self._entries is not None and time.monotonic() < self._next_check:
+                return self._entries
+            try:
+                mtime = os.stat(self.root).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._entries is None or mtime != self._mtime:
+                self._entries = self._scan() if mtime is not None else ()
+                self._mtime = mtime
+                self.scans += 1
+            self._next_check = time.monotonic() + self.check_interval
+        return self._entries
+
+    def _scan(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for item in it:
+                if not item.name.lower().endswith(self.extensions) or not item.is_file():
+                    continue
+                stat = item.stat()
+                entries.append(CatalogEntry(
+                    name=item.name,
+                    title=os.path.splitext(item.name)[0],
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    url=url_for('static', filename=f'{self.static_dir}/{item.name}')
+                ))
+        entries.sort(key=lambda entry: entry.name)
+        return tuple(entries)
+
+    def invalidate(self):
+        with self.lock:
+            self._entries = None
+
+
+class FileCatalog:
+    """
+    Katalog bersama untuk halaman video dan unduhan e-learning: isi static/modul serta
+    playlist video dari database (id, judul, URL stream). static/videos tidak didaftar
+    karena hanya boleh diputar lewat endpoint stream yang mengecek KRS.
+
+    Playlist dibuang saat Video berubah di proses ini; `playlist_ttl` menjadi batas basi
+    untuk perubahan dari worker lain.
+    """
+
+    def __init__(self, static_folder, check_interval=5, playlist_ttl=300):
+        self.modules = DirectoryCatalog(os.path.join(static_folder, 'modul'), 'modul', MODULE_EXTENSIONS, check_interval)
+        self.playlist_ttl = playlist_ttl
+        self.lock = threading.Lock()
+        self._playlist = None
+        self._playlist_built_at = 0.0
+
+    def playlist(self):
+        """Tuple PlaylistEntry untuk semua Video, urut minggu lalu waktu upload."""
+        playlist = self._playlist
+        if playlist is not None and (not self.playlist_ttl or time.monotonic() - self._playlist_built_at < self.playlist_ttl):
+            return playlist
+        with self.lock:
+            if self._playlist is None or (self.playlist_ttl and time.monotonic() - self._playlist_built_at >= self.playlist_ttl):
+                self._playlist = self._build_playlist()
+                self._playlist_built_at = time.monotonic()
+            return self._playlist
+
+    def _build_playlist(self):
+        rows = db.session.execute(
+            select(Video.id, Video.judul, Video.video_path).order_by(Video.minggu, Video.uploaded_at, Video.id)
+        ).all()
+        playlist = []
+        for row in rows:
+            path = row.video_path or ''
+            if path.startswith(('http://', 'https://')):
+                url = path
+            else:
+                url = url_for('elearning.stream_video', video_id=row.id)
+            playlist.append(PlaylistEntry(row.id, row.judul or os.path.basename(path), url))
+        return tuple(playlist)
+
+    def invalidate_playlist(self):
+        with self.lock:
+            self._playlist = None
+
+    def warm(self):
+        """Isi semua cache (dipanggil saat startup; butuh app context, request context dibuat di sini)."""
+        with current_app.test_request_context():
+            self.modules.entries()
+            self.playlist()
+
+
+def init_file_catalog(app):
+    catalog = FileCatalog(
+        app.static_folder,
+        check_interval=app.config.get('FILE_CATALOG_CHECK_INTERVAL', 5),
+        playlist_ttl=app.config.get('FILE_CATALOG_PLAYLIST_TTL', 300)
+    )
+    app.extensions['file_catalog'] = catalog
+    return catalog
+
+
+def get_file_catalog():
+    return current_app.extensions['file_catalog']
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_video_changes(session, flush_context):
+    if any(isinstance(obj, Video) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['file_catalog_invalidate'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_playlist(session):
+    if not session.info.pop('file_catalog_invalidate', False):
+        return
+    if has_app_context() and 'file_catalog' in current_app.extensions:
+        current_app.extensions['file_catalog'].invalidate_playlist()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_video_changes(session):
+    session.info.pop('file_catalog_invalidate', None)
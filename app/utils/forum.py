@@ -0,0 +1,120 @@
+from collections import defaultdict
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from app import db
+from app.models.matkul import ForumPost, ForumReply
+from app.utils.pagination import keyset_paginate
+from app.utils.queries import forum_posts_with_relations, forum_replies_with_student
+
+# Thread terbaru dulu; index (course_id, last_activity_at, id) dan (last_activity_at, id)
+THREAD_ORDER = (ForumPost.last_activity_at, ForumPost.id)
+# Balasan urut waktu kirim; id naik sama dengan urutan created_at dan memakai index (post_id, id)
+REPLY_ORDER = (ForumReply.id,)
+COUNTER_ATTRIBUTES = ('replies_count', 'last_reply_at', 'last_activity_at')
+
+post_table = ForumPost.__table__
+reply_table = ForumReply.__table__
+
+
+def thread_page(course_ids, after=None, per_page=20):
+    """
+    Halaman thread (ForumPost + penulis + mata kuliah) untuk `course_ids`, urut aktivitas
+    terakhir (post baru atau balasan terakhir).
+
+    :raises InvalidCursor: cursor rusak
+    """
+    query = forum_posts_with_relations()
+    if len(course_ids) == 1:
+        query = query.filter(ForumPost.course_id == course_ids[0])
+    else:
+        query = query.filter(ForumPost.course_id.in_(course_ids))
+    return keyset_paginate(query, 'last_activity_at', THREAD_ORDER, after=after, per_page=per_page, descending=True)
+
+
+def reply_page(post_id, after=None, per_page=20):
+    """Halaman balasan satu thread (ForumReply + penulis), dari yang paling lama."""
+    query = forum_replies_with_student().filter(ForumReply.post_id == post_id)
+    return keyset_paginate(query, 'id', REPLY_ORDER, after=after, per_page=per_page)
+
+
+def _collect_reply_changes(session):
+    """
+    (balasan baru per post: (jumlah, created_at terakhir), post yang kehilangan balasan: jumlah).
+    """
+    added = defaultdict(lambda: [0, None])
+    removed = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, ForumReply):
+            entry = added[obj.post_id]
+            entry[0] += 1
+            if obj.created_at is not None and (entry[1] is None or obj.created_at > entry[1]):
+                entry[1] = obj.created_at
+    for obj in session.deleted:
+        if isinstance(obj, ForumReply):
+            removed[obj.post_id] += 1
+    return added, removed
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_reply_counters(session, flush_context):
+    """
+    Perbarui replies_count, last_reply_at dan last_activity_at di transaksi yang sama
+    dengan INSERT/DELETE balasan. UPDATE relatif (replies_count + n) mengunci baris post,
+    jadi balasan bersamaan ke thread yang sama tidak saling menimpa.
+    """
+    added, removed = _collect_reply_changes(session)
+    if not added and not removed:
+        return
+
+    connection = session.connection()
+    for post_id, (count, latest) in added.items():
+        if post_id in removed:
+            continue
+        last_reply = case(
+            (post_table.c.last_reply_at.is_(None), latest),
+            (post_table.c.last_reply_at < latest, latest),
+            else_=post_table.c.last_reply_at
+        )
+        last_activity = case(
+            (post_table.c.last_activity_at.is_(None), latest),
+            (post_table.c.last_activity_at < latest, latest),
+            else_=post_table.c.last_activity_at
+        )
+        connection.execute(post_table.update().where(post_table.c.id == post_id).values(
+            replies_count=func.coalesce(post_table.c.replies_count, 0) + count,
+            last_reply_at=last_reply,
+            last_activity_at=last_activity
+        ))
+
+    for post_id, count in removed.items():
+        # Balasan terakhir mungkin yang dihapus: ambil ulang MAX(created_at) lewat index (post_id, id)
+        latest = select(func.max(reply_table.c.created_at)).where(
+            reply_table.c.post_id == post_table.c.id).scalar_subquery()
+        connection.execute(post_table.update().where(post_table.c.id == post_id).values(
+            replies_count=func.coalesce(post_table.c.replies_count, 0) + added.get(post_id, (0,))[0] - count,
+            last_reply_at=latest,
+            last_activity_at=func.coalesce(latest, post_table.c.created_at)
+        ))
+
+    # Objek ForumPost yang sudah dimuat memakai nilai lama; muat ulang saat diakses
+    for post_id in set(added) | set(removed):
+        post = session.identity_map.get(identity_key(ForumPost, post_id))
+        if post is not None:
+            session.expire(post, COUNTER_ATTRIBUTES)
+
+
+def recount_forum_posts():
+    """Hitung ulang penghitung semua post dari forum_reply. Mengembalikan jumlah post yang dikoreksi."""
+    counts = select(func.count(reply_table.c.id)).where(reply_table.c.post_id == post_table.c.id).scalar_subquery()
+    latest = select(func.max(reply_table.c.created_at)).where(reply_table.c.post_id == post_table.c.id).scalar_subquery()
+    result = db.session.execute(post_table.update().where(
+        (func.coalesce(post_table.c.replies_count, -1) != counts)
+        | (func.coalesce(post_table.c.last_reply_at, post_table.c.created_at) != func.coalesce(latest, post_table.c.created_at))
+    ).values(
+        replies_count=counts,
+        last_reply_at=latest,
+        last_activity_at=func.coalesce(latest, post_table.c.created_at, post_table.c.last_activity_at)
+    ))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,881 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from flask import current_app, url_for
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models.matkul import ForumPost, Material, SearchChange, ThesisApplication, Video
+from app.utils.background import get_background_worker
+from app.utils.course_content import accessible_courses
+from app.utils.indonesian_text import TOKEN_PATTERN, analyze, stem
+from app.utils.pagination import InvalidCursor, KeysetPage, decode_cursor, encode_cursor
+from app.utils.search import ChangeLogCursor, log_search_changes
+
+try:
+    import fcntl
+except ImportError:  # Windows: hanya aman untuk satu proses server
+    fcntl = None
+
+MANIFEST = 'manifest.json'
+LOCK_FILE = 'write.lock'
+# Judul ikut dihitung dua kali agar kecocokan di judul lebih tinggi dari di isi
+TITLE_BOOST = 2
+# docnum = id << TYPE_BITS | kode jenis; satu ruang id untuk semua jenis dokumen
+TYPE_BITS = 3
+TYPE_MASK = (1 << TYPE_BITS) - 1
+MAX_TF = 255
+# Di bawah ini posting list cukup pendek untuk selalu dipindai, seberapa pun porsinya
+COMMON_TERM_MIN_DF = 1000
+
+Doc = namedtuple('Doc', 'terms length course owner')
+DocType = namedtuple('DocType', 'code model columns document attributes')
+
+
+def _forum_document(row):
+    return row.title, f'{row.content} {row.tags or ""}', row.course_id, row.student_id
+
+
+def _material_document(row):
+    return row.judul, row.deskripsi, row.course_id, row.uploaded_by
+
+
+def _thesis_document(row):
+    # Skripsi tidak terikat mata kuliah (course 0); aksesnya diatur lewat pemilik
+    return row.judul_skripsi, f'{row.abstrak} {row.peminatan}', 0, row.student_id
+
+
+DOC_TYPES = {
+    'forum_post': DocType(0, ForumPost,
+                          (ForumPost.id, ForumPost.course_id, ForumPost.student_id, ForumPost.title,
+                           ForumPost.content, ForumPost.tags),
+                          _forum_document, ('title', 'content', 'tags', 'course_id')),
+    'material': DocType(1, Material,
+                        (Material.id, Material.course_id, Material.uploaded_by, Material.judul, Material.deskripsi),
+                        _material_document, ('judul', 'deskripsi', 'course_id')),
+    'video': DocType(2, Video,
+                     (Video.id, Video.course_id, Video.uploaded_by, Video.judul, Video.deskripsi),
+                     _material_document, ('judul', 'deskripsi', 'course_id')),
+    'thesis': DocType(3, ThesisApplication,
+                      (ThesisApplication.id, ThesisApplication.student_id, ThesisApplication.judul_skripsi,
+                       ThesisApplication.abstrak, ThesisApplication.peminatan),
+                      _thesis_document, ('judul_skripsi', 'abstrak', 'peminatan')),
+}
+TYPE_NAMES = {spec.code: name for name, spec in DOC_TYPES.items()}
+MODEL_TYPES = {spec.model: name for name, spec in DOC_TYPES.items()}
+
+
+def docnum(entity, entity_id):
+    return entity_id << TYPE_BITS | DOC_TYPES[entity].code
+
+
+def split_docnum(number):
+    """docnum -> (nama jenis, id)"""
+    return TYPE_NAMES[number & TYPE_MASK], number >> TYPE_BITS
+
+
+def make_doc(spec, row):
+    title, body, course, owner = spec.document(row)
+    terms = analyze(title) * TITLE_BOOST + analyze(body)
+    return Doc(Counter(terms), len(terms), course, owner)
+
+
+def write_segment(directory, name, docs):
+    """
+    Tulis segmen immutable dari iterable (docnum, Doc). Dokumen disimpan urut docnum agar
+    bisa dicari dengan bisect; posting list per term disimpan urut ordinal sebagai uint32
+    (`.ords`) dan tf uint8 (`.tfs`) yang dibaca lewat mmap.
+
+    File memakai urutan byte mesin ini; index adalah cache lokal dan bisa dibangun ulang.
+
+    :return: jumlah dokumen
+    """
+    docnums, lengths, courses, owners = array('q'), array('I'), array('i'), array('i')
+    postings = {}
+    for number, doc in docs:
+        ordinal = len(docnums)
+        docnums.append(number)
+        lengths.append(doc.length)
+        courses.append(doc.course)
+        owners.append(doc.owner or 0)
+        for term, tf in doc.terms.items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = (array('I'), array('B'))
+            posting[0].append(ordinal)
+            posting[1].append(min(tf, MAX_TF))
+
+    order = sorted(range(len(docnums)), key=docnums.__getitem__)
+    if any(old != new for new, old in enumerate(order)):
+        rank = array('I', bytes(4 * len(order)))
+        for new, old in enumerate(order):
+            rank[old] = new
+        docnums, lengths, courses, owners = (array(values.typecode, (values[old] for old in order))
+                                             for values in (docnums, lengths, courses, owners))
+        for term, (ords, tfs) in postings.items():
+            # Posting list tetap urut ordinal agar bisa dicari dengan bisect saat query
+            pairs = sorted(zip((rank[ordinal] for ordinal in ords), tfs))
+            postings[term] = (array('I', (ordinal for ordinal, _ in pairs)), array('B', (tf for _, tf in pairs)))
+
+    path = os.path.join(directory, name)
+    with open(path + '.docs', 'wb') as docs_file:
+        for values in (docnums, lengths, courses, owners):
+            values.tofile(docs_file)
+        _sync_file(docs_file)
+    start = 0
+    with open(path + '.ords', 'wb') as ords_file, open(path + '.tfs', 'wb') as tfs_file, \
+            open(path + '.terms', 'w', encoding='utf-8') as terms_file:
+        for term in sorted(postings):
+            ords, tfs = postings[term]
+            ords.tofile(ords_file)
+            tfs.tofile(tfs_file)
+            terms_file.write(f'{term}\t{len(ords)}\t{start}\n')
+            start += len(ords)
+        for handle in (ords_file, tfs_file, terms_file):
+            _sync_file(handle)
+    return len(docnums)
+
+
+def _sync_file(handle):
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
+def _map_file(path):
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Segment:
+    """Satu segmen di disk: tabel dokumen di memori, kamus term, posting list lewat mmap."""
+
+    def __init__(self, directory, name, doc_count):
+        self.name = name
+        self.deletes_file = None
+        self.deleted = set()
+        path = os.path.join(directory, name)
+        with open(path + '.docs', 'rb') as docs_file:
+            self.docnums, self.lengths, self.courses, self.owners = (array(typecode) for typecode in 'qIii')
+            for values in (self.docnums, self.lengths, self.courses, self.owners):
+                values.fromfile(docs_file, doc_count)
+        self.terms = {}
+        with open(path + '.terms', encoding='utf-8') as terms_file:
+            for line in terms_file:
+                term, df, start = line.rstrip('\n').split('\t')
+                self.terms[term] = (int(df), int(start))
+        self._ords = _map_file(path + '.ords')
+        self._tfs = _map_file(path + '.tfs')
+        self.total_length = sum(self.lengths)
+
+    def __len__(self):
+        return len(self.docnums)
+
+    @property
+    def live_docs(self):
+        return len(self.docnums) - len(self.deleted)
+
+    @property
+    def live_length(self):
+        return self.total_length - sum(self.lengths[ordinal] for ordinal in self.deleted)
+
+    def load_deletes(self, directory, deletes_file, force=False):
+        if deletes_file == self.deletes_file and not force:
+            return
+        deleted = array('I')
+        if deletes_file:
+            with open(os.path.join(directory, deletes_file), 'rb') as handle:
+                deleted.frombytes(handle.read())
+        self.deleted = set(deleted)
+        self.deletes_file = deletes_file
+
+    def ordinal(self, number):
+        index = bisect_left(self.docnums, number)
+        if index < len(self.docnums) and self.docnums[index] == number:
+            return index
+        return None
+
+    def df(self, term):
+        entry = self.terms.get(term)
+        return entry[0] if entry else 0
+
+    def postings(self, term):
+        """(ordinal array, tf bytes) atau None."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        df, start = entry
+        ords = array('I')
+        ords.frombytes(self._ords[start * 4:(start + df) * 4])
+        return ords, self._tfs[start:start + df]
+
+    def documents(self, deleted=None):
+        """
+        Dokumen hidup sebagai (docnum, Doc); dipakai saat menggabungkan segmen.
+
+        :param deleted: set ordinal yang dilewati, default tombstone segmen saat ini
+        """
+        deleted = self.deleted if deleted is None else deleted
+        terms = {ordinal: {} for ordinal in range(len(self.docnums)) if ordinal not in deleted}
+        for term in self.terms:
+            ords, tfs = self.postings(term)
+            for ordinal, tf in zip(ords, tfs):
+                doc_terms = terms.get(ordinal)
+                if doc_terms is not None:
+                    doc_terms[term] = tf
+        for ordinal, doc_terms in terms.items():
+            yield self.docnums[ordinal], Doc(doc_terms, self.lengths[ordinal], self.courses[ordinal], self.owners[ordinal])
+
+
+class FulltextIndex:
+    """
+    Index full-text BM25 untuk isi forum, deskripsi materi/video dan abstrak skripsi.
+
+    Data di disk (FULLTEXT_INDEX_DIR) berupa segmen immutable ditambah file tombstone per
+    segmen, dirangkum `manifest.json` yang diganti secara atomik (os.replace). Perubahan
+    dari hook tulis model masuk ke log search_change; setiap proses menerapkan log sejak
+    posisi manifest (id terakhir plus celah, lihat ChangeLogCursor) ke memtable di memori. Jika memtable melewati
+    FULLTEXT_FLUSH_DOCS, worker background satu proses (kunci file `write.lock`) menulisnya
+    menjadi segmen baru dan menggabungkan segmen kecil; proses lain memuat ulang saat mtime
+    manifest berubah. Request tidak pernah menulis ke disk (lihat `maintain`).
+
+    Pencarian memegang `lock` selama scoring. Scoring murni CPU dan tertahan GIL, jadi
+    menjalankannya paralel di thread lain tidak lebih cepat.
+    """
+
+    def __init__(self, directory, flush_docs=2000, max_segments=8, segment_docs=200000, k1=1.2, b=0.75,
+                 common_ratio=0.1, gap_seconds=300):
+        self.directory = directory
+        self.gap_seconds = gap_seconds
+        self.common_ratio = common_ratio
+        self.flush_docs = flush_docs
+        self.max_segments = max_segments
+        self.segment_docs = segment_docs
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        self.segments = []
+        self.generation = None
+        self.manifest_version = None
+        self.changes = ChangeLogCursor(gap_seconds=gap_seconds)
+        self.maintenance_queued = False
+        self._reset_memtable()
+
+    def _reset_memtable(self):
+        self.memtable = {}        # docnum -> Doc (dokumen baru/berubah sejak manifest)
+        self.mem_postings = {}    # term -> set(docnum) di memtable
+        self.dirty_segments = set()
+        self.pending = 0
+
+    # -- manifest dan segmen -------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path(MANIFEST), encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(LOCK_FILE), 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def load(self):
+        """
+        Muat manifest terbaru; segmen yang sudah terbuka dipakai ulang. Memtable dikosongkan
+        dan diisi lagi oleh `sync` dari log sejak posisi log di manifest.
+
+        :return: False jika index belum pernah dibangun
+        """
+        with self.lock:
+            for _ in range(3):
+                try:
+                    version = self._manifest_version()
+                except FileNotFoundError:
+                    return False
+                manifest = self._read_manifest()
+                if manifest is None:
+                    return False
+                opened = {segment.name: segment for segment in self.segments}
+                try:
+                    segments = []
+                    for entry in manifest['segments']:
+                        segment = opened.get(entry['name']) or Segment(self.directory, entry['name'], entry['docs'])
+                        # Tombstone yang belum ditulis dibuang; `sync` menerapkannya lagi dari log
+                        segment.load_deletes(self.directory, entry.get('deletes'), force=segment.name in self.dirty_segments)
+                        segments.append(segment)
+                except FileNotFoundError:
+                    # Penulis lain baru saja mengganti manifest dan membersihkan file lama
+                    continue
+                self.segments = segments
+                self.generation = manifest['generation']
+                self.manifest_version = version
+                self.changes = ChangeLogCursor(manifest['last_change_id'], manifest.get('change_gaps'), self.gap_seconds)
+                self._reset_memtable()
+                return True
+            raise RuntimeError('Manifest index full-text terus berubah saat dimuat')
+
+    def _manifest_version(self):
+        # os.replace membuat inode baru, jadi (inode, mtime) berubah setiap manifest ditulis
+        stat = os.stat(self._path(MANIFEST))
+        return stat.st_ino, stat.st_mtime_ns
+
+    def is_current(self):
+        try:
+            return self._manifest_version() == self.manifest_version
+        except FileNotFoundError:
+            return False
+
+    def _commit_manifest(self, segments, deletes, changes, generation):
+        manifest = {
+            'version': 1,
+            'generation': generation,
+            **changes.to_dict(),
+            'segments': [{'name': name, 'docs': count, 'deletes': deletes.get(name)} for name, count in segments]
+        }
+        staging = self._path(MANIFEST + '.tmp')
+        with open(staging, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle)
+            _sync_file(handle)
+        os.replace(staging, self._path(MANIFEST))
+        self._remove_unreferenced(manifest)
+
+    def _remove_unreferenced(self, manifest):
+        referenced = {MANIFEST, LOCK_FILE}
+        for entry in manifest['segments']:
+            referenced.update(entry['name'] + suffix for suffix in ('.docs', '.terms', '.ords', '.tfs'))
+            if entry.get('deletes'):
+                referenced.add(entry['deletes'])
+        # Proses lain yang masih memakai mmap file lama tetap aman (inode baru hilang saat ditutup)
+        for name in os.listdir(self.directory):
+            if name.startswith('seg-') and name not in referenced:
+                os.remove(self._path(name))
+
+    # -- memtable ------------------------------------------------------------------
+
+    def _forget(self, number):
+        old = self.memtable.pop(number, None)
+        if old is not None:
+            for term in old.terms:
+                bucket = self.mem_postings.get(term)
+                if bucket is not None:
+                    bucket.discard(number)
+                    if not bucket:
+                        del self.mem_postings[term]
+        for segment in self.segments:
+            ordinal = segment.ordinal(number)
+            if ordinal is not None and ordinal not in segment.deleted:
+                segment.deleted.add(ordinal)
+                self.dirty_segments.add(segment.name)
+
+    def apply(self, documents):
+        """Terapkan {docnum: Doc atau None (dihapus)} ke memtable dan tombstone segmen."""
+        with self.lock:
+            for number, doc in documents.items():
+                self._forget(number)
+                if doc is not None:
+                    self.memtable[number] = doc
+                    for term in doc.terms:
+                        self.mem_postings.setdefault(term, set()).add(number)
+                self.pending += 1
+
+    def stats(self):
+        """(jumlah dokumen hidup, rata-rata panjang dokumen)"""
+        count = sum(segment.live_docs for segment in self.segments) + len(self.memtable)
+        length = sum(segment.live_length for segment in self.segments) + sum(doc.length for doc in self.memtable.values())
+        return count, (length / count if count else 0.0)
+
+    # -- penulisan -----------------------------------------------------------------
+
+    def _next_name(self, generation, suffix=''):
+        return f'seg-{generation:08d}{suffix}'
+
+    def _manifest_changed(self):
+        manifest = self._read_manifest()
+        return manifest is None or manifest['generation'] != self.generation
+
+    def flush(self):
+        """
+        Tulis memtable sebagai segmen baru dan tombstone segmen lama, lalu gabungkan segmen
+        kecil jika jumlahnya melebihi max_segments. Jika proses lain sudah lebih dulu
+        menulis manifest baru, state dimuat ulang (memtable diisi lagi oleh `sync`).
+
+        Hanya dipanggil dari `maintain` (worker background atau CLI). Snapshot memtable
+        diambil di bawah `lock`, penulisan file berjalan tanpa `lock` sehingga pencarian
+        tidak menunggu; perubahan yang masuk selama itu diputar ulang dari log setelah
+        manifest dimuat.
+
+        :return: True jika manifest baru ditulis oleh proses ini
+        """
+        with self._write_lock():
+            with self.lock:
+                if self._manifest_changed():
+                    self.load()
+                    return False
+                generation = self.generation + 1
+                changes = ChangeLogCursor(self.changes.last_id, self.changes.gaps, self.gap_seconds)
+                segments = [(segment.name, len(segment)) for segment in self.segments]
+                deletes = {segment.name: segment.deletes_file for segment in self.segments if segment.deletes_file}
+                tombstones = {segment.name: sorted(segment.deleted) for segment in self.segments
+                              if segment.name in self.dirty_segments}
+                memtable = sorted(self.memtable.items())
+            for segment_name, deleted in tombstones.items():
+                name = f'{segment_name}.{generation:08d}.del'
+                with open(self._path(name), 'wb') as handle:
+                    array('I', deleted).tofile(handle)
+                    _sync_file(handle)
+                deletes[segment_name] = name
+            if memtable:
+                name = self._next_name(generation)
+                segments.append((name, write_segment(self.directory, name, memtable)))
+            with self.lock:
+                self._commit_manifest(segments, deletes, changes, generation)
+                self.load()
+            if len(self.segments) > self.max_segments:
+                self._merge_small()
+            return True
+
+    def _merge_small(self):
+        """
+        Gabungkan segmen kecil (< segment_docs dokumen, yaitu hasil flush dan merge
+        sebelumnya) serta segmen yang lebih dari separuhnya terhapus menjadi satu segmen
+        tanpa dokumen terhapus. Segmen penuh hasil build dengan sedikit tombstone tidak
+        ikut ditulis ulang. Dipanggil dari `flush` saat kunci tulis masih dipegang.
+        """
+        with self.lock:
+            candidates = [segment for segment in self.segments
+                          if len(segment) < self.segment_docs or segment.live_docs * 2 < len(segment)]
+            if len(candidates) < 2:
+                return
+            manifest = self._read_manifest()
+            changes = ChangeLogCursor(manifest['last_change_id'], manifest.get('change_gaps'), self.gap_seconds)
+            generation = self.generation + 1
+            merged = [(segment, set(segment.deleted)) for segment in candidates]
+        name = self._next_name(generation, '-m')
+        count = write_segment(self.directory, name,
+                              (item for segment, deleted in merged for item in segment.documents(deleted)))
+        merged_names = {segment.name for segment in candidates}
+        with self.lock:
+            remaining = [segment for segment in self.segments if segment.name not in merged_names]
+            segments = [(segment.name, len(segment)) for segment in remaining]
+            if count:
+                segments.append((name, count))
+            deletes = {segment.name: segment.deletes_file for segment in remaining if segment.deletes_file}
+            # Tombstone baru di memori yang belum ditulis hilang bersama segmen lama; `sync`
+            # memutarnya ulang dari log sejak posisi manifest
+            self._commit_manifest(segments, deletes, changes, generation)
+            self.load()
+
+    def build(self, rebuild=True, batch_size=2000):
+        """
+        Bangun index dari database (butuh app context), dibagi per segment_docs dokumen
+        agar memori tetap terbatas. Hanya dari CLI atau worker background: pada data besar
+        build memakan waktu beberapa menit. Selama build pencarian di proses ini tetap
+        memakai index lama (atau hasil kosong jika belum ada).
+
+        :param rebuild: False untuk melewati build jika proses lain sudah membangunnya
+        """
+        with self._write_lock():
+            manifest = self._read_manifest()
+            if manifest is not None and not rebuild:
+                self.load()
+                return
+            generation = (manifest['generation'] if manifest else 0) + 1
+            # Posisi log diambil sebelum membaca data agar tidak ada perubahan yang terlewat
+            changes = ChangeLogCursor.start(self.gap_seconds)
+            documents = _database_documents(batch_size)
+            segments = []
+            while True:
+                name = self._next_name(generation, f'-{len(segments):04d}')
+                count = write_segment(self.directory, name, islice(documents, self.segment_docs))
+                # Segmen kosong (sisa pembagian) tidak dicatat dan ikut dibersihkan
+                if count or not segments:
+                    segments.append((name, count))
+                if count < self.segment_docs:
+                    break
+            with self.lock:
+                self._commit_manifest(segments, {}, changes, generation)
+                self.load()
+
+    def maintain(self, force_flush=False):
+        """
+        Pekerjaan tulis index: build jika belum ada, lalu terapkan log dan flush jika
+        memtable melewati flush_docs (atau selalu jika `force_flush`).
+        """
+        if not self.is_current() and not self.load():
+            self.build(rebuild=False)
+        self.sync()
+        if force_flush or self.pending >= self.flush_docs:
+            while not self.flush():
+                # Proses lain baru saja menulis segmen; isi ulang memtable dari posisinya
+                self.sync()
+
+    # -- sinkronisasi dan pencarian -----------------------------------------------
+
+    def sync(self):
+        """
+        Terapkan log search_change sejak posisi terakhir (satu query jika tidak ada
+        perubahan) dan muat ulang jika proses lain menulis manifest baru. Tidak pernah
+        menulis ke disk; build dan flush dikerjakan `maintain`.
+
+        :return: False jika index belum pernah dibangun
+        """
+        with self.lock:
+            if not self.is_current() and not self.load():
+                return False
+            changed = {}
+            for _, entity, entity_id in self.changes.read():
+                if entity in DOC_TYPES:
+                    changed.setdefault(entity, set()).add(entity_id)
+            if changed:
+                # Dokumen dimuat ulang dari database, jadi perubahan yang terbaca dua kali tetap aman
+                self.apply(load_documents(changed))
+            return True
+
+    def needs_maintenance(self):
+        return self.generation is None or self.pending >= self.flush_docs
+
+    def search(self, query, limit, types=None, course_ids=None, thesis_owner=None):
+        """
+        Ranking BM25 (OR antar term) dengan filter akses.
+
+        Term yang muncul di lebih dari `common_ratio` dokumen (mis. "data" di forum
+        informatika) hanya menambah skor dokumen yang sudah cocok dengan term lain, seperti
+        CommonTermsQuery Lucene: posting list panjangnya tidak dipindai, cukup dicari per
+        kandidat dengan bisect. Jika semua term umum, term paling jarang yang dipindai.
+
+        :param types: set nama jenis dokumen, None untuk semua
+        :param course_ids: set id mata kuliah yang boleh dilihat, None untuk semua
+        :param thesis_owner: None = skripsi tidak ikut, 0 = semua skripsi, id user = hanya miliknya
+        :return: ([(skor, docnum)] urut skor, jumlah dokumen yang cocok dengan term tidak umum)
+        """
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms or limit <= 0:
+            return [], 0
+        codes = {DOC_TYPES[name].code for name in types} if types else None
+
+        def allowed(number, course, owner):
+            if codes is not None and number & TYPE_MASK not in codes:
+                return False
+            if course:
+                return course_ids is None or course in course_ids
+            return thesis_owner is not None and (thesis_owner == 0 or owner == thesis_owner)
+
+        with self.lock:
+            count, average = self.stats()
+            if not count:
+                return [], 0
+            k1 = self.k1
+            norm_base = k1 * (1 - self.b)
+            norm_length = k1 * self.b / average if average else 0.0
+            weighted = []
+            for term in terms:
+                df = sum(segment.df(term) for segment in self.segments) + len(self.mem_postings.get(term, ()))
+                if df:
+                    weighted.append((df, term, (k1 + 1) * math.log(1 + (count - df + 0.5) / (df + 0.5))))
+            if not weighted:
+                return [], 0
+            weighted.sort()
+            cutoff = max(COMMON_TERM_MIN_DF, count * self.common_ratio)
+            split = sum(1 for df, _, _ in weighted if df <= cutoff) or 1
+            scanned = [(term, weight) for _, term, weight in weighted[:split]]
+            common = [(term, weight) for _, term, weight in weighted[split:]]
+
+            # Tanpa batasan akses (admin, global) filter per dokumen dilewati
+            restricted = codes is not None or course_ids is not None or thesis_owner != 0
+            top = []
+            matched = 0
+
+            for segment in self.segments:
+                lengths = segment.lengths
+                scores = None
+                for term, weight in scanned:
+                    postings = segment.postings(term)
+                    if postings is None:
+                        continue
+                    if scores is None:
+                        scores = {ordinal: weight * tf / (tf + norm_base + norm_length * lengths[ordinal])
+                                  for ordinal, tf in zip(*postings)}
+                        continue
+                    get = scores.get
+                    for ordinal, tf in zip(*postings):
+                        scores[ordinal] = get(ordinal, 0.0) + weight * tf / (tf + norm_base + norm_length * lengths[ordinal])
+                if not scores:
+                    continue
+                for term, weight in common:
+                    postings = segment.postings(term)
+                    if postings is None:
+                        continue
+                    ords, tfs = postings
+                    size = len(ords)
+                    if len(scores) * size.bit_length() < size:
+                        for ordinal in scores:
+                            position = bisect_left(ords, ordinal)
+                            if position < size and ords[position] == ordinal:
+                                tf = tfs[position]
+                                scores[ordinal] += weight * tf / (tf + norm_base + norm_length * lengths[ordinal])
+                    else:
+                        for ordinal, tf in zip(ords, tfs):
+                            if ordinal in scores:
+                                scores[ordinal] += weight * tf / (tf + norm_base + norm_length * lengths[ordinal])
+
+                deleted = segment.deleted
+                docnums = segment.docnums
+                if restricted:
+                    courses, owners = segment.courses, segment.owners
+                    candidates = [ordinal for ordinal in scores if ordinal not in deleted
+                                  and allowed(docnums[ordinal], courses[ordinal], owners[ordinal])]
+                elif deleted:
+                    candidates = [ordinal for ordinal in scores if ordinal not in deleted]
+                else:
+                    candidates = scores
+                matched += len(candidates)
+                top.extend((scores[ordinal], docnums[ordinal])
+                           for ordinal in heapq.nlargest(limit, candidates, key=scores.__getitem__))
+
+            scores = {}
+            for term, weight in scanned:
+                for number in self.mem_postings.get(term, ()):
+                    doc = self.memtable[number]
+                    tf = min(doc.terms[term], MAX_TF)
+                    scores[number] = scores.get(number, 0.0) + weight * tf / (tf + norm_base + norm_length * doc.length)
+            for term, weight in common:
+                for number in scores:
+                    doc = self.memtable[number]
+                    tf = min(doc.terms.get(term, 0), MAX_TF)
+                    if tf:
+                        scores[number] += weight * tf / (tf + norm_base + norm_length * doc.length)
+            for number, score in scores.items():
+                doc = self.memtable[number]
+                if allowed(number, doc.course, doc.owner):
+                    matched += 1
+                    top.append((score, number))
+
+        # Skor sama: docnum kecil (dokumen lebih lama) di depan agar urutan stabil antar halaman
+        top.sort(key=lambda item: (-item[0], item[1]))
+        return top[:limit], matched
+
+
+def _database_documents(batch_size):
+    """Semua dokumen di database sebagai (docnum, Doc), dibaca bertahap per jenis."""
+    for entity, spec in DOC_TYPES.items():
+        query = db.session.query(*spec.columns).order_by(spec.model.id).execution_options(yield_per=batch_size)
+        for row in query:
+            yield docnum(entity, row.id), make_doc(spec, row)
+
+
+def load_documents(changed):
+    """{entity: set(id)} -> {docnum: Doc, atau None jika barisnya sudah dihapus}"""
+    documents = {}
+    for entity, ids in changed.items():
+        spec = DOC_TYPES[entity]
+        ids = sorted(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = {row.id: row for row in db.session.query(*spec.columns).filter(spec.model.id.in_(chunk))}
+            for entity_id in chunk:
+                row = rows.get(entity_id)
+                documents[docnum(entity, entity_id)] = make_doc(spec, row) if row is not None else None
+    return documents
+
+
+def init_fulltext_index(app):
+    index = FulltextIndex(
+        app.config['FULLTEXT_INDEX_DIR'],
+        flush_docs=app.config.get('FULLTEXT_FLUSH_DOCS', 2000),
+        max_segments=app.config.get('FULLTEXT_MAX_SEGMENTS', 8),
+        segment_docs=app.config.get('FULLTEXT_SEGMENT_DOCS', 200000),
+        k1=app.config.get('FULLTEXT_BM25_K1', 1.2),
+        b=app.config.get('FULLTEXT_BM25_B', 0.75),
+        common_ratio=app.config.get('FULLTEXT_COMMON_TERM_RATIO', 0.1),
+        gap_seconds=app.config.get('SEARCH_CHANGE_GAP_SECONDS', 300)
+    )
+    app.extensions['fulltext_index'] = index
+    return index
+
+
+def get_fulltext_index():
+    """
+    Index proses ini, sudah disinkronkan dengan log perubahan. Request hanya membaca log;
+    build (index belum ada) dan flush memtable diantrekan ke worker background, dan
+    sampai build selesai pencarian mengembalikan hasil kosong.
+    """
+    index = current_app.extensions['fulltext_index']
+    with index.lock:
+        fresh = index.generation is None
+        if index.sync() and fresh:
+            _warn_if_log_pruned(index)
+        if index.needs_maintenance() and not index.maintenance_queued:
+            index.maintenance_queued = get_background_worker().submit(_maintain_fulltext_index)
+    return index
+
+
+def _maintain_fulltext_index():
+    index = current_app.extensions['fulltext_index']
+    try:
+        index.maintain()
+    finally:
+        index.maintenance_queued = False
+
+
+def _warn_if_log_pruned(index):
+    oldest = db.session.query(func.min(SearchChange.id)).scalar()
+    if oldest is not None and oldest > index.changes.last_id + 1:
+        current_app.logger.warning(
+            'Log search_change sudah dipangkas melewati posisi index full-text (%s < %s); '
+            'jalankan scripts/build_fulltext_index.py', index.changes.last_id, oldest)
+
+
+def snippet(text, terms, width=200):
+    """Potongan teks di sekitar kemunculan pertama term query (dicocokkan setelah stemming)."""
+    text = ' '.join((text or '').split())
+    if len(text) <= width:
+        return text
+    start = 0
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        if stem(match.group()) in terms:
+            start = max(0, match.start() - width // 4)
+            break
+    end = min(len(text), start + width)
+    start = max(0, end - width)
+    return ('…' if start else '') + text[start:end].strip() + ('…' if end < len(text) else '')
+
+
+def _load_results(hits, terms):
+    """Muat baris untuk hasil pencarian, satu query per jenis dokumen, urut sesuai ranking."""
+    by_type = {}
+    for _, number in hits:
+        entity, entity_id = split_docnum(number)
+        by_type.setdefault(entity, []).append(entity_id)
+    rows = {}
+    for entity, ids in by_type.items():
+        spec = DOC_TYPES[entity]
+        for row in db.session.query(*spec.columns).filter(spec.model.id.in_(ids)):
+            rows[docnum(entity, row.id)] = (entity, row)
+
+    results = []
+    for score, number in hits:
+        if number not in rows:
+            # Baris terhapus tetapi perubahannya belum masuk index
+            continue
+        entity, row = rows[number]
+        title, body, course, owner = DOC_TYPES[entity].document(row)
+        results.append({
+            'type': entity,
+            'id': row.id,
+            'title': title,
+            'snippet': snippet(body, terms),
+            'course_id': course or None,
+            'owner_id': owner,
+            'score': round(score, 4)
+        })
+    return results
+
+
+def search_documents(query, after=None, per_page=10, types=None, course_ids=None, thesis_owner=None):
+    """
+    Cari dokumen full-text dan kembalikan KeysetPage berisi dict hasil (type, id, title,
+    snippet, course_id, score). Seperti `search_keyset`, cursor menyimpan posisi di daftar
+    ranking karena skor relevansi tidak punya kunci unik yang stabil.
+
+    :raises InvalidCursor: jika cursor rusak atau bukan cursor pencarian
+    """
+    offset = 0
+    if after:
+        values = decode_cursor(after, 'relevance')
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise InvalidCursor('Invalid cursor')
+        offset = values[0]
+    index = get_fulltext_index()
+    hits, total = index.search(query, offset + per_page, types=types, course_ids=course_ids, thesis_owner=thesis_owner)
+    items = _load_results(hits[offset:], set(analyze(query)))
+    next_cursor = encode_cursor('relevance', [offset + per_page]) if offset + per_page < total else None
+    return KeysetPage(items, per_page, next_cursor, total)
+
+
+def search_scope(user, course_id=None):
+    """
+    Filter akses untuk `search_documents`. Forum, materi dan video hanya dari mata kuliah
+    yang bisa dilihat user (`accessible_courses`); skripsi hanya ikut di pencarian global,
+    semua untuk admin dan hanya milik sendiri untuk user lain (sama dengan halaman pengajuan).
+
+    :return: (argumen filter, {id: Course}), atau None jika course_id bukan milik user
+    """
+    courses = {course.id: course for course in accessible_courses(user)}
+    if course_id:
+        if course_id not in courses:
+            return None
+        return {'course_ids': {course_id}, 'thesis_owner': None}, courses
+    return {
+        'course_ids': None if user.role == 'admin' else set(courses),
+        'thesis_owner': 0 if user.role == 'admin' else user.id
+    }, courses
+
+
+def _result_url(item, user):
+    if item['type'] == 'forum_post':
+        return url_for('elearning.forum_post', post_id=item['id'])
+    if item['type'] == 'material':
+        return url_for('elearning.materi', course_id=item['course_id'])
+    if item['type'] == 'video':
+        return url_for('elearning.video', video_id=item['id'])
+    return url_for('pengajuan.status_pengajuan') if item['owner_id'] == user.id else None
+
+
+def search_for_user(user, query, course_id=None, types=None, after=None, per_page=10):
+    """
+    `search_documents` dengan filter akses user; hasil dilengkapi kode/nama mata kuliah dan url.
+
+    :return: KeysetPage, atau None jika course_id bukan milik user
+    :raises InvalidCursor: cursor rusak
+    """
+    scope = search_scope(user, course_id)
+    if scope is None:
+        return None
+    filters, courses = scope
+    page = search_documents(query, after=after, per_page=per_page, types=types, **filters)
+    for item in page.items:
+        course = courses.get(item['course_id'])
+        item['course_kode'] = course.kode if course else None
+        item['course_nama'] = course.nama if course else None
+        item['url'] = _result_url(item, user)
+    return page
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_fulltext_changes(session, flush_context):
+    changes = set()
+    for obj in session.new:
+        if type(obj) in MODEL_TYPES:
+            changes.add((MODEL_TYPES[type(obj)], obj.id))
+    for obj in session.deleted:
+        if type(obj) in MODEL_TYPES:
+            changes.add((MODEL_TYPES[type(obj)], obj.id))
+    for obj in session.dirty:
+        entity = MODEL_TYPES.get(type(obj))
+        if entity is not None:
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in DOC_TYPES[entity].attributes):
+                changes.add((entity, obj.id))
+    if changes:
+        log_search_changes(session.connection(), changes)
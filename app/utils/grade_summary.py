@@ -0,0 +1,178 @@
+from collections import defaultdict
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.models.matkul import Grade, GradeSummary
+
+summary_table = GradeSummary.__table__
+
+
+def sks(value):
+    """Total bobot disimpan sebagai Float; tampilkan 9 bukan 9.0 jika bulat."""
+    return int(value) if float(value).is_integer() else value
+
+
+def _old_value(obj, attr):
+    """Nilai atribut sebelum flush (nilai lama jika berubah, nilai sekarang jika tidak)."""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _collect_deltas(session):
+    """Hitung perubahan (bobot, nilai*bobot, jumlah MK) per (student_id, semester) dari Grade yang di-flush."""
+    deltas = defaultdict(lambda: [0.0, 0.0, 0])
+
+    def add(student_id, semester, nilai, bobot, sign):
+        if student_id is None or semester is None:
+            return
+        delta = deltas[(student_id, semester)]
+        delta[0] += sign * (bobot or 0)
+        delta[1] += sign * (nilai or 0) * (bobot or 0)
+        delta[2] += sign
+
+    for obj in session.new:
+        if isinstance(obj, Grade):
+            add(obj.student_id, obj.semester, obj.nilai, obj.bobot, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Grade):
+            add(_old_value(obj, 'student_id'), _old_value(obj, 'semester'),
+                _old_value(obj, 'nilai'), _old_value(obj, 'bobot'), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Grade) and session.is_modified(obj, include_collections=False):
+            add(_old_value(obj, 'student_id'), _old_value(obj, 'semester'),
+                _old_value(obj, 'nilai'), _old_value(obj, 'bobot'), -1)
+            add(obj.student_id, obj.semester, obj.nilai, obj.bobot, 1)
+
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def _refresh_cumulative(connection, student_id):
+    """Hitung ulang IP dan IPK kumulatif untuk semua semester seorang mahasiswa dari baris agregat."""
+    connection.execute(
+        summary_table.delete().where(
+            summary_table.c.student_id == student_id,
+            summary_table.c.course_count <= 0
+        )
+    )
+    rows = connection.execute(
+        select(summary_table.c.id, summary_table.c.total_bobot, summary_table.c.total_nilai_bobot)
+        .where(summary_table.c.student_id == student_id)
+        .order_by(summary_table.c.semester)
+    ).all()
+
+    cumulative_bobot = 0
+    cumulative_nilai_bobot = 0
+    for row in rows:
+        cumulative_bobot += row.total_bobot
+        cumulative_nilai_bobot += row.total_nilai_bobot
+        connection.execute(
+            summary_table.update().where(summary_table.c.id == row.id).values(
+                ip=row.total_nilai_bobot / row.total_bobot if row.total_bobot > 0 else 0,
+                ipk=cumulative_nilai_bobot / cumulative_bobot if cumulative_bobot > 0 else 0
+            )
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_grade_deltas(session, flush_context):
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+
+    connection = session.connection()
+    for (student_id, semester), (bobot, nilai_bobot, count) in deltas.items():
+        update = summary_table.update().where(
+            summary_table.c.student_id == student_id,
+            summary_table.c.semester == semester
+        ).values(
+            total_bobot=summary_table.c.total_bobot + bobot,
+            total_nilai_bobot=summary_table.c.total_nilai_bobot + nilai_bobot,
+            course_count=summary_table.c.course_count + count
+        )
+        if connection.execute(update).rowcount:
+            continue
+        try:
+            # Savepoint: nilai pertama semester ini bisa di-insert bersamaan oleh request lain
+            with connection.begin_nested():
+                connection.execute(summary_table.insert().values(
+                    student_id=student_id,
+                    semester=semester,
+                    total_bobot=bobot,
+                    total_nilai_bobot=nilai_bobot,
+                    course_count=count
+                ))
+        except IntegrityError:
+            # Baris sudah dibuat transaksi lain (uq_grade_summary_student_semester), tambahkan delta ke sana
+            connection.execute(update)
+
+    for student_id in {student_id for student_id, _ in deltas}:
+        _refresh_cumulative(connection, student_id)
+
+
+def get_student_summary(student_id):
+    """Ambil ringkasan IP per semester dan IPK mahasiswa dari tabel agregat."""
+    rows = GradeSummary.query.filter_by(student_id=student_id).order_by(GradeSummary.semester).all()
+    return {
+        'semesters': {row.semester: row for row in rows},
+        'total_bobot': sks(sum(row.total_bobot for row in rows)),
+        'course_count': sum(row.course_count for row in rows),
+        'ipk': rows[-1].ipk if rows else 0
+    }
+
+
+def rebuild_grade_summary(student_ids=None, chunk_size=1000):
+    """
+    Bangun ulang tabel grade_summary dari tabel grade.
+
+    :param student_ids: Batasi rebuild ke mahasiswa tertentu; None berarti semua.
+    :param chunk_size: Jumlah baris per batch INSERT.
+    :return: Jumlah baris agregat yang ditulis.
+    """
+    delete = summary_table.delete()
+    aggregate = select(
+        Grade.student_id,
+        Grade.semester,
+        func.sum(Grade.bobot).label('total_bobot'),
+        func.sum(Grade.nilai * Grade.bobot).label('total_nilai_bobot'),
+        func.count(Grade.id).label('course_count')
+    ).group_by(Grade.student_id, Grade.semester).order_by(Grade.student_id, Grade.semester)
+
+    if student_ids is not None:
+        delete = delete.where(summary_table.c.student_id.in_(student_ids))
+        aggregate = aggregate.where(Grade.student_id.in_(student_ids))
+
+    db.session.execute(delete)
+
+    written = 0
+    batch = []
+    current_student = None
+    cumulative_bobot = cumulative_nilai_bobot = 0
+    for row in db.session.execute(aggregate):
+        if row.student_id != current_student:
+            current_student = row.student_id
+            cumulative_bobot = cumulative_nilai_bobot = 0
+        cumulative_bobot += row.total_bobot or 0
+        cumulative_nilai_bobot += row.total_nilai_bobot or 0
+        batch.append({
+            'student_id': row.student_id,
+            'semester': row.semester,
+            'total_bobot': row.total_bobot or 0,
+            'total_nilai_bobot': row.total_nilai_bobot or 0,
+            'course_count': row.course_count,
+            'ip': row.total_nilai_bobot / row.total_bobot if row.total_bobot else 0,
+            'ipk': cumulative_nilai_bobot / cumulative_bobot if cumulative_bobot > 0 else 0
+        })
+        if len(batch) >= chunk_size:
+            db.session.execute(summary_table.insert(), batch)
+            written += len(batch)
+            batch = []
+
+    if batch:
+        db.session.execute(summary_table.insert(), batch)
+        written += len(batch)
+
+    db.session.commit()
+    return written
@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models.user import User
+
+SNAPSHOT_FIELDS = ('id', 'nim', 'nama', 'email', 'program_studi', 'role', 'advisor_id', 'created_at')
+
+
+class UserSnapshot(UserMixin):
+    """
+    Salinan ringan User untuk `current_user`: hanya kolom identitas, tanpa session ORM.
+
+    Kode yang perlu mengubah data user harus memuat model aslinya lewat `to_model()`.
+    """
+
+    def __init__(self, **fields):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, fields.get(field))
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{field: getattr(user, field) for field in SNAPSHOT_FIELDS})
+
+    @property
+    def advisor(self):
+        return db.session.get(User, self.advisor_id) if self.advisor_id else None
+
+    def to_model(self):
+        return db.session.get(User, self.id)
+
+    def to_json(self):
+        data = {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+        if data['created_at']:
+            data['created_at'] = data['created_at'].isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw):
+        data = json.loads(raw)
+        if data.get('created_at'):
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+        return cls(**data)
+
+    def __repr__(self):
+        return f"UserSnapshot('{self.nim}', '{self.nama}', '{self.email}')"
+
+
+class RedisIdentityBackend:
+    """Backend bersama antar proses (opsional, butuh paket `redis`)."""
+
+    def __init__(self, url, ttl, prefix='siakad:identity:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id):
+        raw = self.client.get(f'{self.prefix}{user_id}')
+        return UserSnapshot.from_json(raw) if raw else None
+
+    def set(self, snapshot):
+        self.client.setex(f'{self.prefix}{snapshot.id}', self.ttl, snapshot.to_json())
+
+    def delete(self, user_id):
+        self.client.delete(f'{self.prefix}{user_id}')
+
+
+class IdentityCache:
+    """
+    Cache identitas user untuk `login_manager.user_loader`.
+
+    LRU in-process dengan TTL; jika ada backend bersama, miss lokal dicek ke backend
+    sebelum ke database. TTL lokal membatasi berapa lama proses lain bisa memakai data
+    lama setelah user diubah (invalidate hanya menjangkau proses ini dan backend).
+    """
+
+    def __init__(self, max_size=2048, ttl=60, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                snapshot, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return snapshot
+                del self._entries[user_id]
+
+        snapshot = None
+        if self.backend is not None:
+            try:
+                snapshot = self.backend.get(user_id)
+            except Exception:
+                current_app.logger.exception('Backend identity cache tidak bisa dibaca')
+        if snapshot is not None:
+            with self._lock:
+                self.shared_hits += 1
+        else:
+            started = time.perf_counter()
+            user = db.session.get(User, user_id)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.misses += 1
+                self.load_seconds += elapsed
+            if user is None:
+                return None
+            snapshot = UserSnapshot.from_user(user)
+            if self.backend is not None:
+                try:
+                    self.backend.set(snapshot)
+                except Exception:
+                    current_app.logger.exception('Backend identity cache tidak bisa ditulis')
+
+        self._store(snapshot)
+        return snapshot
+
+    def _store(self, snapshot):
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.backend is not None:
+            try:
+                self.backend.delete(user_id)
+            except Exception:
+                current_app.logger.exception('Backend identity cache tidak bisa dihapus')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            avg_load_ms = self.load_seconds * 1000 / self.misses if self.misses else 0.0
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'shared_backend': self.backend is not None,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                'avg_db_load_ms': round(avg_load_ms, 3),
+                # Perkiraan: setiap hit menghemat satu query load_user dengan durasi rata-rata miss
+                'db_ms_saved': round((self.hits + self.shared_hits) * avg_load_ms, 1),
+                'db_ms_saved_per_request': round((self.hits + self.shared_hits) * avg_load_ms / lookups, 3) if lookups else 0.0
+            }
+
+
+def init_identity_cache(app):
+    backend = None
+    url = app.config.get('IDENTITY_CACHE_REDIS_URL')
+    if url:
+        try:
+            backend = RedisIdentityBackend(url, app.config.get('IDENTITY_CACHE_SHARED_TTL', 300))
+        except ImportError:
+            app.logger.warning('IDENTITY_CACHE_REDIS_URL diset tetapi paket redis tidak terpasang; hanya cache lokal yang dipakai')
+    cache = IdentityCache(
+        max_size=app.config.get('IDENTITY_CACHE_MAX_SIZE', 2048),
+        ttl=app.config.get('IDENTITY_CACHE_TTL', 60),
+        backend=backend
+    )
+    app.extensions['identity_cache'] = cache
+    return cache
+
+
+def get_identity_cache():
+    return current_app.extensions['identity_cache']
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_changed_users(session, flush_context):
+    user_ids = session.info.setdefault('identity_cache_invalidate', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    user_ids = session.info.pop('identity_cache_invalidate', None)
+    if not user_ids or not has_app_context() or 'identity_cache' not in current_app.extensions:
+        return
+    cache = get_identity_cache()
+    for user_id in user_ids:
+        cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('identity_cache_invalidate', None)
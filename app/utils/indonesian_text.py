@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+# Kata fungsi bahasa Indonesia yang terlalu umum untuk membedakan dokumen
+STOPWORDS = frozenset('''
+ada adalah adanya agar akan akhirnya aku amat anda antara apa apakah apabila atas atau
+bagaimana bagi bahkan bahwa banyak beberapa begitu belum benar berapa bisa boleh bukan
+dalam dan dapat dari daripada dengan di dia hal hanya harus hingga ia ialah ini itu
+jadi jika juga kalau kami kamu kan karena ke kemudian kenapa kepada ketika kita lagi lah
+lain lalu maka mana masih mau melalui memang mengapa menjadi mereka misalnya mungkin
+namun nya oleh pada para pun saat saja sama sangat satu saya se sebagai sebelum sedang
+sehingga sejak seperti serta sesudah setelah siapa suatu sudah supaya tapi telah tentang
+tersebut tetapi tidak untuk walaupun yaitu yakni yang
+'''.split())
+
+PARTICLES = ('lah', 'kah', 'tah', 'pun')
+POSSESSIVES = ('nya', 'ku', 'mu')
+DERIVATION_SUFFIXES = ('kan', 'an')
+VOWELS = frozenset('aeiou')
+MIN_STEM = 3
+
+
+def _strip_prefix(word):
+    """
+    Satu lapis awalan (me-, pe-, ber-, ter-, di-, ke-, se-) dengan aturan peluluhan
+    sederhana: menulis -> tulis, memukul -> pukul, menyapu -> sapu, mengajar -> ajar.
+
+    :return: (kata tanpa awalan, True jika ada awalan yang dibuang)
+    """
+    for prefix in ('meng', 'peng'):
+        if word.startswith(prefix) and len(word) - 4 >= MIN_STEM:
+            return word[4:], True
+    for prefix in ('meny', 'peny'):
+        if word.startswith(prefix) and len(word) > 4 and word[4] in VOWELS:
+            return 's' + word[4:], True
+    for prefix in ('mem', 'pem'):
+        if word.startswith(prefix) and len(word) - 3 >= MIN_STEM:
+            rest = word[3:]
+            # memukul -> pukul, pemrograman -> programan; membaca -> baca
+            return ('p' + rest if rest[0] in VOWELS or rest[0] == 'r' else rest), True
+    for prefix in ('men', 'pen'):
+        if word.startswith(prefix) and len(word) - 3 >= MIN_STEM:
+            rest = word[3:]
+            return ('t' + rest if rest[0] in VOWELS else rest), True
+    if word.startswith('per') and len(word) > 3 and word[3] in VOWELS:
+        # pe- + kata berawalan r: perancangan -> rancang, perawat -> rawat
+        return word[2:], True
+    for prefix in ('ber', 'ter', 'per'):
+        if word.startswith(prefix) and len(word) - 3 >= MIN_STEM + 1:
+            return word[3:], True
+    if word.startswith('bel') and word[3:].startswith('ajar'):
+        return word[3:], True
+    for prefix in ('me', 'pe', 'be', 'di', 'ke', 'se'):
+        rest = word[2:]
+        # Kata dasar tidak diawali dua konsonan (kerjakan bukan ke- + rjakan)
+        if word.startswith(prefix) and len(rest) >= MIN_STEM + 1 and (rest[0] in VOWELS or rest[1] in VOWELS):
+            return rest, True
+    return word, False
+
+
+def _strip_suffix(word):
+    for suffix in DERIVATION_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM + 1:
+            return word[:-len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=200000)
+def stem(word):
+    """
+    Stemmer ringan bahasa Indonesia (urutan Nazief-Adriani tanpa kamus kata dasar):
+    partikel, kata ganti milik, akhiran -kan/-an, lalu awalan (maksimal dua lapis).
+
+    Tanpa kamus hasilnya tidak selalu kata dasar yang benar, tetapi konsisten untuk
+    dokumen dan query, jadi "pemrograman", "memprogram" dan "program" bertemu di satu term.
+    Akhiran -i tidak dibuang karena terlalu sering bagian dari kata dasar (materi, teliti).
+    """
+    if len(word) <= MIN_STEM + 1 or not word.isalpha():
+        return word
+    for particle in PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) > MIN_STEM:
+            word = word[:-len(particle)]
+            break
+    for possessive in POSSESSIVES:
+        if word.endswith(possessive) and len(word) - len(possessive) > MIN_STEM:
+            word = word[:-len(possessive)]
+            break
+
+    stripped, prefixed = _strip_prefix(_strip_suffix(word))
+    if not prefixed:
+        # Akhiran memotong terlalu banyak sehingga awalan tidak bisa dibuang (berjalan, perbaikan)
+        retry, prefixed = _strip_prefix(word)
+        if prefixed:
+            stripped = _strip_suffix(retry)
+    if prefixed:
+        stripped, _ = _strip_prefix(stripped)
+    return stripped
+
+
+def analyze(text):
+    """Teks -> list term (huruf kecil, tanpa stopword, sudah di-stem) sesuai urutan kemunculan."""
+    return [stem(token) for token in TOKEN_PATTERN.findall((text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
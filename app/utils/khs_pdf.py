@@ -0,0 +1,210 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+
+DEFAULT_PERIODE = 'Genap 2023/2024'
+
+# Style dibuat sekali per proses dan dipakai ulang untuk setiap dokumen
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+])
+
+GRADES_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+])
+
+_styles = None
+
+
+def get_styles():
+    """Stylesheet KHS (dibuat sekali per proses)."""
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle('KHSTitle', parent=styles['Heading1'], fontSize=18, spaceAfter=20, alignment=1))
+        styles.add(ParagraphStyle('KHSSubtitle', parent=styles['Heading2'], fontSize=14, spaceAfter=15, alignment=1))
+        _styles = styles
+    return _styles
+
+
+def build_khs_pdf(student, semester, grades, semester_summary, ipk, periode=DEFAULT_PERIODE):
+    """
+    Render satu KHS ke bytes PDF.
+
+    :param student: dict dengan key nama, nim, program_studi.
+    :param semester: Nomor semester yang dicetak.
+    :param grades: List dict dengan key kode, nama, bobot, nilai, grade.
+    :param semester_summary: dict dengan key ip, total_bobot, course_count (atau None).
+    :param ipk: IP kumulatif mahasiswa.
+    """
+    styles = get_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=50, bottomMargin=50)
+
+    story = []
+    story.append(Paragraph("Kartu Hasil Studi (KHS)", styles['KHSTitle']))
+    story.append(Paragraph(f"Semester {semester} - {periode}", styles['KHSSubtitle']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"Nama: {student['nama']}", styles['Normal']))
+    story.append(Paragraph(f"NIM: {student['nim']}", styles['Normal']))
+    story.append(Paragraph(f"Program Studi: {student['program_studi']}", styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    semester_ip = semester_summary['ip'] if semester_summary else 0
+    summary_data = [
+        ['IP Semester', f'{semester_ip:.2f}', 'Sangat Memuaskan'],
+        ['Total SKS', str(semester_summary['total_bobot']) if semester_summary else '0', 'Semester Ini'],
+        ['Mata Kuliah', str(semester_summary['course_count']) if semester_summary else '0', 'Lulus Semua'],
+        ['IP Kumulatif', f'{ipk:.2f}', 'Overall']
+    ]
+    summary_table = Table(summary_data, colWidths=[100, 80, 120])
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+
+    if grades:
+        story.append(Paragraph(f"Nilai Semester {semester}", styles['Heading3']))
+        story.append(Spacer(1, 8))
+        data = [['Kode', 'Mata Kuliah', 'SKS', 'Nilai', 'Bobot', 'Grade', 'Status']]
+        for grade in grades:
+            data.append([
+                grade['kode'] or 'N/A',
+                grade['nama'] or 'N/A',
+                str(grade['bobot']),
+                str(grade['nilai']),
+                f"{grade['nilai'] * grade['bobot']:.2f}",
+                grade['grade'],
+                'Lulus'
+            ])
+        table = Table(data, colWidths=[50, 150, 30, 40, 50, 40, 50])
+        table.setStyle(GRADES_TABLE_STYLE)
+        story.append(table)
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _render_payload(payload):
+    """Entry point worker: render payload dan kembalikan (nama file, bytes PDF)."""
+    pdf = build_khs_pdf(
+        payload['student'],
+        payload['semester'],
+        payload['grades'],
+        payload['summary'],
+        payload['ipk'],
+        payload['periode']
+    )
+    return f"KHS_{payload['student']['nim']}.pdf", pdf
+
+
+def collect_khs_payloads(semester, program_studi=None, periode=DEFAULT_PERIODE):
+    """
+    Ambil nilai satu angkatan untuk satu semester dalam satu query dan susun payload render per mahasiswa.
+    """
+    from app import db
+    from app.models.user import User
+    from app.models.matkul import Course, Grade, GradeSummary
+    from app.utils.grade_summary import sks
+
+    query = db.session.query(
+        User.id, User.nim, User.nama, User.program_studi,
+        Course.kode, Course.nama.label('course_nama'),
+        Grade.bobot, Grade.nilai, Grade.grade
+    ).join(Grade, Grade.student_id == User.id) \
+        .outerjoin(Course, Course.id == Grade.course_id) \
+        .filter(Grade.semester == semester)
+    if program_studi:
+        query = query.filter(User.program_studi == program_studi)
+
+    payloads = {}
+    for row in query.order_by(User.nim, Grade.id):
+        payload = payloads.get(row.id)
+        if payload is None:
+            payload = payloads[row.id] = {
+                'student': {'nim': row.nim, 'nama': row.nama, 'program_studi': row.program_studi},
+                'semester': semester,
+                'periode': periode,
+                'grades': [],
+                'summary': None,
+                'ipk': 0
+            }
+        payload['grades'].append({
+            'kode': row.kode,
+            'nama': row.course_nama,
+            'bobot': row.bobot,
+            'nilai': row.nilai,
+            'grade': row.grade
+        })
+
+    if payloads:
+        summaries = GradeSummary.query.filter(
+            GradeSummary.student_id.in_(list(payloads.keys()))
+        ).order_by(GradeSummary.student_id, GradeSummary.semester).all()
+        for summary in summaries:
+            payload = payloads[summary.student_id]
+            payload['ipk'] = summary.ipk  # baris terakhir = IPK kumulatif terbaru
+            if summary.semester == semester:
+                payload['summary'] = {
+                    'ip': summary.ip,
+                    'total_bobot': sks(summary.total_bobot),
+                    'course_count': summary.course_count
+                }
+
+    return list(payloads.values())
+
+
+def export_khs_zip(semester, output_path, program_studi=None, workers=None, chunksize=8, periode=DEFAULT_PERIODE):
+    """
+    Render KHS satu angkatan secara paralel dan tulis hasilnya ke arsip ZIP.
+
+    :param semester: Semester yang diekspor.
+    :param output_path: Lokasi file ZIP.
+    :param program_studi: Filter program studi (opsional).
+    :param workers: Jumlah proses render; 0 berarti render di proses ini.
+    :return: dict statistik (count, seconds, pdfs_per_second, path).
+    """
+    started = time.perf_counter()
+    payloads = collect_khs_payloads(semester, program_studi, periode)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.part"
+    count = 0
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        if workers == 0:
+            results = map(_render_payload, payloads)
+            for filename, pdf in results:
+                archive.writestr(filename, pdf)
+                count += 1
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for filename, pdf in executor.map(_render_payload, payloads, chunksize=chunksize):
+                    archive.writestr(filename, pdf)
+                    count += 1
+    os.replace(tmp_path, output_path)
+
+    seconds = time.perf_counter() - started
+    return {
+        'count': count,
+        'seconds': round(seconds, 3),
+        'pdfs_per_second': round(count / seconds, 2) if seconds > 0 else 0,
+        'path': output_path
+    }
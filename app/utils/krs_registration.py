@@ -0,0 +1,198 @@
+import hashlib
+import json
+import random
+import time
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from app import db
+from app.models.matkul import Course, CourseQuota, KRS, KRSSubmission
+from app.utils.schedule_index import EXCLUDED_KRS_STATUS
+
+quota_table = CourseQuota.__table__
+
+# Kode error MySQL yang aman diulang: deadlock dan lock wait timeout
+MYSQL_RETRYABLE_ERRORS = (1213, 1205)
+MAX_ATTEMPTS = 5
+MAX_TOKEN_LENGTH = 64
+
+
+class KRSRegistrationError(ValueError):
+    """Pengajuan KRS ditolak (kuota penuh, token dipakai ulang untuk isi berbeda, dll.)."""
+
+    def __init__(self, message, status_code=400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+def _fingerprint(course_ids):
+    return hashlib.sha256(json.dumps(course_ids).encode('utf-8')).hexdigest()
+
+
+def _is_retryable(error):
+    orig = getattr(error, 'orig', None)
+    if orig is None:
+        return False
+    if orig.args and orig.args[0] in MYSQL_RETRYABLE_ERRORS:
+        return True
+    # SQLite: writer lain masih memegang lock database
+    return 'database is locked' in str(orig)
+
+
+def _replay(token, student_id, fingerprint):
+    submission = KRSSubmission.query.filter_by(token=token).first()
+    if submission is None:
+        return None
+    if submission.student_id != student_id or submission.fingerprint != fingerprint:
+        raise KRSRegistrationError('Token pengajuan sudah dipakai untuk pengajuan lain', status_code=409)
+    result = json.loads(submission.response)
+    result['replayed'] = True
+    return result
+
+
+def _register_once(student_id, course_ids, semester, tahun_ajaran, token, fingerprint):
+    session = db.session
+    if token:
+        replayed = _replay(token, student_id, fingerprint)
+        if replayed is not None:
+            return replayed
+
+    # Kunci baris KRS mahasiswa ini agar dua pengajuan bersamaan tidak saling menimpa
+    existing = KRS.query.filter_by(
+        student_id=student_id,
+        semester=semester,
+        tahun_ajaran=tahun_ajaran
+    ).with_for_update().all()
+
+    requested = set(course_ids)
+    keep = {krs.course_id: krs for krs in existing if krs.status not in EXCLUDED_KRS_STATUS and krs.course_id in requested}
+    drop = [krs for krs in existing if keep.get(krs.course_id) is not krs]
+    release = {krs.course_id for krs in drop if krs.status not in EXCLUDED_KRS_STATUS}
+    take = sorted(requested - set(keep))
+
+    limited = set(session.execute(
+        select(quota_table.c.course_id).where(
+            quota_table.c.course_id.in_(sorted(release | set(take))),
+            quota_table.c.tahun_ajaran == tahun_ajaran
+        )
+    ).scalars())
+
+    # Urutan course_id yang sama di semua transaksi mengurangi deadlock antar baris kuota
+    for course_id in sorted(limited):
+        condition = (quota_table.c.course_id == course_id) & (quota_table.c.tahun_ajaran == tahun_ajaran)
+        if course_id in release:
+            session.execute(quota_table.update().where(condition, quota_table.c.terisi > 0)
+                            .values(terisi=quota_table.c.terisi - 1))
+            continue
+        result = session.execute(quota_table.update().where(condition, quota_table.c.terisi < quota_table.c.kapasitas)
+                                 .values(terisi=quota_table.c.terisi + 1))
+        if result.rowcount == 0:
+            session.rollback()
+            course = db.session.get(Course, course_id)
+            raise KRSRegistrationError(f'Kuota mata kuliah {course.kode} sudah penuh', status_code=409, course_id=course_id)
+
+    for krs in drop:
+        session.delete(krs)
+    for course_id in take:
+        session.add(KRS(
+            student_id=student_id,
+            course_id=course_id,
+            semester=semester,
+            tahun_ajaran=tahun_ajaran,
+            status='pending'
+        ))
+
+    result = {
+        'status': 'success',
+        'message': 'KRS berhasil diajukan',
+        'course_ids': course_ids,
+        'added': take,
+        'removed': sorted(release)
+    }
+    if token:
+        session.add(KRSSubmission(
+            token=token,
+            student_id=student_id,
+            tahun_ajaran=tahun_ajaran,
+            fingerprint=fingerprint,
+            response=json.dumps(result)
+        ))
+    session.commit()
+    return result
+
+
+def register_krs(student_id, course_ids, semester, tahun_ajaran, token=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Ajukan KRS mahasiswa dengan alokasi kursi atomik.
+
+    Kursi diambil lewat UPDATE bersyarat (terisi < kapasitas) pada course_quota, jadi
+    kuota tidak pernah terlampaui tanpa perlu SELECT ... FOR UPDATE di baris kuota.
+    Mata kuliah tanpa baris kuota dianggap tidak dibatasi. Baris KRS yang tetap dipilih
+    dipertahankan (status persetujuan tidak hilang); yang dilepas mengembalikan kursinya.
+
+    :param token: token idempotensi dari klien; pengajuan ulang dengan token yang sama
+                  mengembalikan hasil yang tersimpan tanpa mengubah data lagi
+    :return: dict hasil pengajuan
+    :raises KRSRegistrationError: kuota penuh atau token dipakai untuk isi berbeda
+    """
+    course_ids = sorted({int(course_id) for course_id in course_ids})
+    if token is not None and (not token or len(token) > MAX_TOKEN_LENGTH):
+        raise KRSRegistrationError(f'Token pengajuan harus 1-{MAX_TOKEN_LENGTH} karakter')
+    fingerprint = _fingerprint(course_ids)
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return _register_once(student_id, course_ids, semester, tahun_ajaran, token, fingerprint)
+        except IntegrityError:
+            db.session.rollback()
+            # Pengajuan lain dengan token yang sama sudah commit lebih dulu
+            replayed = _replay(token, student_id, fingerprint) if token else None
+            if replayed is None:
+                raise
+            return replayed
+        except DBAPIError as e:
+            db.session.rollback()
+            if not _is_retryable(e) or attempt == max_attempts:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def get_quotas(tahun_ajaran, course_ids=None):
+    query = CourseQuota.query.filter_by(tahun_ajaran=tahun_ajaran)
+    if course_ids is not None:
+        query = query.filter(CourseQuota.course_id.in_(course_ids))
+    return {quota.course_id: quota for quota in query}
+
+
+def recount_quotas(tahun_ajaran, course_ids=None):
+    """Hitung ulang `terisi` dari baris KRS yang tidak ditolak (mis. setelah KRS disetujui/ditolak massal)."""
+    counts = select(KRS.course_id, func.count(KRS.id)).where(
+        KRS.tahun_ajaran == tahun_ajaran,
+        KRS.status.notin_(EXCLUDED_KRS_STATUS)
+    ).group_by(KRS.course_id)
+    if course_ids is not None:
+        counts = counts.where(KRS.course_id.in_(course_ids))
+    counted = dict(db.session.execute(counts).all())
+
+    quotas = get_quotas(tahun_ajaran, course_ids)
+    for course_id, quota in quotas.items():
+        quota.terisi = counted.get(course_id, 0)
+    db.session.commit()
+    return {course_id: quota.terisi for course_id, quota in quotas.items()}
+
+
+def set_quota(course_id, tahun_ajaran, kapasitas):
+    """Atur kapasitas (None = tanpa batas) lalu sinkronkan `terisi` dengan KRS yang ada."""
+    quota = CourseQuota.query.filter_by(course_id=course_id, tahun_ajaran=tahun_ajaran).first()
+    if kapasitas is None:
+        if quota is not None:
+            db.session.delete(quota)
+            db.session.commit()
+        return None
+    if quota is None:
+        quota = CourseQuota(course_id=course_id, tahun_ajaran=tahun_ajaran, kapasitas=kapasitas, terisi=0)
+        db.session.add(quota)
+    quota.kapasitas = kapasitas
+    db.session.commit()
+    recount_quotas(tahun_ajaran, [course_id])
+    return quota
@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, and_, false, or_
+
+
+# Batas atas per_page untuk semua endpoint berhalaman
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_per_page(per_page, default=10, maximum=MAX_PER_PAGE):
+    """per_page dari query string -> 1..maximum; None (tidak dikirim/bukan angka) memakai default."""
+    if per_page is None:
+        per_page = default
+    return min(max(per_page, 1), maximum)
+
+
+def encode_cursor(order, values):
+    payload = json.dumps({'o': order, 'v': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order):
+    """Decode cursor opaque dari `encode_cursor`; cursor harus dibuat untuk urutan yang sama."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if payload.get('o') != order or not isinstance(values, list):
+        raise InvalidCursor('Cursor does not match the requested order')
+    return values
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _deserialize(column, value):
+    if value is not None and isinstance(column.type, DateTime):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor') from e
+    return value
+
+
+def _after_condition(columns, values, descending=False):
+    """
+    Kondisi keyset "baris setelah `values`" untuk urutan naik (atau turun) pada `columns`.
+
+    Ditulis sebagai OR/AND berantai (bukan row value) agar index komposit terpakai di MySQL
+    dan SQLite. NULL dianggap paling awal pada urutan ASC dan paling akhir pada DESC, sama
+    seperti di kedua database.
+    """
+    column, value = columns[0], values[0]
+    if value is None:
+        # Pada DESC tidak ada nilai lain setelah NULL
+        after = None if descending else column.isnot(None)
+        same = column.is_(None)
+    else:
+        after = or_(column < value, column.is_(None)) if descending else column > value
+        same = column == value
+    if len(columns) == 1:
+        return after if after is not None else false()
+    rest = _after_condition(columns[1:], values[1:], descending)
+    if after is None:
+        return and_(same, rest)
+    return or_(after, and_(same, rest))
+
+
+class KeysetPage:
+    """Hasil satu halaman mode cursor. `total` hanya diisi jika diminta."""
+
+    def __init__(self, items, per_page, next_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+    def to_dict(self):
+        data = {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next
+        }
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+def keyset_paginate(query, order, columns, after=None, per_page=10, include_total=False, descending=False):
+    """
+    Pagination berbasis cursor (keyset) tanpa OFFSET.
+
+    :param order: nama urutan yang disimpan di cursor (mis. 'id' atau 'created_at')
+    :param columns: kolom urutan, kolom terakhir harus unik (biasanya primary key)
+    :param after: cursor dari halaman sebelumnya, None/'' untuk halaman pertama
+    :param include_total: jalankan COUNT(*) hanya jika diminta
+    :param descending: urutan turun untuk semua kolom (mis. aktivitas terbaru dulu)
+    :raises InvalidCursor: jika cursor rusak atau dibuat untuk urutan lain
+    """
+    per_page = clamp_per_page(per_page)
+    total = query.order_by(None).count() if include_total else None
+
+    if after:
+        values = decode_cursor(after, order)
+        if len(values) != len(columns):
+            raise InvalidCursor('Invalid cursor')
+        values = [_deserialize(column, value) for column, value in zip(columns, values)]
+        query = query.filter(_after_condition(columns, values, descending))
+
+    rows = query.order_by(*(column.desc() if descending else column for column in columns)).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(order, [_serialize(getattr(last, column.key)) for column in columns])
+    return KeysetPage(rows, per_page, next_cursor, total)
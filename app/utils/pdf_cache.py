@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.matkul import Grade
+
+# Naikkan jika layout KHS berubah agar entri lama tidak terpakai lagi
+LAYOUT_VERSION = 1
+
+
+def khs_fingerprint(student, semester, grades, semester_summary, ipk, periode):
+    """Hash SHA-256 dari semua data yang mempengaruhi isi PDF KHS."""
+    payload = json.dumps({
+        'v': LAYOUT_VERSION,
+        'student': student,
+        'semester': semester,
+        'grades': grades,
+        'summary': semester_summary,
+        'ipk': ipk,
+        'periode': periode
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PdfCache:
+    """
+    Cache PDF di disk, dialamatkan oleh fingerprint, dibatasi ukuran dengan eviksi LRU.
+
+    Ukuran dan urutan pakai disimpan di memori (OrderedDict) sehingga put/eviksi tidak
+    perlu menelusuri seluruh folder. Folder dipindai ulang (urut mtime) paling sering
+    sekali per `rescan_interval` detik untuk ikut menghitung file dari proses lain.
+    """
+
+    def __init__(self, directory, max_bytes, rescan_interval=300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (owner, fingerprint) -> ukuran, yang paling lama dipakai di depan
+        self._total = 0
+        self._scanned_at = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _owner_dir(self, owner_id):
+        return os.path.join(self.directory, str(owner_id))
+
+    def _path(self, owner_id, fingerprint):
+        return os.path.join(self._owner_dir(owner_id), f"{fingerprint}.pdf")
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, (os.path.basename(root), name[:-4]), stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total = sum(self._entries.values())
+        self._scanned_at = time.monotonic()
+
+    def _ensure_scanned(self):
+        if self._scanned_at is None or time.monotonic() - self._scanned_at >= self.rescan_interval:
+            self._scan()
+
+    def open(self, owner_id, fingerprint):
+        """
+        Buka PDF yang tersimpan; None jika tidak ada.
+
+        File yang sudah dibuka tetap bisa dibaca walaupun dihapus eviksi/invalidasi
+        di thread lain, jadi kirim file object ini, bukan path-nya.
+        """
+        path = self._path(owner_id, fingerprint)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # tandai sebagai baru dipakai (untuk pemindaian ulang)
+        except FileNotFoundError:
+            pass
+        key = (str(owner_id), fingerprint)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return f
+
+    def put(self, owner_id, fingerprint, data):
+        path = self._path(owner_id, fingerprint)
+        os.makedirs(self._owner_dir(owner_id), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        key = (str(owner_id), fingerprint)
+        with self._lock:
+            self._ensure_scanned()
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+        self.evict()
+        return path
+
+    def invalidate(self, owner_id):
+        shutil.rmtree(self._owner_dir(owner_id), ignore_errors=True)
+        owner = str(owner_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner]:
+                self._total -= self._entries.pop(key)
+
+    def evict(self):
+        """Hapus entri yang paling lama tidak dipakai sampai total ukuran di bawah batas."""
+        with self._lock:
+            self._ensure_scanned()
+            removed = 0
+            while self._total > self.max_bytes and self._entries:
+                (owner, fingerprint), size = self._entries.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(self._path(owner, fingerprint))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+            return removed
+
+
+def get_khs_cache():
+    """Instance cache KHS untuk aplikasi aktif."""
+    cache = current_app.extensions.get('khs_pdf_cache')
+    if cache is None:
+        cache = PdfCache(current_app.config['KHS_PDF_CACHE_DIR'], current_app.config['KHS_PDF_CACHE_MAX_BYTES'],
+                         rescan_interval=current_app.config.get('KHS_PDF_CACHE_RESCAN_INTERVAL', 300))
+        current_app.extensions['khs_pdf_cache'] = cache
+    return cache
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_grade_owners(session, flush_context):
+    owners = session.info.setdefault('khs_cache_invalidate', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Grade):
+            owners.update(inspect(obj).attrs.student_id.history.deleted)
+            if obj.student_id is not None:
+                owners.add(obj.student_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_grade_owners(session):
+    owners = session.info.pop('khs_cache_invalidate', None)
+    if not owners or not has_app_context():
+        return
+    cache = get_khs_cache()
+    for student_id in owners:
+        cache.invalidate(student_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_grade_owners(session):
+    session.info.pop('khs_cache_invalidate', None)
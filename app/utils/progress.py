@@ -0,0 +1,99 @@
+from sqlalchemy import and_, func, true
+from app import db
+from app.models.user import User
+from app.models.matkul import Course, Material, Video, VideoWatch, Submission, KRS
+
+
+def _percentage(completed, total):
+    return int(completed / total * 100) if total > 0 else 0
+
+
+def student_progress(student_id, course_ids):
+    """
+    Progress belajar seorang mahasiswa untuk beberapa mata kuliah sekaligus.
+
+    Video dihitung selesai hanya jika VideoWatch.completed bernilai benar.
+
+    :return: dict course_id -> {'video_total', 'video_completed', 'material_total', 'submission_total', 'progress'}
+    """
+    if not course_ids:
+        return {}
+
+    result = {course_id: {
+        'video_total': 0,
+        'video_completed': 0,
+        'material_total': 0,
+        'submission_total': 0,
+        'progress': 0
+    } for course_id in course_ids}
+
+    video_rows = db.session.query(
+        Video.course_id,
+        func.count(func.distinct(Video.id)),
+        func.count(func.distinct(VideoWatch.video_id))
+    ).outerjoin(VideoWatch, and_(
+        VideoWatch.video_id == Video.id,
+        VideoWatch.student_id == student_id,
+        VideoWatch.completed == true()
+    )).filter(Video.course_id.in_(course_ids)).group_by(Video.course_id)
+    for course_id, total, completed in video_rows:
+        result[course_id]['video_total'] = total
+        result[course_id]['video_completed'] = completed
+
+    material_rows = db.session.query(Material.course_id, func.count(Material.id)) \
+        .filter(Material.course_id.in_(course_ids)).group_by(Material.course_id)
+    for course_id, total in material_rows:
+        result[course_id]['material_total'] = total
+
+    submission_rows = db.session.query(Submission.course_id, func.count(Submission.id)) \
+        .filter(Submission.student_id == student_id, Submission.course_id.in_(course_ids)) \
+        .group_by(Submission.course_id)
+    for course_id, total in submission_rows:
+        result[course_id]['submission_total'] = total
+
+    for stats in result.values():
+        stats['progress'] = _percentage(stats['video_completed'], stats['video_total'])
+    return result
+
+
+def cohort_progress(course_ids):
+    """
+    Matriks progress mata kuliah x mahasiswa untuk dosen.
+
+    Mahasiswa diambil dari KRS mata kuliah terkait; progress dihitung dari video yang selesai ditonton.
+
+    :return: dict dengan key 'courses' (id -> info), 'students' (id -> info), dan
+             'matrix' (course_id -> student_id -> persen).
+    """
+    if not course_ids:
+        return {'courses': {}, 'students': {}, 'matrix': {}}
+
+    video_totals = dict(
+        db.session.query(Video.course_id, func.count(Video.id))
+        .filter(Video.course_id.in_(course_ids)).group_by(Video.course_id).all()
+    )
+    completed_rows = db.session.query(
+        Video.course_id, VideoWatch.student_id, func.count(func.distinct(VideoWatch.video_id))
+    ).join(Video, Video.id == VideoWatch.video_id) \
+        .filter(Video.course_id.in_(course_ids), VideoWatch.completed == true()) \
+        .group_by(Video.course_id, VideoWatch.student_id)
+    completed = {(course_id, student_id): count for course_id, student_id, count in completed_rows}
+
+    enrollment_rows = db.session.query(
+        KRS.course_id, Course.kode, Course.nama, User.id, User.nim, User.nama
+    ).join(Course, Course.id == KRS.course_id) \
+        .join(User, User.id == KRS.student_id) \
+        .filter(KRS.course_id.in_(course_ids)) \
+        .distinct()
+
+    courses = {}
+    students = {}
+    matrix = {}
+    for course_id, kode, course_nama, student_id, nim, nama in enrollment_rows:
+        courses.setdefault(course_id, {'kode': kode, 'nama': course_nama, 'video_total': video_totals.get(course_id, 0)})
+        students.setdefault(student_id, {'nim': nim, 'nama': nama})
+        matrix.setdefault(course_id, {})[student_id] = _percentage(
+            completed.get((course_id, student_id), 0), video_totals.get(course_id, 0)
+        )
+
+    return {'courses': courses, 'students': students, 'matrix': matrix}
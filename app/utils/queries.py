@@ -0,0 +1,46 @@
+from sqlalchemy.orm import configure_mappers, joinedload
+from app.models.matkul import Course, Grade, KRS, Schedule, Submission, Material, ForumPost, ForumReply
+
+# Relasi dimuat sekaligus (joinedload) agar loop di template tidak memicu satu query per baris.
+# Backref (mis. Grade.course) baru tersedia setelah mapper dikonfigurasi.
+configure_mappers()
+
+
+def grades_with_course():
+    """Grade + Course; dipakai KHS, nilai keseluruhan, transkrip, dan PDF KHS."""
+    return Grade.query.options(joinedload(Grade.course))
+
+
+def courses_with_dosen():
+    """Course + dosen pengampu; dipakai daftar KRS dan API mata kuliah."""
+    return Course.query.options(joinedload(Course.dosen))
+
+
+def schedules_with_course():
+    """Schedule + Course + dosen; dipakai jadwal kuliah dan dashboard."""
+    return Schedule.query.options(joinedload(Schedule.course).joinedload(Course.dosen))
+
+
+def krs_with_course():
+    """KRS + Course; dipakai progress e-learning."""
+    return KRS.query.options(joinedload(KRS.course))
+
+
+def submissions_with_relations():
+    """Submission + mahasiswa + mata kuliah; dipakai dashboard dosen, laporan admin, dan status pengajuan."""
+    return Submission.query.options(joinedload(Submission.student), joinedload(Submission.course))
+
+
+def materials_with_course():
+    """Material + Course; dipakai halaman download e-learning."""
+    return Material.query.options(joinedload(Material.course))
+
+
+def forum_posts_with_relations():
+    """ForumPost + penulis + mata kuliah; dipakai daftar forum."""
+    return ForumPost.query.options(joinedload(ForumPost.student), joinedload(ForumPost.course))
+
+
+def forum_replies_with_student():
+    """ForumReply + penulis; dipakai halaman thread forum."""
+    return ForumReply.query.options(joinedload(ForumReply.student))
@@ -0,0 +1,184 @@
+import bisect
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('siakad.query')
+
+# Batas atas bucket histogram (inklusif); bucket terakhir menampung sisanya
+QUERY_COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100]
+DURATION_MS_BUCKETS = [1, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def to_list(self):
+        # Format bucket seperti Prometheus: `le` = batas atas, '+Inf' untuk sisanya
+        return [{'le': bound, 'count': count} for bound, count in zip(self.bounds + ['+Inf'], self.counts)]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.query_ms = 0.0
+        self.max_queries = 0
+        self.max_query_ms = 0.0
+        self.slow_queries = 0
+        self.query_counts = Histogram(QUERY_COUNT_BUCKETS)
+        self.durations = Histogram(DURATION_MS_BUCKETS)
+
+    def observe(self, queries, query_ms, slow_queries):
+        self.requests += 1
+        self.queries += queries
+        self.query_ms += query_ms
+        self.max_queries = max(self.max_queries, queries)
+        self.max_query_ms = max(self.max_query_ms, query_ms)
+        self.slow_queries += slow_queries
+        self.query_counts.observe(queries)
+        self.durations.observe(query_ms)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'avg_queries': round(self.queries / self.requests, 2) if self.requests else 0.0,
+            'max_queries': self.max_queries,
+            'avg_query_ms': round(self.query_ms / self.requests, 3) if self.requests else 0.0,
+            'max_query_ms': round(self.max_query_ms, 3),
+            'slow_queries': self.slow_queries,
+            'query_count_histogram': self.query_counts.to_list(),
+            'query_ms_histogram': self.durations.to_list()
+        }
+
+
+class QueryInstrumentation:
+    """
+    Instrumentasi query berbasis event SQLAlchemy (nonaktif kecuali QUERY_LOG_ENABLED=1).
+
+    - log JSON per statement: disampling (QUERY_LOG_SAMPLE_RATE), query lambat
+      (>= QUERY_LOG_SLOW_MS) selalu ditulis
+    - histogram jumlah dan total durasi query per endpoint
+    """
+
+    def __init__(self, sample_rate=0.01, slow_ms=200, log_params=False, max_statement_length=1000):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.log_params = log_params
+        self.max_statement_length = max_statement_length
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.started_at = datetime.utcnow()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_log_started', []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        # Statement gagal tidak memicu after_cursor_execute; buang waktu mulainya supaya
+        # stack di conn.info (koneksi pool dipakai ulang) tidak terus bertambah
+        conn = exception_context.connection
+        if conn is None or exception_context.execution_context is None:
+            return
+        started = conn.info.get('query_log_started')
+        if started:
+            started.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_log_started'].pop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        slow = elapsed_ms >= self.slow_ms
+
+        endpoint = None
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+            g.query_ms = g.get('query_ms', 0.0) + elapsed_ms
+            if slow:
+                g.slow_query_count = g.get('slow_query_count', 0) + 1
+            endpoint = request.endpoint
+
+        if slow or random.random() < self.sample_rate:
+            record = {
+                'ts': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+                'endpoint': endpoint,
+                'duration_ms': round(elapsed_ms, 3),
+                'slow': slow,
+                'executemany': executemany,
+                'rowcount': cursor.rowcount,
+                'statement': ' '.join(statement.split())[:self.max_statement_length]
+            }
+            if self.log_params:
+                record['parameters'] = repr(parameters)[:self.max_statement_length]
+            logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
+
+    def record_request(self, endpoint, queries, query_ms, slow_queries):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.observe(queries, query_ms, slow_queries)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'since': self.started_at.isoformat(),
+                'sample_rate': self.sample_rate,
+                'slow_ms': self.slow_ms,
+                'endpoints': {endpoint: stats.to_dict() for endpoint, stats in sorted(self.endpoints.items())}
+            }
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.started_at = datetime.utcnow()
+
+
+def init_query_log(app, db):
+    if not app.config.get('QUERY_LOG_ENABLED'):
+        return None
+
+    instrumentation = QueryInstrumentation(
+        sample_rate=app.config.get('QUERY_LOG_SAMPLE_RATE', 0.01),
+        slow_ms=app.config.get('QUERY_LOG_SLOW_MS', 200),
+        log_params=app.config.get('QUERY_LOG_PARAMS', False)
+    )
+    with app.app_context():
+        for engine in db.engines.values():
+            instrumentation.attach(engine)
+
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    @app.after_request
+    def _record_query_stats(response):
+        if request.endpoint:
+            instrumentation.record_request(
+                request.endpoint, g.get('query_count', 0), g.get('query_ms', 0.0), g.get('slow_query_count', 0)
+            )
+        return response
+
+    app.extensions['query_log'] = instrumentation
+    return instrumentation
+
+
+def get_query_log():
+    return current_app.extensions.get('query_log')
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models.user import User
+from app.models.matkul import Course, Grade, Submission, CourseReportSnapshot
+
+
+def user_role_counts():
+    """Jumlah user per role dalam satu query GROUP BY."""
+    rows = db.session.query(User.role, func.count(User.id)).group_by(User.role).all()
+    counts = {role: count for role, count in rows}
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def course_counts(course_ids=None):
+    """
+    Jumlah mahasiswa (baris nilai) dan tugas per mata kuliah dengan dua query GROUP BY.
+
+    :param course_ids: Batasi ke mata kuliah tertentu; None berarti semua.
+    :return: dict course_id -> {'student_count': int, 'submission_count': int}
+    """
+    grade_query = db.session.query(Grade.course_id, func.count(Grade.id)).group_by(Grade.course_id)
+    submission_query = db.session.query(Submission.course_id, func.count(Submission.id)).group_by(Submission.course_id)
+    if course_ids is not None:
+        if not course_ids:
+            return {}
+        grade_query = grade_query.filter(Grade.course_id.in_(course_ids))
+        submission_query = submission_query.filter(Submission.course_id.in_(course_ids))
+
+    counts = {}
+    for course_id, count in grade_query:
+        counts.setdefault(course_id, {'student_count': 0, 'submission_count': 0})['student_count'] = count
+    for course_id, count in submission_query:
+        counts.setdefault(course_id, {'student_count': 0, 'submission_count': 0})['submission_count'] = count
+    return counts
+
+
+def refresh_course_snapshot():
+    """Hitung ulang seluruh snapshot laporan per mata kuliah. Mengembalikan jumlah baris yang ditulis."""
+    counts = course_counts()
+    refreshed_at = datetime.utcnow()
+    rows = [{
+        'course_id': course_id,
+        'student_count': counts.get(course_id, {}).get('student_count', 0),
+        'submission_count': counts.get(course_id, {}).get('submission_count', 0),
+        'refreshed_at': refreshed_at
+    } for (course_id,) in db.session.query(Course.id)]
+
+    db.session.execute(CourseReportSnapshot.__table__.delete())
+    if rows:
+        db.session.execute(CourseReportSnapshot.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def snapshot_course_counts():
+    """
+    Baca snapshot jika fitur aktif dan belum kedaluwarsa.
+
+    :return: dict seperti course_counts(), atau None jika snapshot tidak bisa dipakai.
+    """
+    if not current_app.config.get('REPORT_SNAPSHOT_ENABLED'):
+        return None
+    rows = CourseReportSnapshot.query.all()
+    max_age = timedelta(seconds=current_app.config.get('REPORT_SNAPSHOT_MAX_AGE', 3600))
+    if not rows or datetime.utcnow() - min(row.refreshed_at for row in rows) > max_age:
+        return None
+    return {
+        row.course_id: {'student_count': row.student_count, 'submission_count': row.submission_count}
+        for row in rows
+    }
+
+
+def course_report(courses):
+    """Susun statistik per mata kuliah untuk laporan admin (snapshot jika tersedia, jika tidak query langsung)."""
+    counts = snapshot_course_counts()
+    if counts is None:
+        counts = course_counts()
+    return [{
+        'course': course,
+        'student_count': counts.get(course.id, {}).get('student_count', 0),
+        'submission_count': counts.get(course.id, {}).get('submission_count', 0)
+    } for course in courses]
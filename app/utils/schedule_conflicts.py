@@ -0,0 +1,164 @@
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+from app.utils.schedule_index import DAY_ORDER, get_schedule_index, parse_time
+
+
+class IntervalIndex:
+    """
+    Index interval statis [mulai, selesai) untuk data yang jarang berubah.
+
+    Interval diurutkan menurut waktu mulai dan disertai prefix maksimum waktu selesai,
+    sehingga cek "ada yang tumpang tindih?" cukup satu bisect (O(log n)). `find` berjalan
+    mundur dari posisi bisect selama prefix maksimum masih melewati `start`: satu interval
+    panjang di awal membuat semua interval sesudahnya ikut diperiksa, jadi kasus terburuknya
+    O(n), bukan O(log n + k). Cukup untuk jadwal satu ruangan/dosen per hari (belasan slot).
+    """
+
+    def __init__(self, items):
+        items = sorted(items, key=lambda item: (item[0], item[1]))
+        self.starts = [item[0] for item in items]
+        self.ends = [item[1] for item in items]
+        self.values = [item[2] for item in items]
+        self.max_end = list(accumulate(self.ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start, end):
+        # Interval [0, i) mulai sebelum `end`; cukup cek selesai terjauh di antaranya
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_end[i - 1] > start
+
+    def find(self, start, end):
+        i = bisect_left(self.starts, end)
+        found = []
+        while i > 0 and self.max_end[i - 1] > start:
+            i -= 1
+            if self.ends[i] > start:
+                found.append(self.values[i])
+        found.reverse()
+        return found
+
+
+def describe(entry):
+    return {
+        'id': entry.id,
+        'course_id': entry.course_id,
+        'kode': entry.course.kode,
+        'nama': entry.course.nama,
+        'hari': entry.hari,
+        'waktu_mulai': entry.waktu_mulai,
+        'waktu_selesai': entry.waktu_selesai,
+        'ruangan': entry.ruangan,
+        'dosen_id': entry.course.dosen_id
+    }
+
+
+def _overlapping_pairs(entries):
+    """Sweep daftar jadwal satu hari (terurut menurut jam mulai); hasilkan pasangan yang tumpang tindih."""
+    active = []
+    for entry in sorted(entries, key=lambda item: (item.start_minute, item.end_minute)):
+        active = [other for other in active if other.end_minute > entry.start_minute]
+        for other in active:
+            yield other, entry
+        active.append(entry)
+
+
+class ConflictDetector:
+    """
+    Detektor bentrok jadwal satu tahun ajaran, dibangun dari ScheduleIndex:
+    interval per (ruangan, hari) dan per (dosen, hari), plus jadwal per mata kuliah
+    untuk cek KRS mahasiswa.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        rooms = defaultdict(list)
+        lecturers = defaultdict(list)
+        for entry in index.entries.values():
+            item = (entry.start_minute, entry.end_minute, entry)
+            rooms[(entry.ruangan, entry.hari)].append(item)
+            if entry.course.dosen_id is not None:
+                lecturers[(entry.course.dosen_id, entry.hari)].append(item)
+        self.rooms = {key: IntervalIndex(items) for key, items in rooms.items()}
+        self.lecturers = {key: IntervalIndex(items) for key, items in lecturers.items()}
+
+    def check_entry(self, hari, waktu_mulai, waktu_selesai, ruangan=None, dosen_id=None, exclude_id=None):
+        """
+        Cek satu slot baru/diubah terhadap ruangan dan dosen yang sama di hari itu.
+
+        :param exclude_id: id Schedule yang sedang diubah (tidak dianggap bentrok dengan dirinya)
+        :return: list bentrok {'type': 'ruangan'|'dosen', 'with': {...}}
+        """
+        start, end = parse_time(waktu_mulai), parse_time(waktu_selesai)
+        if end <= start:
+            raise ValueError('waktu_selesai harus setelah waktu_mulai')
+
+        conflicts = []
+        for kind, structures, key in (('ruangan', self.rooms, ruangan), ('dosen', self.lecturers, dosen_id)):
+            if key is None:
+                continue
+            intervals = structures.get((key, hari))
+            if intervals is None or not intervals.overlaps(start, end):
+                continue
+            for entry in intervals.find(start, end):
+                if entry.id != exclude_id:
+                    conflicts.append({'type': kind, 'with': describe(entry)})
+        return conflicts
+
+    def check_courses(self, course_ids):
+        """Cek bentrok antar mata kuliah yang dipilih dalam satu pengajuan KRS."""
+        by_day = defaultdict(list)
+        for course_id in set(course_ids):
+            for entry in self.index.by_course.get(course_id, ()):
+                by_day[entry.hari].append(entry)
+
+        clashes = []
+        for hari in sorted(by_day, key=lambda name: DAY_ORDER.get(name, len(DAY_ORDER))):
+            for first, second in _overlapping_pairs(by_day[hari]):
+                if first.course_id != second.course_id:
+                    clashes.append({'first': describe(first), 'second': describe(second)})
+        return clashes
+
+    def report(self):
+        """Laporan bentrok lengkap: ruangan, dosen, dan pasangan MK yang bentrok di KRS mahasiswa."""
+        def group_conflicts(kind, structures):
+            conflicts = []
+            for (key, hari), intervals in structures.items():
+                for first, second in _overlapping_pairs(intervals.values):
+                    conflicts.append({'type': kind, 'key': key, 'hari': hari,
+                                      'first': describe(first), 'second': describe(second)})
+            return conflicts
+
+        student_pairs = defaultdict(int)
+        for days in self.index.by_student.values():
+            for entries in days.values():
+                for first, second in _overlapping_pairs(entries):
+                    if first.course_id != second.course_id:
+                        student_pairs[tuple(sorted((first.id, second.id)))] += 1
+
+        entries = self.index.entries
+        students = [
+            {'first': describe(entries[first]), 'second': describe(entries[second]), 'student_count': count}
+            for (first, second), count in sorted(student_pairs.items(), key=lambda item: -item[1])
+        ]
+        rooms = group_conflicts('ruangan', self.rooms)
+        lecturers = group_conflicts('dosen', self.lecturers)
+        return {
+            'tahun_ajaran': self.index.tahun_ajaran,
+            'total_slots': len(entries),
+            'summary': {'ruangan': len(rooms), 'dosen': len(lecturers), 'mahasiswa': len(students)},
+            'ruangan': rooms,
+            'dosen': lecturers,
+            'mahasiswa': students
+        }
+
+
+def get_conflict_detector(tahun_ajaran=None):
+    """Detektor untuk index jadwal yang sedang berlaku; ikut dibuang saat index diinvalidasi."""
+    index = get_schedule_index(tahun_ajaran)
+    detector = index.derived.get('conflicts')
+    if detector is None:
+        detector = index.derived['conflicts'] = ConflictDetector(index)
+    return detector
@@ -0,0 +1,274 @@
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.user import User
+from app.models.matkul import Course, KRS, Schedule
+from app.utils.search import ChangeLogCursor, log_search_changes
+
+DAY_NAMES = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+DAY_ORDER = {name: order for order, name in enumerate(DAY_NAMES)}
+
+# KRS yang ditolak tidak ikut membentuk jadwal mahasiswa
+EXCLUDED_KRS_STATUS = ('rejected',)
+
+# Snapshot read-only; atribut sama dengan yang dipakai template (item.course.nama, item.course.dosen.nama)
+DosenInfo = namedtuple('DosenInfo', 'id nama')
+CourseInfo = namedtuple('CourseInfo', 'id kode nama sks semester dosen_id dosen')
+ScheduleEntry = namedtuple(
+    'ScheduleEntry',
+    'id course_id hari waktu_mulai waktu_selesai ruangan semester tahun_ajaran course start_minute end_minute'
+)
+
+
+def parse_time(value):
+    """'08:00' -> menit sejak tengah malam."""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def today_name(now=None):
+    return DAY_NAMES[(now or datetime.now()).weekday()]
+
+
+def current_tahun_ajaran():
+    return current_app.config.get('TAHUN_AJARAN', '2023/2024')
+
+
+def _sort_key(entry):
+    return DAY_ORDER.get(entry.hari, len(DAY_NAMES)), entry.start_minute, entry.ruangan
+
+
+class ScheduleIndex:
+    """
+    Index jadwal satu tahun ajaran: per mahasiswa (dari KRS), per dosen, per ruangan
+    dan per hari. Setiap daftar sudah terurut (hari, jam mulai, ruangan).
+    """
+
+    def __init__(self, tahun_ajaran, entries, enrollments):
+        self.tahun_ajaran = tahun_ajaran
+        self.built_at = time.monotonic()
+        self.entries = {entry.id: entry for entry in entries}
+
+        by_course = defaultdict(list)
+        by_lecturer = defaultdict(lambda: defaultdict(list))
+        by_room = defaultdict(lambda: defaultdict(list))
+        by_day = defaultdict(list)
+        for entry in sorted(entries, key=_sort_key):
+            by_course[entry.course_id].append(entry)
+            by_day[entry.hari].append(entry)
+            by_room[entry.ruangan][entry.hari].append(entry)
+            if entry.course.dosen_id is not None:
+                by_lecturer[entry.course.dosen_id][entry.hari].append(entry)
+
+        self.by_course = dict(by_course)
+        self.by_day = dict(by_day)
+        self.by_room = {room: dict(days) for room, days in by_room.items()}
+        self.by_lecturer = {dosen_id: dict(days) for dosen_id, days in by_lecturer.items()}
+        self.by_student = {}
+        self.enrollments = {}
+        self.update_enrollments(enrollments)
+        # Struktur turunan (mis. detektor bentrok) ikut dibuang bersama index
+        self.derived = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update_enrollments(self, enrollments):
+        """
+        Ganti jadwal mahasiswa di `enrollments` ({student_id: course_ids}, kosong = tanpa KRS);
+        struktur jadwal/ruangan/dosen tidak tersentuh. Dict baru ditukar utuh supaya
+        pembaca lain (mis. laporan bentrok) tidak melihat dict yang sedang diubah.
+        """
+        by_student = dict(self.by_student)
+        by_enrollment = dict(self.enrollments)
+        for student_id, course_ids in enrollments.items():
+            if not course_ids:
+                by_student.pop(student_id, None)
+                by_enrollment.pop(student_id, None)
+                continue
+            days = defaultdict(list)
+            student_entries = [entry for course_id in course_ids for entry in self.by_course.get(course_id, ())]
+            for entry in sorted(student_entries, key=_sort_key):
+                days[entry.hari].append(entry)
+            by_student[student_id] = dict(days)
+            by_enrollment[student_id] = frozenset(course_ids)
+        self.by_student, self.enrollments = by_student, by_enrollment
+
+    @staticmethod
+    def _select(days, hari):
+        if days is None:
+            return []
+        if hari is not None:
+            return list(days.get(hari, ()))
+        return [entry for day in sorted(days, key=lambda name: DAY_ORDER.get(name, len(DAY_NAMES))) for entry in days[day]]
+
+    def for_student(self, student_id, hari=None):
+        return self._select(self.by_student.get(student_id), hari)
+
+    def for_lecturer(self, dosen_id, hari=None):
+        return self._select(self.by_lecturer.get(dosen_id), hari)
+
+    def for_room(self, ruangan, hari=None):
+        return self._select(self.by_room.get(ruangan), hari)
+
+    def for_day(self, hari):
+        return list(self.by_day.get(hari, ()))
+
+    def all(self):
+        return sorted(self.entries.values(), key=_sort_key)
+
+
+def build_schedule_index(tahun_ajaran):
+    """Bangun index dari dua query: Schedule + Course + dosen, lalu pasangan (mahasiswa, MK) dari KRS."""
+    rows = db.session.execute(
+        select(
+            Schedule.id, Schedule.course_id, Schedule.hari, Schedule.waktu_mulai, Schedule.waktu_selesai,
+            Schedule.ruangan, Schedule.semester, Schedule.tahun_ajaran,
+            Course.kode, Course.nama, Course.sks, Course.semester.label('course_semester'), Course.dosen_id,
+            User.nama.label('dosen_nama')
+        )
+        .join(Course, Schedule.course_id == Course.id)
+        .outerjoin(User, Course.dosen_id == User.id)
+        .where(Schedule.tahun_ajaran == tahun_ajaran)
+    )
+
+    courses = {}
+    entries = []
+    for row in rows:
+        course = courses.get(row.course_id)
+        if course is None:
+            dosen = DosenInfo(row.dosen_id, row.dosen_nama) if row.dosen_id is not None else None
+            course = courses[row.course_id] = CourseInfo(
+                row.course_id, row.kode, row.nama, row.sks, row.course_semester, row.dosen_id, dosen
+            )
+        entries.append(ScheduleEntry(
+            row.id, row.course_id, row.hari, row.waktu_mulai, row.waktu_selesai, row.ruangan,
+            row.semester, row.tahun_ajaran, course, parse_time(row.waktu_mulai), parse_time(row.waktu_selesai)
+        ))
+
+    return ScheduleIndex(tahun_ajaran, entries, _load_enrollments(tahun_ajaran))
+
+
+def _load_enrollments(tahun_ajaran, student_ids=None):
+    """Pasangan (mahasiswa, MK) dari KRS; dibatasi ke student_ids bila diberikan."""
+    query = select(KRS.student_id, KRS.course_id).where(
+        KRS.tahun_ajaran == tahun_ajaran,
+        KRS.status.notin_(EXCLUDED_KRS_STATUS)
+    )
+    if student_ids is not None:
+        query = query.where(KRS.student_id.in_(student_ids))
+    enrollments = defaultdict(set)
+    for student_id, course_id in db.session.execute(query):
+        enrollments[student_id].add(course_id)
+    return enrollments
+
+
+class ScheduleIndexCache:
+    """
+    Index per tahun ajaran, dibangun saat pertama dipakai dan disinkronkan lewat log
+    search_change (`ChangeLogCursor`) yang juga dibaca worker lain: perubahan Schedule
+    (atau Course/dosen yang ditampilkan) membuang index semua tahun ajaran, perubahan
+    KRS hanya memuat ulang jadwal mahasiswanya tanpa membangun ulang index (dan detektor
+    bentrok). Satu query log per pemakaian; TTL hanya batas basi cadangan.
+    """
+
+    def __init__(self, ttl=300, gap_seconds=300):
+        self.ttl = ttl
+        self.gap_seconds = gap_seconds
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.changes = None
+        self.builds = 0
+
+    def get(self, tahun_ajaran):
+        with self.lock:
+            self._sync()
+            index = self.indexes.get(tahun_ajaran)
+            if index is None or (self.ttl and time.monotonic() - index.built_at >= self.ttl):
+                index = self.indexes[tahun_ajaran] = build_schedule_index(tahun_ajaran)
+                self.builds += 1
+        return index
+
+    def _sync(self):
+        if self.changes is None:
+            # Posisi log diambil sebelum index pertama dibangun; yang sudah lewat tidak perlu diterapkan
+            self.changes = ChangeLogCursor.start(self.gap_seconds)
+            self.changes.read()
+            return
+        changes = self.changes.read()
+        if not self.indexes:
+            return
+        if any(entity == SCHEDULE_CHANGE for _, entity, _ in changes):
+            self.indexes.clear()
+            return
+        student_ids = {entity_id for _, entity, entity_id in changes if entity == KRS_CHANGE}
+        if not student_ids:
+            return
+        for tahun_ajaran, index in self.indexes.items():
+            enrollments = _load_enrollments(tahun_ajaran, student_ids)
+            index.update_enrollments({student_id: enrollments.get(student_id, ()) for student_id in student_ids})
+
+    def invalidate(self, tahun_ajaran=None):
+        with self.lock:
+            if tahun_ajaran is None:
+                self.indexes.clear()
+            else:
+                self.indexes.pop(tahun_ajaran, None)
+
+
+def init_schedule_index(app):
+    cache = ScheduleIndexCache(ttl=app.config.get('SCHEDULE_INDEX_TTL', 300),
+                               gap_seconds=app.config.get('SEARCH_CHANGE_GAP_SECONDS', 300))
+    app.extensions['schedule_index'] = cache
+    return cache
+
+
+def get_schedule_index(tahun_ajaran=None):
+    return current_app.extensions['schedule_index'].get(tahun_ajaran or current_tahun_ajaran())
+
+
+# Entity di log search_change: Schedule/Course/dosen (entity_id tidak dipakai) dan KRS (entity_id = mahasiswa)
+SCHEDULE_CHANGE = 'schedule'
+KRS_CHANGE = 'krs'
+
+# Atribut Course/dosen yang ikut tersimpan di ScheduleEntry (CourseInfo, DosenInfo)
+INDEXED_ATTRIBUTES = {
+    Course: ('kode', 'nama', 'sks', 'semester', 'dosen_id'),
+    User: ('nama',)
+}
+
+
+def _old_value(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_schedule_changes(session, flush_context):
+    changes = set()
+    for obj in session.new:
+        if isinstance(obj, Schedule):
+            changes.add((SCHEDULE_CHANGE, obj.id))
+        elif isinstance(obj, KRS):
+            changes.add((KRS_CHANGE, obj.student_id))
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, KRS):
+            # KRS tidak mengubah interval jadwal; cukup jadwal mahasiswa lama dan baru
+            changes.add((KRS_CHANGE, _old_value(obj, 'student_id')))
+            changes.add((KRS_CHANGE, obj.student_id))
+        elif isinstance(obj, Schedule):
+            changes.add((SCHEDULE_CHANGE, obj.id))
+        elif type(obj) in INDEXED_ATTRIBUTES and (not isinstance(obj, User) or obj.role == 'dosen'):
+            state = inspect(obj)
+            if obj in session.deleted or any(state.attrs[attr].history.has_changes() for attr in INDEXED_ATTRIBUTES[type(obj)]):
+                changes.add((SCHEDULE_CHANGE, obj.id))
+    changes.discard((KRS_CHANGE, None))
+    if changes:
+        log_search_changes(session.connection(), changes)
@@ -0,0 +1,402 @@
+import bisect
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.user import User
+from app.models.matkul import Course, SearchChange
+from app.utils.pagination import InvalidCursor, KeysetPage, clamp_per_page, decode_cursor, encode_cursor
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+# Bobot skor per jenis kecocokan term
+EXACT_WEIGHT = 3.0
+PREFIX_WEIGHT = 2.0
+NGRAM_WEIGHT = 1.0
+
+# Batas jumlah id celah yang diingat; lonjakan auto-increment tidak boleh membuat IN (...) raksasa
+MAX_CHANGE_GAPS = 1000
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index in-memory untuk satu jenis entitas.
+
+    - exact/prefix: term dicocokkan dengan kosakata terurut (bisect), sehingga
+      pencarian per ketikan tidak memindai tabel.
+    - n-gram: untuk field di `ngram_fields`, trigram kosakata diindeks agar potongan
+      di tengah kata dan salah ketik ringan tetap ditemukan.
+    - ranking: jumlah (bobot field x bobot jenis kecocokan) untuk setiap term; semua
+      term harus cocok (AND).
+    """
+
+    def __init__(self, field_weights, ngram_fields=()):
+        self.field_weights = field_weights
+        self.ngram_fields = set(ngram_fields)
+        self.postings = {}      # token -> {doc_id: bobot field terbesar}
+        self.vocabulary = []    # token terurut untuk pencarian prefix
+        self.ngrams = {}        # trigram -> set(token)
+        self.doc_tokens = {}    # doc_id -> set(token)
+        self.doc_attrs = {}     # doc_id -> atribut filter (mis. role, semester)
+        self.changes = ChangeLogCursor()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, doc_id, fields, attrs=None):
+        with self.lock:
+            self.remove(doc_id)
+            tokens = set()
+            for field, text in fields.items():
+                weight = self.field_weights.get(field, 1.0)
+                for token in tokenize(text):
+                    tokens.add(token)
+                    posting = self.postings.get(token)
+                    if posting is None:
+                        posting = self.postings[token] = {}
+                        bisect.insort(self.vocabulary, token)
+                    if posting.get(doc_id, 0) < weight:
+                        posting[doc_id] = weight
+                    if field in self.ngram_fields and len(token) >= 3:
+                        for gram in trigrams(token):
+                            self.ngrams.setdefault(gram, set()).add(token)
+            self.doc_tokens[doc_id] = tokens
+            self.doc_attrs[doc_id] = attrs or {}
+
+    def remove(self, doc_id):
+        with self.lock:
+            tokens = self.doc_tokens.pop(doc_id, None)
+            self.doc_attrs.pop(doc_id, None)
+            if not tokens:
+                return
+            for token in tokens:
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+                    index = bisect.bisect_left(self.vocabulary, token)
+                    if index < len(self.vocabulary) and self.vocabulary[index] == token:
+                        del self.vocabulary[index]
+                    for gram in trigrams(token):
+                        bucket = self.ngrams.get(gram)
+                        if bucket is not None:
+                            bucket.discard(token)
+                            if not bucket:
+                                del self.ngrams[gram]
+
+    def _prefix_tokens(self, term):
+        # Semua token berawalan `term` berada berurutan di kosakata: [term, term + '\uffff')
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff', start)
+        return self.vocabulary[start:end]
+
+    def _ngram_tokens(self, term):
+        grams = trigrams(term)
+        inner = {term[i:i + 3] for i in range(len(term) - 2)}
+        counts = {}
+        inner_counts = {}
+        for gram in grams:
+            for token in self.ngrams.get(gram, ()):
+                counts[token] = counts.get(token, 0) + 1
+                if gram in inner:
+                    inner_counts[token] = inner_counts.get(token, 0) + 1
+        # Cocok jika semua trigram bagian dalam ada (potongan di tengah kata) atau minimal
+        # 60% trigram sama (toleransi salah ketik satu huruf)
+        threshold = max(2, math.ceil(len(grams) * 0.6))
+        return {
+            token: count / len(grams) for token, count in counts.items()
+            if count >= threshold or inner_counts.get(token, 0) == len(inner)
+        }
+
+    def _term_scores(self, term):
+        scores = {}
+
+        def collect(token, match_weight):
+            for doc_id, field_weight in self.postings.get(token, {}).items():
+                score = field_weight * match_weight
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+
+        if term in self.postings:
+            collect(term, EXACT_WEIGHT)
+        for token in self._prefix_tokens(term):
+            if token != term:
+                collect(token, PREFIX_WEIGHT)
+        if len(term) >= 3:
+            for token, similarity in self._ngram_tokens(term).items():
+                if not token.startswith(term):
+                    collect(token, NGRAM_WEIGHT * similarity)
+        return scores
+
+    def search(self, query, filters=None):
+        """Kembalikan list doc_id terurut berdasarkan relevansi."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self.lock:
+            combined = None
+            # Mulai dari term terpanjang (biasanya paling selektif)
+            for term in sorted(set(terms), key=len, reverse=True):
+                scores = self._term_scores(term)
+                if combined is None:
+                    combined = scores
+                else:
+                    combined = {doc_id: combined[doc_id] + score for doc_id, score in scores.items() if doc_id in combined}
+                if not combined:
+                    return []
+
+            if filters:
+                combined = {
+                    doc_id: score for doc_id, score in combined.items()
+                    if all(self.doc_attrs.get(doc_id, {}).get(key) == value for key, value in filters.items())
+                }
+            return sorted(combined, key=lambda doc_id: (-combined[doc_id], doc_id))
+
+
+class ChangeLogCursor:
+    """
+    Posisi baca log search_change yang tahan terhadap urutan commit.
+
+    Id auto-increment dibagikan saat INSERT, bukan saat commit, sehingga transaksi dengan
+    id lebih kecil bisa commit setelah id yang lebih besar terbaca. Selain id tertinggi
+    yang sudah dibaca, cursor mengingat id di bawahnya yang belum terlihat (celah) beserta
+    waktu tercatat, dan membacanya lagi sampai muncul atau melewati `gap_seconds`
+    (transaksi yang di-rollback tidak pernah muncul). Perubahan bisa terbaca lebih dari
+    sekali, jadi penerapannya harus idempoten (muat ulang baris dari database).
+    """
+
+    def __init__(self, last_id=0, gaps=None, gap_seconds=300):
+        self.last_id = last_id
+        self.gaps = {int(change_id): seen for change_id, seen in (gaps or {}).items()}  # id -> time.time()
+        self.gap_seconds = gap_seconds
+
+    @classmethod
+    def start(cls, gap_seconds=300):
+        """
+        Posisi awal untuk index yang baru dibangun (ambil sebelum membaca data). Mundur
+        `gap_seconds` agar perubahan dari transaksi yang masih berjalan saat build ikut terbaca.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=gap_seconds)
+        last_id = db.session.query(func.max(SearchChange.id)).filter(SearchChange.created_at < cutoff).scalar()
+        return cls(last_id or 0, gap_seconds=gap_seconds)
+
+    def to_dict(self):
+        return {'last_change_id': self.last_id, 'change_gaps': {str(change_id): seen for change_id, seen in self.gaps.items()}}
+
+    def read(self):
+        """
+        Ambil perubahan sesudah posisi terakhir ditambah perubahan di celah yang sudah
+        commit (satu query), lalu majukan posisi.
+
+        :return: list baris (id, entity, entity_id) terurut id
+        """
+        condition = SearchChange.id > self.last_id
+        if self.gaps:
+            condition = or_(condition, SearchChange.id.in_(sorted(self.gaps)))
+        changes = db.session.execute(
+            select(SearchChange.id, SearchChange.entity, SearchChange.entity_id)
+            .where(condition).order_by(SearchChange.id)
+        ).all()
+
+        now = time.time()
+        expected = self.last_id + 1
+        for change in changes:
+            if change.id < expected:
+                self.gaps.pop(change.id, None)
+                continue
+            for missing in range(max(expected, change.id - MAX_CHANGE_GAPS), change.id):
+                self.gaps[missing] = now
+            expected = change.id + 1
+        self.last_id = expected - 1
+        self.gaps = {
+            change_id: seen for change_id, seen in self.gaps.items()
+            if now - seen < self.gap_seconds
+        }
+        if len(self.gaps) > MAX_CHANGE_GAPS:
+            self.gaps = dict(sorted(self.gaps.items())[-MAX_CHANGE_GAPS:])
+        return changes
+
+
+class SearchPage:
+    """Hasil pencarian berhalaman dengan atribut yang sama seperti Pagination Flask-SQLAlchemy."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = math.ceil(total / per_page) if per_page else 0
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+
+
+def _user_document(user):
+    return {'nim': user.nim, 'nama': user.nama, 'email': user.email}, {'role': user.role}
+
+
+def _course_document(course):
+    return {'kode': course.kode, 'nama': course.nama}, {'semester': course.semester}
+
+
+ENTITIES = {
+    'user': {
+        'model': User,
+        'columns': (User.id, User.nim, User.nama, User.email, User.role),
+        'fields': {'nim': 3.0, 'nama': 2.0, 'email': 1.0},
+        'ngram_fields': ('nama',),
+        'document': _user_document
+    },
+    'course': {
+        'model': Course,
+        'columns': (Course.id, Course.kode, Course.nama, Course.semester),
+        'fields': {'kode': 3.0, 'nama': 2.0},
+        'ngram_fields': ('nama',),
+        'document': _course_document
+    }
+}
+
+INDEXED_ATTRIBUTES = {
+    User: ('nim', 'nama', 'email', 'role'),
+    Course: ('kode', 'nama', 'semester')
+}
+ENTITY_NAMES = {User: 'user', Course: 'course'}
+
+
+def build_index(entity, batch_size=5000):
+    spec = ENTITIES[entity]
+    index = SearchIndex(spec['fields'], spec['ngram_fields'])
+    # Ambil posisi log perubahan sebelum membaca data agar tidak ada perubahan yang terlewat
+    index.changes = ChangeLogCursor.start(current_app.config.get('SEARCH_CHANGE_GAP_SECONDS', 300))
+    for row in db.session.query(*spec['columns']).order_by(spec['model'].id).yield_per(batch_size):
+        fields, attrs = spec['document'](row)
+        index.add(row.id, fields, attrs)
+    return index
+
+
+def _sync(entity, index):
+    """Terapkan perubahan dari log search_change (termasuk yang ditulis proses lain)."""
+    with index.lock:
+        changes = index.changes.read()
+        spec = ENTITIES[entity]
+        entity_ids = {entity_id for _, changed, entity_id in changes if changed == entity}
+        if not entity_ids:
+            return
+        # Baris dimuat ulang dari database, jadi perubahan yang terbaca dua kali tetap aman
+        rows = {row.id: row for row in db.session.query(*spec['columns']).filter(spec['model'].id.in_(entity_ids))}
+        for entity_id in entity_ids:
+            row = rows.get(entity_id)
+            if row is None:
+                index.remove(entity_id)
+            else:
+                fields, attrs = spec['document'](row)
+                index.add(entity_id, fields, attrs)
+
+
+def get_index(entity):
+    indexes = current_app.extensions.setdefault('search_indexes', {})
+    lock = current_app.extensions.setdefault('search_indexes_lock', threading.Lock())
+    index = indexes.get(entity)
+    if index is None:
+        with lock:
+            index = indexes.get(entity)
+            if index is None:
+                index = indexes[entity] = build_index(entity)
+    else:
+        _sync(entity, index)
+    return index
+
+
+def _load_ordered(entity, ids, base_query=None):
+    spec = ENTITIES[entity]
+    if not ids:
+        return []
+    base_query = base_query if base_query is not None else spec['model'].query
+    objects = {obj.id: obj for obj in base_query.filter(spec['model'].id.in_(ids))}
+    return [objects[doc_id] for doc_id in ids if doc_id in objects]
+
+
+def search_page(entity, query, page=1, per_page=10, filters=None, base_query=None):
+    """
+    Cari lewat index lalu ambil hanya baris di halaman yang diminta dari database.
+
+    :param base_query: query untuk memuat objek (mis. dengan eager loading), default Model.query
+    :return: SearchPage berisi objek model sesuai urutan relevansi.
+    """
+    ids = get_index(entity).search(query, filters)
+    page, per_page = max(page, 1), clamp_per_page(per_page)
+    items = _load_ordered(entity, ids[(page - 1) * per_page:page * per_page], base_query)
+    return SearchPage(items, page, per_page, len(ids))
+
+
+def search_keyset(entity, query, after=None, per_page=10, include_total=False, filters=None, base_query=None):
+    """
+    Variasi mode cursor untuk hasil pencarian. Urutan relevansi tidak punya kunci unik
+    yang stabil, jadi cursor menyimpan posisi di daftar hasil index (bukan OFFSET SQL).
+
+    :raises InvalidCursor: jika cursor rusak atau bukan cursor pencarian
+    """
+    per_page = clamp_per_page(per_page)
+    ids = get_index(entity).search(query, filters)
+    offset = 0
+    if after:
+        values = decode_cursor(after, 'relevance')
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise InvalidCursor('Invalid cursor')
+        offset = values[0]
+    items = _load_ordered(entity, ids[offset:offset + per_page], base_query)
+    next_cursor = encode_cursor('relevance', [offset + per_page]) if offset + per_page < len(ids) else None
+    return KeysetPage(items, per_page, next_cursor, len(ids) if include_total else None)
+
+
+def prune_search_changes(older_than=timedelta(days=1)):
+    """Hapus log perubahan lama. Proses yang tertinggal lebih lama dari ini sebaiknya di-restart."""
+    deleted = SearchChange.query.filter(SearchChange.created_at < datetime.utcnow() - older_than).delete()
+    db.session.commit()
+    return deleted
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_search_changes(session, flush_context):
+    changes = set()
+    for obj in session.new:
+        if type(obj) in ENTITY_NAMES:
+            changes.add((ENTITY_NAMES[type(obj)], obj.id))
+    for obj in session.deleted:
+        if type(obj) in ENTITY_NAMES:
+            changes.add((ENTITY_NAMES[type(obj)], obj.id))
+    for obj in session.dirty:
+        if type(obj) in ENTITY_NAMES:
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in INDEXED_ATTRIBUTES[type(obj)]):
+                changes.add((ENTITY_NAMES[type(obj)], obj.id))
+    if changes:
+        log_search_changes(session.connection(), changes)
+
+
+def log_search_changes(connection, changes):
+    """
+    Catat (entity, entity_id) ke search_change. Dipakai juga oleh penulisan lewat Core
+    (mis. import massal) yang tidak melewati event flush ORM.
+    """
+    now = datetime.utcnow()
+    connection.execute(
+        SearchChange.__table__.insert(),
+        [{'entity': entity, 'entity_id': entity_id, 'created_at': now} for entity, entity_id in changes]
+    )
@@ -0,0 +1,411 @@
+import errno
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import Counter, namedtuple
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.models.matkul import (Material, Video, Submission, LetterSubmission, InternshipApplication,
+                               ThesisApplication, StoredBlob)
+
+try:
+    import fcntl
+except ImportError:  # Windows: GC tidak boleh berjalan bersamaan dengan upload
+    fcntl = None
+
+COPY_BLOCK_SIZE = 64 * 1024
+BLOB_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+blob_table = StoredBlob.__table__
+
+# Kolom model yang menyimpan key storage, beserta folder static lama untuk path tanpa folder
+FILE_REFERENCES = (
+    (Material, 'file_path', 'modul'),
+    (Video, 'video_path', 'videos'),
+    (Submission, 'file_path', None),
+    (LetterSubmission, 'file_path', None),
+    (InternshipApplication, 'file_path', None),
+    (ThesisApplication, 'file_path', None),
+)
+LEGACY_PREFIXES = ('app/static/', 'static/')
+
+StoredFile = namedtuple('StoredFile', 'key sha256 size deduplicated')
+
+
+def _atomic_move(src, dst):
+    """Pindahkan file ke tujuan secara atomik; beda filesystem disalin dulu ke file sementara."""
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staging = f'{dst}.{uuid.uuid4().hex}.partial'
+        shutil.copyfile(src, staging)
+        os.replace(staging, dst)
+        os.remove(src)
+
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def normalize_key(path, default_dir=None):
+    """
+    Ubah path lama di database ('app/static/uploads/..', '/static/videos/..', 'nama.pdf')
+    menjadi path relatif terhadap static. `default_dir` dipakai untuk nama file tanpa folder.
+    """
+    key = (path or '').replace('\\', '/').lstrip('/')
+    for prefix in LEGACY_PREFIXES:
+        if key.startswith(prefix):
+            key = key[len(prefix):]
+            break
+    if key and default_dir and '/' not in key:
+        key = f'{default_dir}/{key}'
+    return key
+
+
+class StorageBackend:
+    """
+    Antarmuka penyimpanan file upload dan materi kuliah.
+
+    File diacu lewat `key`, string yang disimpan di kolom file_path/video_path model.
+    Backend baru cukup mengimplementasikan method di bawah lalu didaftarkan di
+    STORAGE_BACKENDS.
+    """
+
+    def save(self, stream, extension=''):
+        """Simpan isi stream; mengembalikan StoredFile."""
+        raise NotImplementedError
+
+    def save_path(self, path, extension='', digest=None, move=False):
+        """Simpan file lokal yang sudah ada (dipindah jika `move`)."""
+        raise NotImplementedError
+
+    def is_managed(self, key):
+        """True jika key milik backend ini (bukan path lama)."""
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Path di disk untuk key, atau None jika backend tidak menyimpan di disk lokal."""
+        return None
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def iter_keys(self):
+        """Semua key yang tersimpan beserta waktu modifikasinya: (key, mtime)."""
+        raise NotImplementedError
+
+    def lock(self, key):
+        """Context manager yang menyerialkan simpan (dedup) dan hapus untuk satu key."""
+        return nullcontext()
+
+    def url(self, key, default_dir=None):
+        if not key:
+            return None
+        if key.startswith(('http://', 'https://')):
+            return key
+        return url_for('static', filename=normalize_key(key, default_dir))
+
+
+class LocalCASStorage(StorageBackend):
+    """
+    Storage content-addressed di disk lokal: isi file disimpan sekali di
+    `<root>/<sha[:2]>/<sha[2:4]>/<sha><ext>` dengan key `<prefix>/<sha[:2]>/<sha[2:4]>/<sha><ext>`.
+    Key relatif terhadap static (untuk X-Accel-Redirect), tetapi route static menolaknya;
+    URL-nya selalu lewat endpoint `main.stored_file` yang mengecek akses.
+    """
+
+    def __init__(self, root, prefix):
+        self.root = root
+        self.prefix = prefix.strip('/')
+        self.tmp_dir = os.path.join(root, '.tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def key_for(self, digest, extension=''):
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}'
+
+    def is_managed(self, key):
+        return bool(key) and key.startswith(f'{self.prefix}/')
+
+    def url(self, key, default_dir=None):
+        if self.is_managed(key):
+            return url_for('main.stored_file', key=key)
+        return super().url(key, default_dir)
+
+    def local_path(self, key):
+        if not self.is_managed(key):
+            return None
+        parts = key[len(self.prefix) + 1:].split('/')
+        if len(parts) != 3 or not BLOB_NAME_PATTERN.match(parts[2]):
+            return None
+        return os.path.join(self.root, *parts)
+
+    @contextmanager
+    def lock(self, key):
+        """
+        flock per key (dibagi ke 256 file lock menurut dua digit pertama hash) agar GC tidak
+        menghapus file yang baru saja dipakai dedup: cek keberadaan file, register_blob dan
+        penghapusan baris + file oleh GC masing-masing berjalan utuh di bawah kunci ini.
+        """
+        if fcntl is None:
+            yield
+            return
+        lock_dir = os.path.join(self.root, '.locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        name = key.rsplit('/', 1)[-1][:2]
+        with open(os.path.join(lock_dir, name), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _commit(self, source, digest, extension, move):
+        key = self.key_for(digest, extension)
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        size = os.path.getsize(source)
+        with self.lock(key):
+            deduplicated = os.path.exists(target)
+            if deduplicated:
+                if move:
+                    os.remove(source)
+            elif move:
+                _atomic_move(source, target)
+            else:
+                staging = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+                shutil.copyfile(source, staging)
+                os.replace(staging, target)
+            register_blob(key, digest, size)
+        return StoredFile(key, digest, size, deduplicated)
+
+    def save(self, stream, extension=''):
+        staging = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        hasher = hashlib.sha256()
+        try:
+            with open(staging, 'wb') as f:
+                for block in iter(lambda: stream.read(COPY_BLOCK_SIZE), b''):
+                    f.write(block)
+                    hasher.update(block)
+            return self._commit(staging, hasher.hexdigest(), extension, move=True)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+
+    def save_path(self, path, extension='', digest=None, move=False):
+        return self._commit(path, digest or file_digest(path), extension, move)
+
+    def size(self, key):
+        path = self.local_path(key)
+        return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if path is None:
+            return
+        # File turunan (mis. thumbnail `<sha>.thumb.jpg`) ikut dihapus
+        directory, name = os.path.split(path)
+        digest = name[:64]
+        for other in os.listdir(directory) if os.path.isdir(directory) else ():
+            if other == name or (other.startswith(f'{digest}.') and not BLOB_NAME_PATTERN.match(other)):
+                os.remove(os.path.join(directory, other))
+
+    def iter_keys(self):
+        for first in os.listdir(self.root):
+            if len(first) != 2:
+                continue
+            for second in os.listdir(os.path.join(self.root, first)):
+                directory = os.path.join(self.root, first, second)
+                for name in os.listdir(directory):
+                    if BLOB_NAME_PATTERN.match(name):
+                        yield f'{self.prefix}/{first}/{second}/{name}', os.path.getmtime(os.path.join(directory, name))
+
+
+STORAGE_BACKENDS = {
+    'local_cas': lambda config: LocalCASStorage(config['STORAGE_ROOT'], config['STORAGE_KEY_PREFIX']),
+}
+
+
+def register_blob(key, digest, size):
+    """
+    Catat blob (ref_count awal 0) dalam transaksi sendiri, terpisah dari request, agar
+    file yang sudah ada di disk selalu tercatat meski request-nya gagal. Untuk blob yang
+    sudah ada, updated_at diperbarui supaya tidak ikut dihapus GC selama masa tenggang.
+    """
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        result = connection.execute(blob_table.update().where(blob_table.c.key == key).values(updated_at=now))
+        if result.rowcount:
+            return
+        try:
+            with connection.begin_nested():
+                connection.execute(blob_table.insert().values(
+                    key=key, sha256=digest, size=size, ref_count=0, created_at=now, updated_at=now))
+        except IntegrityError:
+            pass
+
+
+def _collect_reference_deltas(session, storage):
+    """Hitung perubahan jumlah referensi per key dari objek model yang di-flush."""
+    deltas = Counter()
+    tracked = {model: attr for model, attr, _ in FILE_REFERENCES}
+
+    for obj in session.new:
+        attr = tracked.get(type(obj))
+        if attr and storage.is_managed(getattr(obj, attr)):
+            deltas[getattr(obj, attr)] += 1
+    for obj in session.deleted:
+        attr = tracked.get(type(obj))
+        if attr:
+            history = inspect(obj).attrs[attr].history
+            key = history.deleted[0] if history.deleted else getattr(obj, attr)
+            if storage.is_managed(key):
+                deltas[key] -= 1
+    for obj in session.dirty:
+        attr = tracked.get(type(obj))
+        if not attr:
+            continue
+        history = inspect(obj).attrs[attr].history
+        if not history.has_changes():
+            continue
+        for key in history.deleted:
+            if storage.is_managed(key):
+                deltas[key] -= 1
+        for key in history.added:
+            if storage.is_managed(key):
+                deltas[key] += 1
+
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_reference_deltas(session, flush_context):
+    storage = current_app.extensions.get('storage') if current_app else None
+    if storage is None:
+        return
+    deltas = _collect_reference_deltas(session, storage)
+    if not deltas:
+        return
+
+    connection = session.connection()
+    for key, delta in deltas.items():
+        result = connection.execute(
+            blob_table.update().where(blob_table.c.key == key).values(ref_count=blob_table.c.ref_count + delta)
+        )
+        if result.rowcount == 0:
+            # Key dikelola tapi belum tercatat (mis. ditulis manual ke database)
+            match = BLOB_NAME_PATTERN.match(key.rsplit('/', 1)[-1])
+            connection.execute(blob_table.insert().values(
+                key=key, sha256=match.group(1) if match else '', size=storage.size(key), ref_count=max(delta, 0)))
+
+
+def recount_references():
+    """Hitung ulang ref_count semua blob dari kolom model. Mengembalikan jumlah blob yang dikoreksi."""
+    storage = get_storage()
+    counts = Counter()
+    for model, attr, _ in FILE_REFERENCES:
+        column = getattr(model, attr)
+        for (key,) in db.session.execute(select(column).where(column.isnot(None))):
+            if storage.is_managed(key):
+                counts[key] += 1
+
+    corrected = 0
+    for row in db.session.execute(select(blob_table.c.key, blob_table.c.ref_count)).all():
+        expected = counts.pop(row.key, 0)
+        if row.ref_count != expected:
+            db.session.execute(blob_table.update().where(blob_table.c.key == row.key).values(ref_count=expected))
+            corrected += 1
+    for key, count in counts.items():
+        match = BLOB_NAME_PATTERN.match(key.rsplit('/', 1)[-1])
+        db.session.execute(blob_table.insert().values(
+            key=key, sha256=match.group(1) if match else '', size=storage.size(key), ref_count=count))
+        corrected += 1
+    db.session.commit()
+    return corrected
+
+
+def collect_garbage(grace_seconds=None, dry_run=False):
+    """
+    Hapus blob tanpa referensi yang lebih tua dari masa tenggang, juga file di disk yang
+    tidak tercatat sama sekali (sisa proses yang gagal sebelum register_blob).
+
+    :return: dict jumlah blob/file yang dihapus dan byte yang dibebaskan
+    """
+    storage = get_storage()
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get('STORAGE_GC_GRACE', 86400)
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    stats = {'blobs': 0, 'untracked': 0, 'bytes': 0}
+
+    candidates = db.session.execute(select(blob_table.c.id, blob_table.c.key, blob_table.c.size).where(
+        blob_table.c.ref_count <= 0, blob_table.c.updated_at < cutoff)).all()
+    db.session.rollback()
+    for row in candidates:
+        if dry_run:
+            stats['blobs'] += 1
+            stats['bytes'] += row.size
+            continue
+        # Kondisi ref_count diulang agar blob yang baru dipakai lagi tidak ikut terhapus; kunci
+        # key mencegah upload dedup ke file ini di antara penghapusan baris dan file
+        with storage.lock(row.key):
+            with db.engine.begin() as connection:
+                deleted = connection.execute(blob_table.delete().where(
+                    blob_table.c.id == row.id, blob_table.c.ref_count <= 0, blob_table.c.updated_at < cutoff)).rowcount
+            if deleted:
+                storage.delete(row.key)
+        if deleted:
+            stats['blobs'] += 1
+            stats['bytes'] += row.size
+
+    known = {key for (key,) in db.session.execute(select(blob_table.c.key))}
+    db.session.rollback()
+    cutoff_ts = time.time() - grace_seconds
+    for key, mtime in list(storage.iter_keys()):
+        if key in known or mtime >= cutoff_ts:
+            continue
+        size = storage.size(key)
+        if not dry_run:
+            with storage.lock(key):
+                # Upload yang dedup ke file ini setelah `known` dibaca sudah mendaftarkannya
+                if db.session.execute(select(blob_table.c.id).where(blob_table.c.key == key)).first() is not None:
+                    db.session.rollback()
+                    continue
+                db.session.rollback()
+                storage.delete(key)
+        stats['untracked'] += 1
+        stats['bytes'] += size
+    return stats
+
+
+def storage_url(key, default_dir=None):
+    """URL publik untuk key storage atau path lama (dipakai di template)."""
+    return get_storage().url(key, default_dir)
+
+
+def init_storage(app):
+    backend = app.config.get('STORAGE_BACKEND', 'local_cas')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f'STORAGE_BACKEND tidak dikenal: {backend}')
+    storage = STORAGE_BACKENDS[backend](app.config)
+    app.extensions['storage'] = storage
+    app.add_template_global(storage_url)
+    return storage
+
+
+def get_storage():
+    return current_app.extensions['storage']
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from flask import current_app
+from werkzeug.utils import secure_filename
+from app.utils.background import get_background_worker
+from app.utils.storage import _atomic_move, get_storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock file dengan batas umur (STALE_LOCK_SECONDS)
+    fcntl = None
+
+UPLOAD_CATEGORIES = ('tugas', 'magang', 'skripsi')
+COPY_BLOCK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+THUMBNAIL_SIZE = (320, 320)
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+# Tanpa fcntl: lock chunk yang tidak diperbarui selama ini dianggap sisa proses yang mati
+STALE_LOCK_SECONDS = 120
+
+
+class UploadError(ValueError):
+    """Upload ditolak; `status_code` dipakai langsung sebagai kode HTTP respons API."""
+
+    def __init__(self, message, status_code=400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class UploadStore:
+    """
+    Upload bertahap (resumable) ke area sementara.
+
+    Setiap sesi punya `<id>.part` (isi yang sudah diterima; ukurannya = offset) dan
+    `<id>.json` (metadata), jadi semua worker di host yang sama berbagi state. SHA-256
+    dihitung sambil chunk ditulis; state hash disimpan per proses dan dibangun ulang
+    dari file .part jika chunk berikutnya mendarat di worker lain.
+
+    Saat lengkap, file diserahkan ke storage content-addressed (app/utils/storage.py);
+    isi yang sama hanya disimpan sekali.
+    """
+
+    def __init__(self, tmp_dir, chunk_size, max_bytes, allowed_extensions, ttl):
+        self.tmp_dir = tmp_dir
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.allowed_extensions = allowed_extensions
+        self.ttl = ttl
+        self._hashers = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        os.makedirs(tmp_dir, exist_ok=True)
+
+    def _path(self, upload_id, suffix):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise UploadError('Upload tidak ditemukan', status_code=404)
+        return os.path.join(self.tmp_dir, f'{upload_id}{suffix}')
+
+    def save_meta(self, meta):
+        path = self._path(meta['id'], '.json')
+        staging = f'{path}.{uuid.uuid4().hex}'
+        with open(staging, 'w') as f:
+            json.dump(meta, f)
+        os.replace(staging, path)
+
+    def load(self, upload_id, user_id=None):
+        try:
+            with open(self._path(upload_id, '.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise UploadError('Upload tidak ditemukan', status_code=404)
+        if user_id is not None and meta['user_id'] != user_id:
+            raise UploadError('Upload tidak ditemukan', status_code=404)
+        part = self._path(upload_id, '.part')
+        meta['offset'] = os.path.getsize(part) if os.path.exists(part) else meta['size']
+        return meta
+
+    def _validate(self, category, filename, size):
+        if category not in UPLOAD_CATEGORIES:
+            raise UploadError('Kategori upload tidak dikenal')
+        name = secure_filename(filename or '')
+        extension = os.path.splitext(name)[1].lower()
+        if not name or extension.lstrip('.') not in self.allowed_extensions:
+            raise UploadError(f"Tipe file tidak diizinkan (hanya {', '.join(sorted(self.allowed_extensions))})")
+        if size is not None and (size <= 0 or size > self.max_bytes):
+            raise UploadError(f'Ukuran file harus 1 byte - {self.max_bytes // (1024 * 1024)} MB', status_code=413)
+        return name
+
+    def create(self, user_id, category, filename, size):
+        name = self._validate(category, filename, size)
+        meta = {
+            'id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'category': category,
+            'filename': name,
+            'size': size,
+            'status': 'uploading',
+            'created_at': time.time()
+        }
+        open(self._path(meta['id'], '.part'), 'wb').close()
+        self.save_meta(meta)
+        self._schedule_cleanup()
+        meta['offset'] = 0
+        return meta
+
+    @contextmanager
+    def _chunk_lock(self, upload_id):
+        """
+        Satu chunk per upload pada satu waktu (antar worker di host yang sama).
+
+        Dengan fcntl dipakai flock: kunci lepas sendiri saat proses pemegangnya mati, jadi
+        chunk yang lambat tidak pernah diambil alih. File lock tidak dihapus saat dilepas
+        (ikut dihapus bersama sesi) agar tidak ada dua pemegang di inode yang berbeda.
+        Tanpa fcntl dipakai file O_EXCL yang mtime-nya diperbarui selama chunk ditulis.
+
+        :yield: callable yang dipanggil berkala selama penulisan untuk memperbarui lock
+        """
+        lock_path = self._path(upload_id, '.lock')
+        if fcntl is not None:
+            with open(lock_path, 'a') as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadError('Chunk lain untuk upload ini sedang diproses', status_code=409)
+                try:
+                    yield lambda: None
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+            return
+
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            if time.time() - os.path.getmtime(lock_path) < STALE_LOCK_SECONDS:
+                raise UploadError('Chunk lain untuk upload ini sedang diproses', status_code=409)
+            os.utime(lock_path)
+        refreshed = [time.monotonic()]
+
+        def keepalive():
+            if time.monotonic() - refreshed[0] >= STALE_LOCK_SECONDS / 4:
+                os.utime(lock_path)
+                refreshed[0] = time.monotonic()
+
+        try:
+            yield keepalive
+        finally:
+            os.remove(lock_path)
+
+    def _hasher(self, upload_id, part_path, offset):
+        with self._lock:
+            cached = self._hashers.pop(upload_id, None)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        hasher = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            remaining = offset
+            while remaining:
+                block = f.read(min(COPY_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    def append(self, upload_id, user_id, offset, stream, length):
+        """
+        Tulis satu chunk di posisi `offset` (harus sama dengan offset server).
+
+        :return: metadata terbaru (status 'complete' jika chunk terakhir)
+        """
+        meta = self.load(upload_id, user_id)
+        if meta['status'] != 'uploading':
+            raise UploadError('Upload sudah selesai', status_code=409, offset=meta['offset'])
+        if length is None or length <= 0 or length > self.chunk_size:
+            raise UploadError(f'Ukuran chunk harus 1 byte - {self.chunk_size} byte', status_code=413)
+        if offset + length > meta['size']:
+            raise UploadError('Chunk melebihi ukuran file', status_code=413)
+
+        with self._chunk_lock(upload_id) as keepalive:
+            part_path = self._path(upload_id, '.part')
+            if not os.path.exists(part_path):
+                raise UploadError('Upload sudah selesai', status_code=409, offset=meta['size'])
+            current = os.path.getsize(part_path)
+            if offset != current:
+                raise UploadError('Offset tidak sesuai', status_code=409, offset=current)
+            hasher = self._hasher(upload_id, part_path, offset)
+            received = 0
+            with open(part_path, 'r+b') as f:
+                f.seek(offset)
+                while received < length:
+                    block = stream.read(min(COPY_BLOCK_SIZE, length - received))
+                    if not block:
+                        break
+                    f.write(block)
+                    hasher.update(block)
+                    received += len(block)
+                    keepalive()
+                if received != length:
+                    # Koneksi putus di tengah chunk: buang sisa agar offset tetap konsisten
+                    f.truncate(offset)
+                    raise UploadError('Chunk tidak lengkap, kirim ulang dari offset terakhir', offset=offset)
+
+            meta['offset'] = offset + received
+            if meta['offset'] < meta['size']:
+                with self._lock:
+                    self._hashers[upload_id] = (meta['offset'], hasher)
+                return meta
+            return self._finalize(meta, part_path, hasher.hexdigest())
+
+    def _finalize(self, meta, part_path, digest, background=True):
+        extension = os.path.splitext(meta['filename'])[1].lower()
+        stored = get_storage().save_path(part_path, extension, digest=digest, move=True)
+        meta.update(status='complete', sha256=digest, file_path=stored.key, deduplicated=stored.deduplicated,
+                    completed_at=time.time())
+        self.save_meta(meta)
+        # Hasil pindai disimpan per sesi upload, jadi isi yang sama (dedup) tetap dipindai ulang
+        if not stored.deduplicated or current_app.config.get('UPLOAD_SCAN_COMMAND'):
+            if background:
+                get_background_worker().submit(process_upload, meta['id'])
+            else:
+                process_upload(meta['id'])
+                meta = self.load(meta['id'])
+        return meta
+
+    def store_file(self, file_storage, user_id, category):
+        """
+        Jalur form biasa (tanpa chunk): salin stream sambil hashing lalu finalisasi seperti
+        upload bertahap. Pemrosesan (pindai virus) berjalan langsung karena hasilnya dipakai
+        di request yang sama; gunakan `attach` untuk mengambil path-nya.
+        """
+        meta = self.create(user_id, category, file_storage.filename, None)
+        part_path = self._path(meta['id'], '.part')
+        hasher = hashlib.sha256()
+        size = 0
+        with open(part_path, 'wb') as f:
+            while True:
+                block = file_storage.stream.read(COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > self.max_bytes:
+                    f.close()
+                    self.discard(meta['id'])
+                    raise UploadError(f'Ukuran file maksimal {self.max_bytes // (1024 * 1024)} MB', status_code=413)
+                f.write(block)
+                hasher.update(block)
+        meta['size'] = size
+        return self._finalize(meta, part_path, hasher.hexdigest(), background=False)
+
+    def attach(self, upload_id, user_id, category):
+        """
+        Ambil path file dari upload yang sudah selesai milik user untuk disimpan di model.
+        Jika UPLOAD_SCAN_COMMAND diisi, file baru boleh dipakai setelah hasil pindainya bersih.
+        """
+        meta = self.load(upload_id, user_id)
+        if meta['category'] != category:
+            raise UploadError('Upload bukan untuk formulir ini')
+        if meta['status'] != 'complete':
+            raise UploadError('Upload belum selesai', status_code=409, offset=meta['offset'])
+        scan = meta.get('scan')
+        if scan == 'infected':
+            raise UploadError('File ditolak oleh pemindai virus')
+        if current_app.config.get('UPLOAD_SCAN_COMMAND') and scan != 'clean':
+            if scan is None:
+                raise UploadError('File masih dipindai, coba kirim lagi sebentar', status_code=409)
+            raise UploadError('File gagal dipindai, silakan upload ulang')
+        return meta['file_path']
+
+    def discard(self, upload_id):
+        for suffix in ('.part', '.json', '.lock'):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+
+    def cleanup(self, max_age=None):
+        """Hapus sesi upload yang lebih tua dari `max_age` detik (default TTL). Mengembalikan jumlah sesi."""
+        cutoff = time.time() - (self.ttl if max_age is None else max_age)
+        removed = 0
+        for name in os.listdir(self.tmp_dir):
+            upload_id, suffix = os.path.splitext(name)
+            if suffix != '.json' or not UPLOAD_ID_PATTERN.match(upload_id):
+                continue
+            if os.path.getmtime(os.path.join(self.tmp_dir, name)) < cutoff:
+                self.discard(upload_id)
+                removed += 1
+        return removed
+
+    def _schedule_cleanup(self):
+        now = time.monotonic()
+        if now - self._last_cleanup < max(self.ttl / 24, 60):
+            return
+        self._last_cleanup = now
+        get_background_worker().submit(self.cleanup)
+
+
+# Hook pemrosesan setelah upload selesai: callable(meta, path) -> None, boleh mengubah meta
+POST_PROCESSORS = []
+
+
+def post_processor(func):
+    POST_PROCESSORS.append(func)
+    return func
+
+
+@post_processor
+def scan_upload(meta, path):
+    """Pindai dengan perintah eksternal (UPLOAD_SCAN_COMMAND, mis. `clamdscan --no-summary {path}`)."""
+    command = current_app.config.get('UPLOAD_SCAN_COMMAND')
+    if not command:
+        return
+    args = [part.replace('{path}', path) for part in shlex.split(command)]
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=current_app.config.get('UPLOAD_SCAN_TIMEOUT', 120))
+    except (OSError, subprocess.TimeoutExpired):
+        current_app.logger.exception('Pemindaian upload %s gagal dijalankan', meta['id'])
+        meta['scan'] = 'error'
+        return
+    # Konvensi ClamAV: 0 bersih, 1 terinfeksi, lainnya error
+    if result.returncode == 0:
+        meta['scan'] = 'clean'
+    elif result.returncode == 1:
+        meta['scan'] = 'infected'
+        quarantine = os.path.join(current_app.config['UPLOAD_TMP_DIR'], 'quarantine')
+        os.makedirs(quarantine, exist_ok=True)
+        _atomic_move(path, os.path.join(quarantine, os.path.basename(path)))
+        current_app.logger.warning('Upload %s (%s) terdeteksi virus dan dikarantina', meta['id'], meta['filename'])
+    else:
+        meta['scan'] = 'error'
+
+
+@post_processor
+def make_thumbnail(meta, path):
+    """Thumbnail JPEG untuk upload gambar (butuh Pillow; dilewati jika tidak terpasang)."""
+    if meta.get('scan') == 'infected' or not path.lower().endswith(IMAGE_EXTENSIONS):
+        return
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    thumbnail_path = os.path.splitext(path)[0] + '.thumb.jpg'
+    with Image.open(path) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        image.convert('RGB').save(thumbnail_path, 'JPEG', quality=80)
+    meta['thumbnail'] = os.path.splitext(meta['file_path'])[0] + '.thumb.jpg'
+
+
+def process_upload(upload_id):
+    store = get_upload_store()
+    meta = store.load(upload_id)
+    path = get_storage().local_path(meta['file_path'])
+    if path is None:
+        return
+    for processor in POST_PROCESSORS:
+        processor(meta, path)
+        if not os.path.exists(path):
+            break
+    meta['processed_at'] = time.time()
+    store.save_meta(meta)
+
+
+def init_upload_store(app):
+    config = app.config
+    store = UploadStore(
+        tmp_dir=config['UPLOAD_TMP_DIR'],
+        chunk_size=config.get('UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024),
+        max_bytes=config.get('UPLOAD_MAX_BYTES', 100 * 1024 * 1024),
+        allowed_extensions=set(config.get('UPLOAD_ALLOWED_EXTENSIONS', 'pdf').split(',')),
+        ttl=config.get('UPLOAD_SESSION_TTL', 86400)
+    )
+    app.extensions['upload_store'] = store
+    return store
+
+
+def get_upload_store():
+    return current_app.extensions['upload_store']
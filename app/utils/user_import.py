@@ -0,0 +1,293 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import bcrypt as bcrypt_lib
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.api.users_api import validate_email, validate_nim
+from app.models.user import User
+from app.utils.background import get_background_worker
+from app.utils.search import log_search_changes
+
+REQUIRED_FIELDS = ['nim', 'nama', 'email', 'program_studi', 'password']
+VALID_ROLES = ['mahasiswa', 'dosen', 'admin']
+# Di bawah jumlah ini biaya menyalakan process pool lebih besar dari hashing-nya
+MIN_POOL_ROWS = 16
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_import(data, fmt):
+    """
+    Baca isi file import menjadi list dict.
+
+    :param data: bytes/str isi file
+    :param fmt: 'csv' atau 'json' (JSON berupa list atau {"users": [...]})
+    :raises ImportFormatError: jika format tidak dikenal atau isi tidak valid
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(data))
+        return [{(key or '').strip(): (value or '').strip() for key, value in row.items()} for row in reader]
+    if fmt == 'json':
+        try:
+            payload = json.loads(data)
+        except ValueError as e:
+            raise ImportFormatError(f'Invalid JSON: {e}') from e
+        if isinstance(payload, dict):
+            payload = payload.get('users')
+        if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+            raise ImportFormatError('JSON must be a list of users or {"users": [...]}')
+        return payload
+    raise ImportFormatError(f'Unsupported format: {fmt}')
+
+
+def detect_format(filename, content_type=None):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.csv', '.json'):
+        return extension[1:]
+    if content_type and 'json' in content_type:
+        return 'json'
+    if content_type and 'csv' in content_type:
+        return 'csv'
+    raise ImportFormatError('Cannot detect file format, use a .csv or .json file')
+
+
+def _hash_password(args):
+    password, rounds, prefix, handle_long = args
+    password = password.encode('utf-8')
+    if handle_long:
+        password = hashlib.sha256(password).hexdigest().encode('utf-8')
+    return bcrypt_lib.hashpw(password, bcrypt_lib.gensalt(rounds=rounds, prefix=prefix)).decode('utf-8')
+
+
+def hash_passwords(passwords, workers=None, chunksize=8):
+    """
+    Hash password dengan parameter yang sama seperti Flask-Bcrypt (BCRYPT_LOG_ROUNDS dst.),
+    dibagi ke beberapa proses karena bcrypt sengaja mahal di CPU.
+
+    :param workers: jumlah proses; 0 berarti hash di proses ini
+    """
+    config = current_app.config
+    options = (
+        config.get('BCRYPT_LOG_ROUNDS', 12),
+        config.get('BCRYPT_HASH_PREFIX', '2b').encode('utf-8'),
+        config.get('BCRYPT_HANDLE_LONG_PASSWORDS', False)
+    )
+    jobs = [(password,) + options for password in passwords]
+    if workers == 0 or len(jobs) < MIN_POOL_ROWS:
+        return [_hash_password(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_hash_password, jobs, chunksize=chunksize))
+
+
+def validate_rows(rows):
+    """
+    Validasi field dan duplikasi, termasuk cek NIM/email terdaftar lewat query set-based.
+
+    :return: (valid_rows, errors) - valid_rows berisi (nomor_baris, data) yang siap diinsert
+    """
+    errors = []
+    candidates = []
+    seen_nim = {}
+    seen_email = {}
+    for number, raw in enumerate(rows, start=1):
+        row = {key: (str(raw.get(key)).strip() if raw.get(key) is not None else '') for key in REQUIRED_FIELDS + ['role']}
+        row['role'] = row['role'] or 'mahasiswa'
+        row_errors = [f'{field} is required' for field in REQUIRED_FIELDS if not row[field]]
+        if row['nim'] and not validate_nim(row['nim']):
+            row_errors.append('Invalid NIM format')
+        if row['email'] and not validate_email(row['email']):
+            row_errors.append('Invalid email format')
+        if row['role'] not in VALID_ROLES:
+            row_errors.append('Invalid role')
+        email_key = row['email'].lower()
+        if row['nim'] and row['nim'] in seen_nim:
+            row_errors.append(f"Duplicate NIM in file (row {seen_nim[row['nim']]})")
+        if email_key and email_key in seen_email:
+            row_errors.append(f"Duplicate email in file (row {seen_email[email_key]})")
+        seen_nim.setdefault(row['nim'], number)
+        seen_email.setdefault(email_key, number)
+
+        if row_errors:
+            errors.append({'row': number, 'nim': row['nim'], 'errors': row_errors})
+        else:
+            candidates.append((number, row))
+
+    existing_nims = set()
+    existing_emails = set()
+    for start in range(0, len(candidates), 1000):
+        chunk = candidates[start:start + 1000]
+        nims = [row['nim'] for _, row in chunk]
+        emails = [row['email'] for _, row in chunk]
+        for nim, email in db.session.query(User.nim, User.email).filter(or_(User.nim.in_(nims), User.email.in_(emails))):
+            existing_nims.add(nim)
+            existing_emails.add(email.lower())
+
+    valid = []
+    for number, row in candidates:
+        row_errors = []
+        if row['nim'] in existing_nims:
+            row_errors.append('NIM already exists')
+        if row['email'].lower() in existing_emails:
+            row_errors.append('Email already exists')
+        if row_errors:
+            errors.append({'row': number, 'nim': row['nim'], 'errors': row_errors})
+        else:
+            valid.append((number, row))
+    return valid, errors
+
+
+def _insert_chunk(chunk):
+    """Insert satu batch dengan executemany. Mengembalikan jumlah baris yang masuk."""
+    now = datetime.utcnow()
+    values = [dict(row, created_at=now) for _, row in chunk]
+    connection = db.session.connection()
+    connection.execute(User.__table__.insert(), values)
+    # executemany tidak mengembalikan id, ambil lewat NIM untuk log perubahan index pencarian
+    ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.nim.in_([row['nim'] for _, row in chunk]))]
+    if ids:
+        log_search_changes(connection, [('user', user_id) for user_id in ids])
+    return len(values)
+
+
+def import_users(rows, workers=None, batch_size=500, dry_run=False):
+    """
+    Import massal user: validasi, hash password paralel, lalu insert per batch.
+
+    Setiap batch di-commit sendiri. Jika satu batch gagal karena constraint (mis. NIM
+    yang baru saja didaftarkan request lain), batch itu diulang per baris agar laporan
+    error tetap per baris.
+
+    :return: dict laporan (total, created, failed, errors, seconds)
+    """
+    started = time.perf_counter()
+    valid, errors = validate_rows(rows)
+    created = 0
+
+    if valid and not dry_run:
+        hashes = hash_passwords([row['password'] for _, row in valid], workers=workers)
+        for (_, row), hashed in zip(valid, hashes):
+            row['password'] = hashed
+
+        for start in range(0, len(valid), batch_size):
+            chunk = valid[start:start + batch_size]
+            try:
+                created += _insert_chunk(chunk)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                for item in chunk:
+                    try:
+                        created += _insert_chunk([item])
+                        db.session.commit()
+                    except IntegrityError:
+                        db.session.rollback()
+                        errors.append({'row': item[0], 'nim': item[1]['nim'], 'errors': ['NIM or email already exists']})
+
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'total': len(rows),
+        'created': len(valid) if dry_run else created,
+        'failed': len(errors),
+        'dry_run': dry_run,
+        'errors': errors,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def _job_path(job_id):
+    if not JOB_ID_PATTERN.match(job_id or ''):
+        return None
+    return os.path.join(current_app.config['USER_IMPORT_JOB_DIR'], f'{job_id}.json')
+
+
+def _save_job(job):
+    path = _job_path(job['id'])
+    staging = f'{path}.{uuid.uuid4().hex}'
+    with open(staging, 'w') as f:
+        json.dump(job, f)
+    os.replace(staging, path)
+
+
+def load_import_job(job_id):
+    """Status job import dari `submit_import`; None jika id tidak dikenal atau sudah kedaluwarsa."""
+    path = _job_path(job_id)
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _cleanup_jobs(directory, ttl):
+    cutoff = time.time() - ttl
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def submit_import(rows, requested_by=None):
+    """
+    Antrekan import di worker background dan kembalikan job (status 'queued').
+
+    Hashing bcrypt bisa memakan puluhan detik untuk ribuan baris, jadi request API
+    tidak menunggu; status dan laporan dibaca lewat `load_import_job`. Job disimpan
+    sebagai file JSON supaya bisa dibaca worker web mana pun di host yang sama.
+
+    :return: dict job, atau None jika antrian background penuh
+    """
+    directory = current_app.config['USER_IMPORT_JOB_DIR']
+    os.makedirs(directory, exist_ok=True)
+    _cleanup_jobs(directory, current_app.config.get('USER_IMPORT_JOB_TTL', 86400))
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'total': len(rows),
+        'requested_by': requested_by,
+        'created_at': datetime.utcnow().isoformat(),
+        'report': None
+    }
+    _save_job(job)
+    if not get_background_worker().submit(_run_import_job, job['id'], rows):
+        os.remove(_job_path(job['id']))
+        return None
+    return job
+
+
+def _run_import_job(job_id, rows):
+    job = load_import_job(job_id)
+    job['status'] = 'running'
+    _save_job(job)
+    try:
+        # Di dalam proses web: tanpa process pool (fork dari worker yang punya thread lain),
+        # bcrypt melepas GIL sehingga thread request tetap jalan
+        job['report'] = import_users(rows, workers=0)
+        job['status'] = 'done'
+    except Exception as e:
+        db.session.rollback()
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        raise
+    finally:
+        job['finished_at'] = datetime.utcnow().isoformat()
+        _save_job(job)
@@ -0,0 +1,238 @@
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import abort, current_app, send_file, make_response
+from sqlalchemy import select
+from app import db
+from app.models.matkul import Course, KRS, Material, Submission, Video
+from app.utils.schedule_index import EXCLUDED_KRS_STATUS
+from app.utils.storage import FILE_REFERENCES, get_storage, normalize_key
+
+VIDEO_MIMETYPES = {'.mp4': 'video/mp4', '.m4v': 'video/mp4', '.webm': 'video/webm', '.ogg': 'video/ogg'}
+
+
+def can_watch(user, course_id):
+    """Admin boleh semua; dosen hanya mata kuliah yang diampu; mahasiswa harus punya KRS yang tidak ditolak."""
+    if user.role == 'admin':
+        return True
+    if user.role == 'dosen':
+        return db.session.query(Course.id).filter_by(id=course_id, dosen_id=user.id).first() is not None
+    return db.session.query(KRS.id).filter(
+        KRS.student_id == user.id,
+        KRS.course_id == course_id,
+        KRS.status.notin_(EXCLUDED_KRS_STATUS)
+    ).first() is not None
+
+
+def resolve_video_file(video):
+    """
+    Cari file video di disk.
+
+    :return: (path absolut, path relatif terhadap static, etag) atau None jika tidak ada
+    """
+    storage = get_storage()
+    key = video.video_path or ''
+    path = storage.local_path(key)
+    if path is not None:
+        # Nama file CAS adalah SHA-256 isinya, jadi bisa langsung dipakai sebagai ETag kuat
+        etag = os.path.basename(path).split('.')[0]
+    else:
+        static_folder = os.path.realpath(current_app.static_folder)
+        key = normalize_key(key, 'videos')
+        path = os.path.realpath(os.path.join(static_folder, key))
+        if not path.startswith(static_folder + os.sep):
+            return None
+        etag = True
+    if not os.path.isfile(path):
+        return None
+    return path, normalize_key(key), etag
+
+
+class StreamGrantCache:
+    """
+    LRU in-process (user_id, video_id) -> file video yang boleh diputar.
+
+    Pemutar mengirim banyak Range request untuk satu video (setiap seek); cache ini
+    membuat request berikutnya tidak perlu query Video dan KRS lagi. Pencabutan akses
+    (KRS ditolak) berlaku paling lambat setelah TTL.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, video_id):
+        key = (user_id, video_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def set(self, user_id, video_id, resolved):
+        with self._lock:
+            self._entries[(user_id, video_id)] = (time.monotonic() + self.ttl, resolved)
+            self._entries.move_to_end((user_id, video_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def authorize_stream(user, video_id):
+    """
+    Cek akses dan cari file video (dengan cache).
+
+    :return: (path, path relatif static, etag)
+    :raises LookupError: video/file tidak ada
+    :raises PermissionError: user tidak terdaftar di mata kuliah video
+    """
+    grants = current_app.extensions['video_grants']
+    resolved = grants.get(user.id, video_id)
+    if resolved is not None and os.path.exists(resolved[0]):
+        return resolved
+
+    video = db.session.get(Video, video_id)
+    if video is None:
+        raise LookupError(video_id)
+    if not can_watch(user, video.course_id):
+        raise PermissionError(video_id)
+    resolved = resolve_video_file(video)
+    if resolved is None:
+        raise LookupError(video_id)
+    grants.set(user.id, video_id, resolved)
+    return resolved
+
+
+def authorize_watch(user, video_id):
+    """
+    Cek akses untuk ping progres tonton (dengan cache seperti `authorize_stream`).
+
+    :return: durasi video dalam detik dari Video.durasi, atau None jika belum diisi
+    :raises LookupError: video tidak ada
+    :raises PermissionError: user tidak terdaftar di mata kuliah video
+    """
+    grants = current_app.extensions['watch_grants']
+    granted = grants.get(user.id, video_id)
+    if granted is not None:
+        return granted[0]
+
+    video = db.session.get(Video, video_id)
+    if video is None:
+        raise LookupError(video_id)
+    if not can_watch(user, video.course_id):
+        raise PermissionError(video_id)
+    duration = video.durasi * 60 if video.durasi else None
+    grants.set(user.id, video_id, (duration,))
+    return duration
+
+
+def can_access_file(user, obj):
+    """Hak unduh file milik `obj` (salah satu model di FILE_REFERENCES)."""
+    if user.role == 'admin':
+        return True
+    if isinstance(obj, (Material, Video)):
+        return can_watch(user, obj.course_id)
+    if isinstance(obj, Submission) and user.role == 'dosen':
+        return can_watch(user, obj.course_id)
+    # Pengumpulan tugas dan pengajuan surat/magang/skripsi hanya untuk pemiliknya
+    return obj.student_id == user.id
+
+
+def authorize_file(user, key):
+    """
+    Cek akses file di storage: boleh jika salah satu baris yang mengacu key boleh dilihat user.
+
+    :return: (path, path relatif static, etag)
+    :raises LookupError: key tidak dikelola storage, tidak diacu baris mana pun, atau file tidak ada
+    :raises PermissionError: tidak ada baris pengacu yang boleh dilihat user
+    """
+    storage = get_storage()
+    path = storage.local_path(key)
+    if path is None:
+        raise LookupError(key)
+    referenced = False
+    for model, attr, _ in FILE_REFERENCES:
+        for obj in db.session.scalars(select(model).where(getattr(model, attr) == key).limit(20)):
+            referenced = True
+            if can_access_file(user, obj):
+                if not os.path.isfile(path):
+                    raise LookupError(key)
+                return path, key, os.path.basename(path).split('.')[0]
+    if not referenced:
+        raise LookupError(key)
+    raise PermissionError(key)
+
+
+def video_response(path, relative_path, etag):
+    """
+    Kirim file video dengan dukungan Range/If-Range, ETag dan Last-Modified.
+
+    Jika VIDEO_ACCEL_REDIRECT_PREFIX diisi, isi file diserahkan ke nginx lewat
+    X-Accel-Redirect (nginx sendiri yang menangani Range dan sendfile). Selain itu
+    send_file dipakai; dengan USE_X_SENDFILE=True pengiriman dioper ke server web
+    lewat header X-Sendfile.
+    """
+    return file_response(path, relative_path, etag, VIDEO_MIMETYPES.get(os.path.splitext(path)[1].lower()))
+
+
+def file_response(path, relative_path, etag, mimetype=None):
+    """Kirim file yang aksesnya sudah dicek (video atau blob storage), lihat `video_response`."""
+    config = current_app.config
+    mimetype = mimetype or mimetypes.guess_type(path)[0]
+    max_age = config.get('VIDEO_CACHE_MAX_AGE', 3600)
+
+    prefix = config.get('VIDEO_ACCEL_REDIRECT_PREFIX')
+    if prefix:
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{relative_path}"
+        response.headers['Content-Type'] = mimetype or 'application/octet-stream'
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=max_age)
+    # Video hanya untuk pengguna yang berhak, jadi jangan disimpan cache bersama (proxy/CDN)
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.max_age = max_age
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def protected_static_dirs(config):
+    """Folder di bawah static yang hanya boleh dilayani lewat endpoint yang mengecek akses."""
+    return ('videos', config.get('STORAGE_KEY_PREFIX', 'uploads/cas').strip('/'))
+
+
+def protect_static(app):
+    """
+    Route static bawaan Flask menolak static/videos dan folder blob storage (404), supaya
+    file di sana tidak bisa diunduh tanpa cek KRS/pemilik. Di produksi lokasi yang sama
+    juga harus ditolak atau dibuat `internal` di server web (lihat VIDEO_ACCEL_REDIRECT_PREFIX).
+    """
+    prefixes = tuple(f'{directory.lower()}/' for directory in protected_static_dirs(app.config))
+    static_view = app.view_functions['static']
+
+    @wraps(static_view)
+    def guarded_static(filename):
+        normalized = posixpath.normpath(filename.replace('\\', '/')).lstrip('/').lower()
+        if normalized.startswith(prefixes):
+            abort(404)
+        return static_view(filename=filename)
+
+    app.view_functions['static'] = guarded_static
+
+
+def init_video_delivery(app):
+    grants = StreamGrantCache(ttl=app.config.get('VIDEO_GRANT_TTL', 60))
+    app.extensions['video_grants'] = grants
+    app.extensions['watch_grants'] = StreamGrantCache(ttl=app.config.get('VIDEO_GRANT_TTL', 60))
+    protect_static(app)
+    return grants
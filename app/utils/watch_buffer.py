@@ -0,0 +1,196 @@
+import atexit
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, or_, insert, update
+from app import db
+from app.models.matkul import Video, VideoWatch
+
+# Video dianggap selesai jika sudah ditonton minimal 90% durasinya
+COMPLETION_THRESHOLD = 0.9
+
+
+class WatchBuffer:
+    """
+    Buffer write-behind untuk telemetry video.
+
+    Player mengirim ping setiap beberapa detik; buffer hanya menyimpan posisi terakhir
+    per (student_id, video_id) di memori lalu menulisnya ke tabel video_watch dalam
+    batch upsert setiap `flush_interval` detik atau setiap `max_events` ping.
+
+    Jika database tidak bisa ditulis, batch dikembalikan ke buffer untuk dicoba lagi,
+    tetapi buffer dibatasi `max_pending` pasangan; ping di luar batas itu dibuang dan
+    dihitung di `dropped`.
+    """
+
+    def __init__(self, app, flush_interval=10, max_events=500, max_pending=50000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._events = 0
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def record(self, student_id, video_id, watch_time, total_duration):
+        """:param total_duration: durasi dari Video.durasi (detik), 0 jika tidak diketahui (tidak bisa selesai)"""
+        completed = total_duration > 0 and watch_time >= total_duration * COMPLETION_THRESHOLD
+        with self._lock:
+            previous = self._pending.get((student_id, video_id))
+            if previous is None and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending[(student_id, video_id)] = {
+                'student_id': student_id,
+                'video_id': video_id,
+                'watch_time': watch_time,
+                'total_duration': total_duration,
+                'completed': completed or bool(previous and previous['completed']),
+                'last_watched': datetime.utcnow()
+            }
+            self._events += 1
+            due = self._events >= self.max_events or time.monotonic() - self._last_flush >= self.flush_interval
+        self._ensure_timer()
+        if due:
+            # Penulisan dilakukan thread flush, request tidak menunggu database
+            self._wakeup.set()
+
+    def _ensure_timer(self):
+        if self._timer is not None or self._stopped:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name='watch-buffer-flush', daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Gagal menulis buffer video watch')
+
+    def flush(self):
+        """Tulis semua posisi yang tertunda ke database. Mengembalikan jumlah baris yang ditulis."""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._events = 0
+                self._last_flush = time.monotonic()
+            if not pending:
+                return 0
+            with self.app.app_context():
+                try:
+                    return self._write(list(pending.values()))
+                except Exception:
+                    db.session.rollback()
+                    # Kembalikan ke buffer agar dicoba lagi pada flush berikutnya (posisi yang lebih baru menang)
+                    dropped = 0
+                    with self._lock:
+                        for key, row in pending.items():
+                            if key in self._pending:
+                                continue
+                            if len(self._pending) >= self.max_pending:
+                                dropped += 1
+                                continue
+                            self._pending[key] = row
+                        self.dropped += dropped
+                    if dropped:
+                        self.app.logger.warning('Buffer video watch penuh, %d posisi dibuang', dropped)
+                    raise
+                finally:
+                    db.session.remove()
+
+    def _write(self, rows):
+        # Abaikan ping untuk video yang tidak ada agar satu baris tidak menggagalkan seluruh batch
+        video_ids = {row['video_id'] for row in rows}
+        existing_videos = {video_id for (video_id,) in db.session.query(Video.id).filter(Video.id.in_(video_ids))}
+        rows = [row for row in rows if row['video_id'] in existing_videos]
+        if not rows:
+            return 0
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(VideoWatch.__table__)
+            stmt = stmt.on_duplicate_key_update(
+                watch_time=stmt.inserted.watch_time,
+                total_duration=stmt.inserted.total_duration,
+                completed=VideoWatch.__table__.c.completed | stmt.inserted.completed,
+                last_watched=stmt.inserted.last_watched
+            )
+            db.session.execute(stmt, rows)
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            stmt = sqlite_insert(VideoWatch.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['student_id', 'video_id'],
+                set_={
+                    'watch_time': stmt.excluded.watch_time,
+                    'total_duration': stmt.excluded.total_duration,
+                    'completed': VideoWatch.__table__.c.completed | stmt.excluded.completed,
+                    'last_watched': stmt.excluded.last_watched
+                }
+            )
+            db.session.execute(stmt, rows)
+        else:
+            self._write_generic(rows)
+
+        db.session.commit()
+        return len(rows)
+
+    def _write_generic(self, rows):
+        keys = [and_(VideoWatch.student_id == row['student_id'], VideoWatch.video_id == row['video_id']) for row in rows]
+        existing = {
+            (student_id, video_id): (watch_id, completed)
+            for watch_id, student_id, video_id, completed in db.session.query(
+                VideoWatch.id, VideoWatch.student_id, VideoWatch.video_id, VideoWatch.completed
+            ).filter(or_(*keys))
+        }
+        updates = []
+        inserts = []
+        for row in rows:
+            found = existing.get((row['student_id'], row['video_id']))
+            if found:
+                watch_id, completed = found
+                updates.append(dict(row, id=watch_id, completed=row['completed'] or bool(completed)))
+            else:
+                inserts.append(row)
+        if updates:
+            db.session.execute(update(VideoWatch), updates)
+        if inserts:
+            db.session.execute(insert(VideoWatch), inserts)
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception:
+            self.app.logger.exception('Gagal menulis buffer video watch saat shutdown')
+
+
+def init_watch_buffer(app):
+    buffer = WatchBuffer(
+        app,
+        flush_interval=app.config.get('WATCH_FLUSH_INTERVAL', 10),
+        max_events=app.config.get('WATCH_FLUSH_MAX_EVENTS', 500),
+        max_pending=app.config.get('WATCH_BUFFER_MAX_PENDING', 50000)
+    )
+    app.extensions['watch_buffer'] = buffer
+    atexit.register(buffer.close)
+    return buffer
+
+
+def get_watch_buffer():
+    return current_app.extensions['watch_buffer']
@@ -10,7 +10,6 @@ load_dotenv()
 db = SQLAlchemy()
 
 logging.basicConfig()
-logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-123')
@@ -24,5 +23,124 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool koneksi per proses worker (lihat app/utils/database.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # detik menunggu koneksi bebas
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # detik, harus di bawah wait_timeout MySQL
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))  # 0 = tanpa batas
+
+    # Read replica opsional untuk view read-only (@replica_reads)
+    DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+    SQLALCHEMY_REPLICA_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_REPLICA_HOST}/{DB_NAME}" if DB_REPLICA_HOST else None
+
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+    # Upload bertahap lewat /api/uploads (app/utils/uploads.py)
+    UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'uploads_tmp'))
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE_MB', 4)) * 1024 * 1024  # harus di bawah MAX_CONTENT_LENGTH
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_MB', 100)) * 1024 * 1024  # per file
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 86400))  # detik, sesi yang tidak selesai dihapus
+    UPLOAD_ALLOWED_EXTENSIONS = os.environ.get('UPLOAD_ALLOWED_EXTENSIONS', 'pdf,doc,docx,ppt,pptx,xls,xlsx,zip,rar,txt,jpg,jpeg,png')
+    UPLOAD_SCAN_COMMAND = os.environ.get('UPLOAD_SCAN_COMMAND')  # mis. "clamdscan --no-summary {path}"
+    UPLOAD_SCAN_TIMEOUT = int(os.environ.get('UPLOAD_SCAN_TIMEOUT', 120))
+
+    # Storage content-addressed untuk file upload dan materi (app/utils/storage.py)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local_cas')
+    STORAGE_ROOT = os.environ.get('STORAGE_ROOT', os.path.join(UPLOAD_FOLDER, 'cas'))
+    # STORAGE_ROOT relatif terhadap static; route static menolak folder ini, file dilayani /files/<key>
+    STORAGE_KEY_PREFIX = os.environ.get('STORAGE_KEY_PREFIX', 'uploads/cas')
+    STORAGE_GC_GRACE = int(os.environ.get('STORAGE_GC_GRACE', 86400))  # detik sebelum blob tanpa referensi dihapus
+
+    # Streaming video e-learning (app/utils/video_delivery.py)
+    VIDEO_CACHE_MAX_AGE = int(os.environ.get('VIDEO_CACHE_MAX_AGE', 3600))
+    VIDEO_GRANT_TTL = int(os.environ.get('VIDEO_GRANT_TTL', 60))  # detik hak putar (cek KRS) di-cache per proses
+    # Mis. "/protected-static" untuk nginx `location /protected-static/ { internal; alias .../app/static/; }`.
+    # Jika nginx melayani /static langsung, tolak juga /static/videos/ dan /static/uploads/cas/ di sana
+    VIDEO_ACCEL_REDIRECT_PREFIX = os.environ.get('VIDEO_ACCEL_REDIRECT_PREFIX')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'  # Apache mod_xsendfile / lighttpd
+
+    # Cache listing static/modul serta playlist video (app/utils/file_catalog.py)
+    FILE_CATALOG_CHECK_INTERVAL = int(os.environ.get('FILE_CATALOG_CHECK_INTERVAL', 5))  # detik antar cek mtime folder
+    FILE_CATALOG_PLAYLIST_TTL = int(os.environ.get('FILE_CATALOG_PLAYLIST_TTL', 300))
+    FILE_CATALOG_WARM = os.environ.get('FILE_CATALOG_WARM', 'true').lower() == 'true'
+
+    # Halaman materi e-learning (app/utils/course_content.py)
+    MATERI_WEEKS_PER_PAGE = int(os.environ.get('MATERI_WEEKS_PER_PAGE', 4))
+    MATERI_ITEMS_PER_PAGE = int(os.environ.get('MATERI_ITEMS_PER_PAGE', 20))  # materi/video per minggu per permintaan
+
+    # Forum e-learning (app/utils/forum.py)
+    FORUM_THREADS_PER_PAGE = int(os.environ.get('FORUM_THREADS_PER_PAGE', 20))
+    FORUM_REPLIES_PER_PAGE = int(os.environ.get('FORUM_REPLIES_PER_PAGE', 20))
+
+    # Push Server-Sent Events lewat /api/events (app/utils/event_bus.py)
+    EVENTS_BROKER_URL = os.environ.get('EVENTS_BROKER_URL')  # opsional, mis. redis://localhost:6379/0 untuk banyak worker
+    EVENTS_HEARTBEAT = int(os.environ.get('EVENTS_HEARTBEAT', 15))  # detik antar komentar keep-alive
+    EVENTS_STREAM_TIMEOUT = int(os.environ.get('EVENTS_STREAM_TIMEOUT', 300))  # detik, lalu browser menyambung ulang
+    EVENTS_RETRY_MS = int(os.environ.get('EVENTS_RETRY_MS', 3000))
+    EVENTS_REPLAY_SIZE = int(os.environ.get('EVENTS_REPLAY_SIZE', 1000))  # event terakhir untuk Last-Event-ID
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 256))  # per koneksi, lewat dari ini klien diminta resync
+    # Setiap stream memegang satu thread worker selama EVENTS_STREAM_TIMEOUT. Di worker thread
+    # (gthread/werkzeug) batasnya separuh WEB_THREADS; 500 stream per proses butuh worker
+    # async (gunicorn -k gevent/eventlet), lihat subscriber_limit di app/utils/event_bus.py
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))  # samakan dengan --threads gunicorn
+    EVENTS_ASYNC_WORKER = os.environ.get('EVENTS_ASYNC_WORKER', '0') == '1'  # paksa mode async (app dimuat sebelum monkey patch)
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 500))
+
+    # Log search_change untuk index pencarian (app/utils/search.py)
+    # Id dibagikan saat INSERT, bukan saat commit: id yang terlewat dibaca ulang selama ini (detik)
+    SEARCH_CHANGE_GAP_SECONDS = int(os.environ.get('SEARCH_CHANGE_GAP_SECONDS', 300))
+
+    # Full-text search forum, materi/video dan abstrak skripsi (app/utils/fulltext.py)
+    FULLTEXT_INDEX_DIR = os.environ.get('FULLTEXT_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'cache', 'fulltext'))
+    FULLTEXT_FLUSH_DOCS = int(os.environ.get('FULLTEXT_FLUSH_DOCS', 2000))  # perubahan di memori sebelum ditulis jadi segmen
+    FULLTEXT_MAX_SEGMENTS = int(os.environ.get('FULLTEXT_MAX_SEGMENTS', 8))  # lewat dari ini segmen kecil digabung
+    FULLTEXT_SEGMENT_DOCS = int(os.environ.get('FULLTEXT_SEGMENT_DOCS', 200000))  # dokumen per segmen saat build
+    FULLTEXT_BM25_K1 = float(os.environ.get('FULLTEXT_BM25_K1', 1.2))
+    FULLTEXT_BM25_B = float(os.environ.get('FULLTEXT_BM25_B', 0.75))
+    # Term yang ada di lebih dari porsi dokumen ini hanya menambah skor, tidak dipindai (lihat FulltextIndex.search)
+    FULLTEXT_COMMON_TERM_RATIO = float(os.environ.get('FULLTEXT_COMMON_TERM_RATIO', 0.1))
+    FULLTEXT_RESULTS_PER_PAGE = int(os.environ.get('FULLTEXT_RESULTS_PER_PAGE', 10))
+
+    # Worker background di dalam proses (app/utils/background.py)
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 1))
+    BACKGROUND_MAX_QUEUE = int(os.environ.get('BACKGROUND_MAX_QUEUE', 1000))
+
+    # Job import user lewat API (app/utils/user_import.py), dijalankan di worker background
+    USER_IMPORT_JOB_DIR = os.environ.get('USER_IMPORT_JOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'import_jobs'))
+    USER_IMPORT_JOB_TTL = int(os.environ.get('USER_IMPORT_JOB_TTL', 86400))  # detik laporan job disimpan
+
+    # Cache PDF KHS di disk
+    KHS_PDF_CACHE_DIR = os.environ.get('KHS_PDF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'cache', 'khs'))
+    KHS_PDF_CACHE_MAX_BYTES = int(os.environ.get('KHS_PDF_CACHE_MAX_MB', 256)) * 1024 * 1024
+    KHS_PDF_CACHE_RESCAN_INTERVAL = int(os.environ.get('KHS_PDF_CACHE_RESCAN_INTERVAL', 300))  # detik, hitung ulang ukuran dari disk
+
+    # Snapshot laporan admin (diisi oleh scripts/refresh_report_snapshot.py)
+    REPORT_SNAPSHOT_ENABLED = os.environ.get('REPORT_SNAPSHOT_ENABLED', '0') == '1'
+    REPORT_SNAPSHOT_MAX_AGE = int(os.environ.get('REPORT_SNAPSHOT_MAX_AGE', 3600))  # detik
+
+    # Buffer write-behind untuk ping /api/video/<id>/watch
+    WATCH_FLUSH_INTERVAL = int(os.environ.get('WATCH_FLUSH_INTERVAL', 10))  # detik
+    WATCH_FLUSH_MAX_EVENTS = int(os.environ.get('WATCH_FLUSH_MAX_EVENTS', 500))
+    WATCH_BUFFER_MAX_PENDING = int(os.environ.get('WATCH_BUFFER_MAX_PENDING', 50000))  # saat database gagal, sisanya dibuang
+
+    # Cache identitas user untuk login_manager.user_loader
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 60))  # detik, cache lokal per proses
+    IDENTITY_CACHE_MAX_SIZE = int(os.environ.get('IDENTITY_CACHE_MAX_SIZE', 2048))
+    IDENTITY_CACHE_REDIS_URL = os.environ.get('IDENTITY_CACHE_REDIS_URL')  # opsional, butuh paket redis
+    IDENTITY_CACHE_SHARED_TTL = int(os.environ.get('IDENTITY_CACHE_SHARED_TTL', 300))
+
+    # Instrumentasi query (app/utils/query_log.py), nonaktif secara default
+    QUERY_LOG_ENABLED = os.environ.get('QUERY_LOG_ENABLED', '0') == '1'
+    QUERY_LOG_SAMPLE_RATE = float(os.environ.get('QUERY_LOG_SAMPLE_RATE', 0.01))  # porsi statement yang ditulis ke log
+    QUERY_LOG_SLOW_MS = float(os.environ.get('QUERY_LOG_SLOW_MS', 200))  # statement selambat ini selalu ditulis
+    QUERY_LOG_PARAMS = os.environ.get('QUERY_LOG_PARAMS', '0') == '1'  # parameter bisa berisi data pribadi
+
+    # Tahun ajaran aktif (KRS dan jadwal)
+    TAHUN_AJARAN = os.environ.get('TAHUN_AJARAN', '2023/2024')
+
+    # Index jadwal per tahun ajaran (app/utils/schedule_index.py)
+    # Perubahan antar worker lewat log search_change; TTL hanya cadangan
+    SCHEDULE_INDEX_TTL = int(os.environ.get('SCHEDULE_INDEX_TTL', 300))  # detik
@@ -15,6 +15,7 @@ CREATE TABLE user (
     role VARCHAR(20) DEFAULT 'mahasiswa',
     advisor_id INT,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_user_created_at (created_at),
     FOREIGN KEY (advisor_id) REFERENCES user(id)
 );
 
@@ -41,6 +42,21 @@ CREATE TABLE grade (
     FOREIGN KEY (course_id) REFERENCES course(id)
 );
 
+CREATE TABLE grade_summary (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    semester INT NOT NULL,
+    total_bobot FLOAT NOT NULL DEFAULT 0,
+    total_nilai_bobot FLOAT NOT NULL DEFAULT 0,
+    course_count INT NOT NULL DEFAULT 0,
+    ip FLOAT NOT NULL DEFAULT 0,
+    ipk FLOAT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_grade_summary_student_semester (student_id, semester),
+    INDEX ix_grade_summary_student_id (student_id),
+    FOREIGN KEY (student_id) REFERENCES user(id)
+);
+
 CREATE TABLE krs (
     id INT AUTO_INCREMENT PRIMARY KEY,
     student_id INT NOT NULL,
@@ -53,7 +69,8 @@ CREATE TABLE krs (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (student_id) REFERENCES user(id),
     FOREIGN KEY (course_id) REFERENCES course(id),
-    FOREIGN KEY (approved_by) REFERENCES user(id)
+    FOREIGN KEY (approved_by) REFERENCES user(id),
+    INDEX ix_krs_tahun_ajaran_student (tahun_ajaran, student_id)
 );
 
 CREATE TABLE material (
@@ -67,7 +84,8 @@ CREATE TABLE material (
     uploaded_by INT NOT NULL,
     uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (course_id) REFERENCES course(id),
-    FOREIGN KEY (uploaded_by) REFERENCES user(id)
+    FOREIGN KEY (uploaded_by) REFERENCES user(id),
+    INDEX ix_material_course_minggu (course_id, minggu)
 );
 
 CREATE TABLE video (
@@ -81,7 +99,8 @@ CREATE TABLE video (
     uploaded_by INT NOT NULL,
     uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (course_id) REFERENCES course(id),
-    FOREIGN KEY (uploaded_by) REFERENCES user(id)
+    FOREIGN KEY (uploaded_by) REFERENCES user(id),
+    INDEX ix_video_course_minggu (course_id, minggu)
 );
 
 CREATE TABLE video_watch (
@@ -92,6 +111,7 @@ CREATE TABLE video_watch (
     total_duration INT DEFAULT 0,
     completed BOOLEAN DEFAULT FALSE,
     last_watched DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_video_watch_student_video (student_id, video_id),
     FOREIGN KEY (student_id) REFERENCES user(id),
     FOREIGN KEY (video_id) REFERENCES video(id)
 );
@@ -104,9 +124,13 @@ CREATE TABLE forum_post (
     content TEXT NOT NULL,
     tags VARCHAR(500),
     replies_count INT DEFAULT 0,
+    last_reply_at DATETIME,
+    last_activity_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (course_id) REFERENCES course(id),
-    FOREIGN KEY (student_id) REFERENCES user(id)
+    FOREIGN KEY (student_id) REFERENCES user(id),
+    INDEX ix_forum_post_course_activity (course_id, last_activity_at, id),
+    INDEX ix_forum_post_activity (last_activity_at, id)
 );
 
 CREATE TABLE forum_reply (
@@ -116,7 +140,8 @@ CREATE TABLE forum_reply (
     content TEXT NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (post_id) REFERENCES forum_post(id),
-    FOREIGN KEY (student_id) REFERENCES user(id)
+    FOREIGN KEY (student_id) REFERENCES user(id),
+    INDEX ix_forum_reply_post_id (post_id, id)
 );
 
 CREATE TABLE letter_submission (
@@ -151,6 +176,29 @@ CREATE TABLE submission (
     FOREIGN KEY (course_id) REFERENCES course(id)
 );
 
+CREATE TABLE course_quota (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    course_id INT NOT NULL,
+    tahun_ajaran VARCHAR(20) NOT NULL,
+    kapasitas INT NOT NULL,
+    terisi INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (course_id) REFERENCES course(id),
+    UNIQUE KEY uq_course_quota_course_tahun_ajaran (course_id, tahun_ajaran)
+);
+
+CREATE TABLE krs_submission (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    token VARCHAR(64) NOT NULL UNIQUE,
+    student_id INT NOT NULL,
+    tahun_ajaran VARCHAR(20) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    response TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES user(id),
+    INDEX ix_krs_submission_created_at (created_at)
+);
+
 CREATE TABLE schedule (
     id INT AUTO_INCREMENT PRIMARY KEY,
     course_id INT NOT NULL,
@@ -161,7 +209,8 @@ CREATE TABLE schedule (
     semester INT NOT NULL,
     tahun_ajaran VARCHAR(20) NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (course_id) REFERENCES course(id)
+    FOREIGN KEY (course_id) REFERENCES course(id),
+    INDEX ix_schedule_tahun_ajaran_hari (tahun_ajaran, hari)
 );
 
 -- Insert sample data for testing
@@ -181,6 +230,11 @@ INSERT INTO grade (student_id, course_id, nilai, bobot, grade, semester) VALUES
 (3, 2, 78, 4, 'B+', 2),
 (3, 3, 92, 3, 'A-', 3);
 
+INSERT INTO grade_summary (student_id, semester, total_bobot, total_nilai_bobot, course_count, ip, ipk) VALUES
+(3, 1, 3, 255, 1, 85, 85),
+(3, 2, 4, 312, 1, 78, 81),
+(3, 3, 3, 276, 1, 92, 84.3);
+
 INSERT INTO schedule (course_id, hari, waktu_mulai, waktu_selesai, ruangan, semester, tahun_ajaran) VALUES
 (3, 'Senin', '08:00', '10:00', 'Lab Komputer 1', 1, '2023/2024'),
 (2, 'Senin', '10:00', '12:00', 'Kelas 201', 1, '2023/2024'),
@@ -258,6 +312,33 @@ CREATE TABLE thesis_application (
     FOREIGN KEY (student_id) REFERENCES user(id)
 );
 
+CREATE TABLE storage_blob (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    `key` VARCHAR(255) NOT NULL UNIQUE,
+    sha256 VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL DEFAULT 0,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_storage_blob_sha256 (sha256)
+);
+
+CREATE TABLE course_report_snapshot (
+    course_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,
+    submission_count INT NOT NULL DEFAULT 0,
+    refreshed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (course_id) REFERENCES course(id) ON DELETE CASCADE
+);
+
+CREATE TABLE search_change (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entity VARCHAR(20) NOT NULL,
+    entity_id INT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_search_change_created_at (created_at)
+);
+
 CREATE TABLE system_setting (
     id INT AUTO_INCREMENT PRIMARY KEY,
     `setting_key` VARCHAR(50) NOT NULL UNIQUE,
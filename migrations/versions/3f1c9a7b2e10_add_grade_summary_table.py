@@ -0,0 +1,89 @@
+"""Add grade_summary table
+
+Revision ID: 3f1c9a7b2e10
+Revises: abc23565258e
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7b2e10'
+down_revision = 'abc23565258e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('grade_summary',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('semester', sa.Integer(), nullable=False),
+        sa.Column('total_bobot', sa.Float(), nullable=False),
+        sa.Column('total_nilai_bobot', sa.Float(), nullable=False),
+        sa.Column('course_count', sa.Integer(), nullable=False),
+        sa.Column('ip', sa.Float(), nullable=False),
+        sa.Column('ipk', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_id', 'semester', name='uq_grade_summary_student_semester')
+    )
+    with op.batch_alter_table('grade_summary', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_grade_summary_student_id'), ['student_id'], unique=False)
+
+    # Isi dari nilai yang sudah ada; tanpa ini listener delta membuat baris dari satu nilai saja
+    op.execute("""
+        INSERT INTO grade_summary (student_id, semester, total_bobot, total_nilai_bobot, course_count, ip, ipk)
+        SELECT student_id, semester,
+               COALESCE(SUM(bobot), 0),
+               COALESCE(SUM(nilai * bobot), 0),
+               COUNT(id),
+               CASE WHEN SUM(bobot) > 0 THEN SUM(nilai * bobot) / SUM(bobot) ELSE 0 END,
+               0
+        FROM grade
+        WHERE student_id IS NOT NULL AND semester IS NOT NULL
+        GROUP BY student_id, semester
+    """)
+
+    # IPK kumulatif per semester (running total), sama dengan scripts/rebuild_grade_summary.py
+    summary = sa.table('grade_summary',
+        sa.column('id', sa.Integer()),
+        sa.column('student_id', sa.Integer()),
+        sa.column('semester', sa.Integer()),
+        sa.column('total_bobot', sa.Float()),
+        sa.column('total_nilai_bobot', sa.Float()),
+        sa.column('ipk', sa.Float())
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(summary.c.id, summary.c.student_id, summary.c.total_bobot, summary.c.total_nilai_bobot)
+        .order_by(summary.c.student_id, summary.c.semester)
+    ).all()
+    updates = []
+    current_student = None
+    cumulative_bobot = cumulative_nilai_bobot = 0
+    for row in rows:
+        if row.student_id != current_student:
+            current_student = row.student_id
+            cumulative_bobot = cumulative_nilai_bobot = 0
+        cumulative_bobot += row.total_bobot
+        cumulative_nilai_bobot += row.total_nilai_bobot
+        updates.append({
+            'row_id': row.id,
+            'ipk': cumulative_nilai_bobot / cumulative_bobot if cumulative_bobot > 0 else 0
+        })
+    for start in range(0, len(updates), 1000):
+        connection.execute(
+            summary.update().where(summary.c.id == sa.bindparam('row_id')).values(ipk=sa.bindparam('ipk')),
+            updates[start:start + 1000]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('grade_summary', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_grade_summary_student_id'))
+
+    op.drop_table('grade_summary')
@@ -0,0 +1,39 @@
+"""Add storage_blob table for content-addressed file storage
+
+Revision ID: 4b9d2f7e1c83
+Revises: e2a7c5d9b3f1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9d2f7e1c83'
+down_revision = 'e2a7c5d9b3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('storage_blob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+    )
+    with op.batch_alter_table('storage_blob', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_storage_blob_sha256'), ['sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('storage_blob', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_storage_blob_sha256'))
+
+    op.drop_table('storage_blob')
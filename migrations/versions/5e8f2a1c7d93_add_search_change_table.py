@@ -0,0 +1,35 @@
+"""Add search_change table
+
+Revision ID: 5e8f2a1c7d93
+Revises: 9c4e1a2b3d5f
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8f2a1c7d93'
+down_revision = '9c4e1a2b3d5f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('search_change', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_change_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('search_change', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_search_change_created_at'))
+
+    op.drop_table('search_change')
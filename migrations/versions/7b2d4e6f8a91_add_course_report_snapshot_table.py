@@ -0,0 +1,31 @@
+"""Add course_report_snapshot table
+
+Revision ID: 7b2d4e6f8a91
+Revises: 3f1c9a7b2e10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d4e6f8a91'
+down_revision = '3f1c9a7b2e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('course_report_snapshot',
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('student_count', sa.Integer(), nullable=False),
+        sa.Column('submission_count', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['course.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('course_id')
+    )
+
+
+def downgrade():
+    op.drop_table('course_report_snapshot')
@@ -0,0 +1,32 @@
+"""Add (course_id, minggu) indexes on material and video for the materi view
+
+Revision ID: 8e3a6c1f5b27
+Revises: 4b9d2f7e1c83
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3a6c1f5b27'
+down_revision = '4b9d2f7e1c83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('material', schema=None) as batch_op:
+        batch_op.create_index('ix_material_course_minggu', ['course_id', 'minggu'], unique=False)
+
+    with op.batch_alter_table('video', schema=None) as batch_op:
+        batch_op.create_index('ix_video_course_minggu', ['course_id', 'minggu'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('video', schema=None) as batch_op:
+        batch_op.drop_index('ix_video_course_minggu')
+
+    with op.batch_alter_table('material', schema=None) as batch_op:
+        batch_op.drop_index('ix_material_course_minggu')
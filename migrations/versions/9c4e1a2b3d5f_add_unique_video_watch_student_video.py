@@ -0,0 +1,34 @@
+"""Add unique constraint on video_watch (student_id, video_id)
+
+Revision ID: 9c4e1a2b3d5f
+Revises: 7b2d4e6f8a91
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1a2b3d5f'
+down_revision = '7b2d4e6f8a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sisakan satu baris (yang terbaru) per mahasiswa per video sebelum membuat constraint
+    op.execute("""
+        DELETE older FROM video_watch older
+        JOIN video_watch newer
+          ON older.student_id = newer.student_id
+         AND older.video_id = newer.video_id
+         AND older.id < newer.id
+    """)
+    with op.batch_alter_table('video_watch', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_video_watch_student_video', ['student_id', 'video_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('video_watch', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_video_watch_student_video', type_='unique')
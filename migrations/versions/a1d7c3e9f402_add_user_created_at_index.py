@@ -0,0 +1,26 @@
+"""Add index on user.created_at for cursor pagination
+
+Revision ID: a1d7c3e9f402
+Revises: 5e8f2a1c7d93
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d7c3e9f402'
+down_revision = '5e8f2a1c7d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_created_at'))
@@ -0,0 +1,32 @@
+"""Add tahun_ajaran indexes on schedule and krs for the schedule index
+
+Revision ID: c6b8e2f4a1d7
+Revises: a1d7c3e9f402
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6b8e2f4a1d7'
+down_revision = 'a1d7c3e9f402'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.create_index('ix_schedule_tahun_ajaran_hari', ['tahun_ajaran', 'hari'], unique=False)
+
+    with op.batch_alter_table('krs', schema=None) as batch_op:
+        batch_op.create_index('ix_krs_tahun_ajaran_student', ['tahun_ajaran', 'student_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('krs', schema=None) as batch_op:
+        batch_op.drop_index('ix_krs_tahun_ajaran_student')
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedule_tahun_ajaran_hari')
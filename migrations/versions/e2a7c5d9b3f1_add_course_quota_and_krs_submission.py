@@ -0,0 +1,52 @@
+"""Add course_quota and krs_submission tables for KRS registration
+
+Revision ID: e2a7c5d9b3f1
+Revises: c6b8e2f4a1d7
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c5d9b3f1'
+down_revision = 'c6b8e2f4a1d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('course_quota',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('tahun_ajaran', sa.String(length=20), nullable=False),
+        sa.Column('kapasitas', sa.Integer(), nullable=False),
+        sa.Column('terisi', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['course.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('course_id', 'tahun_ajaran', name='uq_course_quota_course_tahun_ajaran')
+    )
+    op.create_table('krs_submission',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(length=64), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('tahun_ajaran', sa.String(length=20), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token')
+    )
+    with op.batch_alter_table('krs_submission', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_krs_submission_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('krs_submission', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_krs_submission_created_at'))
+
+    op.drop_table('krs_submission')
+    op.drop_table('course_quota')
@@ -0,0 +1,49 @@
+"""Add last_reply_at/last_activity_at to forum_post and forum list indexes
+
+Revision ID: f5c1d8a3e6b4
+Revises: 8e3a6c1f5b27
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c1d8a3e6b4'
+down_revision = '8e3a6c1f5b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('forum_post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_reply_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+
+    # replies_count sebelumnya tidak pernah diperbarui; hitung ulang dari forum_reply
+    op.execute("""
+        UPDATE forum_post SET
+            replies_count = (SELECT COUNT(*) FROM forum_reply WHERE forum_reply.post_id = forum_post.id),
+            last_reply_at = (SELECT MAX(forum_reply.created_at) FROM forum_reply WHERE forum_reply.post_id = forum_post.id)
+    """)
+    op.execute("UPDATE forum_post SET last_activity_at = COALESCE(last_reply_at, created_at, CURRENT_TIMESTAMP)")
+
+    with op.batch_alter_table('forum_post', schema=None) as batch_op:
+        batch_op.alter_column('last_activity_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_forum_post_course_activity', ['course_id', 'last_activity_at', 'id'], unique=False)
+        batch_op.create_index('ix_forum_post_activity', ['last_activity_at', 'id'], unique=False)
+
+    with op.batch_alter_table('forum_reply', schema=None) as batch_op:
+        batch_op.create_index('ix_forum_reply_post_id', ['post_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('forum_reply', schema=None) as batch_op:
+        batch_op.drop_index('ix_forum_reply_post_id')
+
+    with op.batch_alter_table('forum_post', schema=None) as batch_op:
+        batch_op.drop_index('ix_forum_post_activity')
+        batch_op.drop_index('ix_forum_post_course_activity')
+        batch_op.drop_column('last_activity_at')
+        batch_op.drop_column('last_reply_at')
@@ -1,15 +1,19 @@
 from app import create_app, db
-from app.utils.db_importer import run_sql_file
+from app.utils.db_importer import ensure_schema
+from app.utils.file_catalog import get_file_catalog
 import os
 
 app = create_app()
 
-# Check if the database is empty and run siakad.sql if necessary
+# Bootstrap database kosong dari create_siakad_database.sql (cek skema cukup satu query)
 with app.app_context():
-    inspector = db.inspect(db.engine)
-    if not inspector.get_table_names():
-        sql_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'create_siakad_database.sql')
-        run_sql_file(sql_file_path)
+    sql_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'create_siakad_database.sql')
+    stats = ensure_schema(sql_file_path, db.engine)
+    if stats:
+        app.logger.info('Database diisi dari %s: %s statement dalam %s detik', sql_file_path, stats['statements'], stats['seconds'])
+    # Listing folder video/modul dan playlist dibaca sekali di sini, bukan di request pertama
+    if app.config['FILE_CATALOG_WARM']:
+        get_file_catalog().warm()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-text search (app/utils/fulltext.py): build index, ukuran di disk, latensi
+query BM25 global dan per mata kuliah, serta update incremental lewat hook tulis model.
+
+Script mengisi database sementara dengan --posts post forum berisi teks bahasa Indonesia
+sintetis (kata dasar berimbuhan, stopword dan ekor kosakata panjang dengan distribusi
+Zipf), lalu membandingkan dengan LIKE '%term%' yang selama ini dipakai ad-hoc.
+
+    python scripts/bench_fulltext.py --posts 1000000
+"""
+import sys
+import os
+import argparse
+import itertools
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+ROOTS = ['ajar', 'baca', 'tulis', 'hitung', 'rancang', 'uji', 'kirim', 'simpan', 'bangun', 'kembang', 'teliti',
+         'analisis', 'program', 'data', 'basis', 'jaring', 'sistem', 'aman', 'kelola', 'ukur', 'olah', 'pilih',
+         'atur', 'hubung', 'guna', 'tanya', 'jawab', 'bahas', 'jelas', 'tugas', 'nilai', 'modul', 'kuliah',
+         'algoritma', 'struktur', 'tabel', 'query', 'server', 'kode', 'fungsi', 'objek', 'kelas', 'model',
+         'normalisasi', 'enkripsi', 'protokol', 'grafik', 'statistik', 'matriks', 'integral', 'logika']
+AFFIXES = ['{}', 'me{}', 'di{}', 'pe{}an', '{}kan', 'di{}kan', 'me{}kan', '{}nya', 'ber{}', 'ter{}']
+STOPWORDS = ['yang', 'dan', 'di', 'ke', 'dari', 'untuk', 'dengan', 'pada', 'ini', 'itu', 'adalah', 'tidak']
+QUERIES = ['normalisasi basis data', 'algoritma', 'perancangan sistem', 'enkripsi protokol jaringan',
+           'pemrograman objek', 'bagaimana cara menghitung integral', 'kata123', 'pengujian modul server']
+
+
+def vocabulary(tail_size):
+    words = [affix.format(root) for root in ROOTS for affix in AFFIXES]
+    words += STOPWORDS * 4
+    words += [f'kata{i}' for i in range(tail_size)]
+    return words
+
+
+def seed(db, posts, courses, tail_size, batch_size=10000):
+    from app.models.user import User
+    from app.models.matkul import Course, ForumPost
+
+    db.session.execute(User.__table__.insert(), [{
+        'nim': 'dosen1', 'nama': 'Dosen', 'email': 'dosen1@example.com', 'password': 'x',
+        'program_studi': 'Teknik Informatika', 'role': 'dosen'
+    }])
+    db.session.execute(Course.__table__.insert(), [
+        {'kode': f'IF{i:04d}', 'nama': f'Mata Kuliah {i}', 'sks': 3, 'semester': 1 + i % 8, 'dosen_id': 1}
+        for i in range(courses)
+    ])
+
+    rng = random.Random(42)
+    words = vocabulary(tail_size)
+    rng.shuffle(words)
+    # Zipf: bobot 1/rank
+    cum_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(words) + 1)))
+    rows = []
+    for i in range(posts):
+        body = rng.choices(words, cum_weights=cum_weights, k=rng.randint(15, 80))
+        title = rng.choices(words, cum_weights=cum_weights, k=5)
+        rows.append({
+            'course_id': 1 + i % courses,
+            'student_id': 1,
+            'title': ' '.join(title),
+            'content': ' '.join(body),
+            'replies_count': 0
+        })
+        if len(rows) >= batch_size:
+            db.session.execute(ForumPost.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(ForumPost.__table__.insert(), rows)
+    db.session.commit()
+    # Kata dengan peringkat Zipf teratas: muncul di hampir semua post
+    return words[0]
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(label, func, rounds, queries=QUERIES):
+    samples = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            func(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<28} p50 {statistics.median(samples):8.2f} ms  p95 {percentile(samples, 0.95):8.2f} ms"
+          f"  p99 {percentile(samples, 0.99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full-text search BM25 atas post forum.')
+    parser.add_argument('--posts', type=int, default=1000000, help='Jumlah post forum contoh')
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--tail', type=int, default=50000, help='Ukuran ekor kosakata jarang')
+    parser.add_argument('--rounds', type=int, default=5, help='Pengulangan per query')
+    parser.add_argument('--updates', type=int, default=5000, help='Post yang diubah untuk uji incremental')
+    parser.add_argument('--like-rounds', type=int, default=1, help='Pengulangan per query untuk LIKE (0 = lewati)')
+    parser.add_argument('--database-url', default=None, help='Default: file SQLite sementara')
+    args = parser.parse_args()
+
+    tmp_path = None
+    if args.database_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        args.database_url = f'sqlite:///{tmp_path}'
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.FULLTEXT_INDEX_DIR = tempfile.mkdtemp(prefix='fulltext-')
+
+    from app import create_app, db
+    from app.models.matkul import ForumPost
+    from app.utils.fulltext import get_fulltext_index
+
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            common_word = seed(db, args.posts, args.courses, args.tail)
+            print(f"Seed {args.posts} post: {time.perf_counter() - start:.1f} s")
+
+            index = app.extensions['fulltext_index']
+            start = time.perf_counter()
+            index.build()
+            elapsed = time.perf_counter() - start
+            documents, average = index.stats()
+            print(f"Build index: {elapsed:.1f} s ({documents / elapsed:,.0f} dokumen/s), {len(index.segments)} segmen, "
+                  f"{directory_size(index.directory) / 2 ** 20:.1f} MB di disk, panjang rata-rata {average:.1f} term, "
+                  f"RSS puncak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+            # Proses lain membuka index yang sama dari disk
+            reader = create_app()
+            with reader.app_context():
+                start = time.perf_counter()
+                get_fulltext_index()
+                print(f"Buka index dari disk: {time.perf_counter() - start:.2f} s\n")
+
+            own_courses = set(range(1, 7))
+            measure('BM25 global (admin)', lambda query: index.search(query, 10, thesis_owner=0), args.rounds)
+            measure('BM25 6 mata kuliah', lambda query: index.search(query, 10, course_ids=own_courses), args.rounds)
+            measure('BM25 per mata kuliah', lambda query: index.search(query, 10, course_ids={1}), args.rounds)
+            # Satu term yang ada di hampir semua dokumen: posting list harus dipindai penuh
+            measure(f'BM25 satu term umum ({common_word})', lambda query: index.search(query, 10, thesis_owner=0),
+                    args.rounds, [common_word])
+            if args.like_rounds:
+                measure('LIKE %term% (kata pertama)', lambda query: ForumPost.query.filter(
+                    ForumPost.content.contains(query.split()[0])).limit(10).all(), args.like_rounds)
+
+            # Update incremental: hook after_flush -> search_change -> memtable -> segmen baru
+            rng = random.Random(7)
+            ids = rng.sample(range(1, args.posts + 1), min(args.updates, args.posts))
+            start = time.perf_counter()
+            for chunk_start in range(0, len(ids), 500):
+                for post in ForumPost.query.filter(ForumPost.id.in_(ids[chunk_start:chunk_start + 500])):
+                    post.content = f'{post.content} revisi kriptografi'
+                db.session.commit()
+            print(f"\nUpdate {len(ids)} post lewat ORM: {time.perf_counter() - start:.1f} s")
+            start = time.perf_counter()
+            get_fulltext_index()
+            hits, total = index.search('kriptografi', 10, thesis_owner=0)
+            print(f"Sinkron log + query pertama: {time.perf_counter() - start:.2f} s, {total} hasil 'kriptografi', "
+                  f"{len(index.memtable)} dokumen di memtable, {len(index.segments)} segmen")
+            # Flush memtable ke segmen berjalan di worker background, bukan di request
+            start = time.perf_counter()
+            app.extensions['background_worker'].join()
+            print(f"Flush di worker background: {time.perf_counter() - start:.2f} s, {len(index.segments)} segmen")
+            measure('BM25 global setelah update', lambda query: index.search(query, 10, thesis_owner=0), args.rounds)
+    finally:
+        shutil.rmtree(Config.FULLTEXT_INDEX_DIR, ignore_errors=True)
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark detektor bentrok jadwal (app/utils/schedule_conflicts.py) untuk jadwal
+seukuran kampus: --slots slot kuliah di --rooms ruangan dan --lecturers dosen.
+
+Membandingkan cek satu slot baru lewat scan linear vs IntervalIndex, cek pengajuan
+KRS, dan waktu membangun laporan bentrok lengkap. Tidak butuh database.
+
+    python scripts/bench_schedule_conflicts.py --slots 10000 --students 20000
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.schedule_index import DAY_NAMES, CourseInfo, DosenInfo, ScheduleEntry, ScheduleIndex
+from app.utils.schedule_conflicts import ConflictDetector
+
+START_TIMES = ['07:00', '08:00', '09:40', '10:00', '12:30', '13:00', '14:40', '15:30', '16:20', '18:30']
+
+
+def make_index(slots, rooms, lecturers, students, courses_per_student, seed=42):
+    rng = random.Random(seed)
+    entries = []
+    courses = []
+    for i in range(slots):
+        dosen_id = rng.randrange(lecturers)
+        course = CourseInfo(i, f'MK{i:05d}', f'Mata Kuliah {i}', 3, 1 + i % 8, dosen_id, DosenInfo(dosen_id, f'Dosen {dosen_id}'))
+        courses.append(course)
+        start = rng.choice(START_TIMES)
+        hours, minutes = map(int, start.split(':'))
+        end_minute = hours * 60 + minutes + rng.choice([100, 150])
+        end = f'{end_minute // 60:02d}:{end_minute % 60:02d}'
+        entries.append(ScheduleEntry(i, i, rng.choice(DAY_NAMES[:6]), start, end, f'R{rng.randrange(rooms)}', course.semester,
+                                     '2023/2024', course, hours * 60 + minutes, end_minute))
+    enrollments = {student_id: set(rng.sample(range(slots), courses_per_student)) for student_id in range(students)}
+    return ScheduleIndex('2023/2024', entries, enrollments)
+
+
+def linear_check(entries, hari, start, end, ruangan, dosen_id):
+    return [entry for entry in entries if entry.hari == hari and entry.start_minute < end and entry.end_minute > start
+            and (entry.ruangan == ruangan or entry.course.dosen_id == dosen_id)]
+
+
+def timed(func, samples):
+    timings = []
+    for args in samples:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark detektor bentrok jadwal.')
+    parser.add_argument('--slots', type=int, default=10000)
+    parser.add_argument('--rooms', type=int, default=400)
+    parser.add_argument('--lecturers', type=int, default=1200)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--courses-per-student', type=int, default=8)
+    parser.add_argument('--checks', type=int, default=5000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = make_index(args.slots, args.rooms, args.lecturers, args.students, args.courses_per_student)
+    print(f"Index jadwal : {args.slots} slot, {args.students} mahasiswa, {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    detector = ConflictDetector(index)
+    print(f"Detektor     : {len(detector.rooms)} grup ruangan, {len(detector.lecturers)} grup dosen, {time.perf_counter() - start:.2f} s\n")
+
+    rng = random.Random(7)
+    samples = []
+    for _ in range(args.checks):
+        start_time = rng.choice(START_TIMES)
+        hours, minutes = map(int, start_time.split(':'))
+        end_minute = hours * 60 + minutes + 100
+        samples.append((rng.choice(DAY_NAMES[:6]), start_time, f'{end_minute // 60:02d}:{end_minute % 60:02d}',
+                        f'R{rng.randrange(args.rooms)}', rng.randrange(args.lecturers)))
+
+    entries = list(index.entries.values())
+    linear = timed(lambda hari, mulai, selesai, ruangan, dosen_id: linear_check(
+        entries, hari, int(mulai[:2]) * 60 + int(mulai[3:]), int(selesai[:2]) * 60 + int(selesai[3:]), ruangan, dosen_id), samples)
+    indexed = timed(lambda hari, mulai, selesai, ruangan, dosen_id: detector.check_entry(
+        hari, mulai, selesai, ruangan=ruangan, dosen_id=dosen_id), samples)
+    print(f"{'cek slot baru':<22}{'p50 us':>10}{'p99 us':>10}")
+    print(f"{'scan linear':<22}{linear[0]:>10.1f}{linear[1]:>10.1f}")
+    print(f"{'IntervalIndex':<22}{indexed[0]:>10.1f}{indexed[1]:>10.1f}")
+
+    krs_samples = [(rng.sample(range(args.slots), 8),) for _ in range(args.checks)]
+    krs = timed(detector.check_courses, krs_samples)
+    print(f"{'cek KRS (8 MK)':<22}{krs[0]:>10.1f}{krs[1]:>10.1f}\n")
+
+    start = time.perf_counter()
+    report = detector.report()
+    print(f"Laporan bentrok: {time.perf_counter() - start:.2f} s, {report['summary']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark pencarian user: path LIKE '%term%' lama vs inverted index (app/utils/search.py).
+
+Script mengisi database sementara dengan --users baris, lalu menjalankan query yang
+sama (prefix nama, potongan NIM, domain email, salah ketik) lewat kedua path dengan
+pagination seperti /api/users.
+
+    python scripts/bench_search.py --users 100000 --rounds 20
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+FIRST_NAMES = ['Ahmad', 'Budi', 'Citra', 'Dewi', 'Eko', 'Fajar', 'Gita', 'Hadi', 'Indah', 'Joko',
+               'Kurnia', 'Lestari', 'Maya', 'Nur', 'Oki', 'Putri', 'Rizky', 'Sari', 'Tono', 'Wahyu']
+LAST_NAMES = ['Santoso', 'Wijaya', 'Saputra', 'Pratama', 'Hidayat', 'Nugroho', 'Kusuma', 'Permata',
+              'Setiawan', 'Rahmawati', 'Susanto', 'Firmansyah', 'Utami', 'Purnomo', 'Handayani']
+QUERIES = ['bud', 'santoso', 'dewi kusuma', '2021000', '00123', 'wahyu', 'rizky pra', 'handayni', 'mhs4', 'student']
+
+
+def seed(db, count, batch_size=10000):
+    from app.models.user import User
+
+    rng = random.Random(42)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'nim': f'2021{i:06d}',
+            'nama': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'email': f'mhs{i}@student.amikom.ac.id',
+            'password': 'x',
+            'program_studi': 'Teknik Informatika',
+            'role': 'mahasiswa'
+        })
+        if len(rows) >= batch_size:
+            db.session.execute(User.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+
+
+def like_page(term, page, per_page):
+    from app.models.user import User
+    query = User.query.filter(
+        (User.nama.contains(term)) |
+        (User.nim.contains(term)) |
+        (User.email.contains(term))
+    )
+    return query.paginate(page=page, per_page=per_page, error_out=False)
+
+
+def measure(label, func, rounds):
+    timings = {}
+    for term in QUERIES:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = func(term)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[term] = (samples, result.total)
+    all_samples = sorted(sample for samples, _ in timings.values() for sample in samples)
+    p95 = all_samples[int(len(all_samples) * 0.95) - 1]
+    print(f"{label:<6} mean {statistics.mean(all_samples):8.2f} ms  p50 {statistics.median(all_samples):8.2f} ms  p95 {p95:8.2f} ms")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pencarian user LIKE vs inverted index.')
+    parser.add_argument('--users', type=int, default=100000, help='Jumlah user contoh')
+    parser.add_argument('--rounds', type=int, default=20, help='Pengulangan per query')
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--database-url', default=None, help='Default: file SQLite sementara')
+    args = parser.parse_args()
+
+    tmp_path = None
+    if args.database_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        args.database_url = f'sqlite:///{tmp_path}'
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url
+
+    from app import create_app, db
+    from app.utils.search import get_index, search_page
+
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            seed(db, args.users)
+            print(f"Seed {args.users} user: {time.perf_counter() - start:.1f} s")
+
+            start = time.perf_counter()
+            index = get_index('user')
+            print(f"Build index: {time.perf_counter() - start:.2f} s, {len(index)} dokumen, {len(index.vocabulary)} token\n")
+
+            like = measure('LIKE', lambda term: like_page(term, 1, args.per_page), args.rounds)
+            indexed = measure('INDEX', lambda term: search_page('user', term, 1, args.per_page), args.rounds)
+
+            print(f"\n{'query':<14}{'LIKE ms':>10}{'hasil':>8}{'INDEX ms':>10}{'hasil':>8}")
+            for term in QUERIES:
+                like_samples, like_total = like[term]
+                index_samples, index_total = indexed[term]
+                print(f"{term:<14}{statistics.median(like_samples):>10.2f}{like_total:>8}"
+                      f"{statistics.median(index_samples):>10.2f}{index_total:>8}")
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark import user: jalur satu per satu (seperti POST /api/users) vs import massal
+(app/utils/user_import.py).
+
+Jalur satu per satu menjalankan cek keunikan, bcrypt dan commit untuk setiap user.
+Import massal memakai satu query keunikan per 1000 baris, hashing di process pool,
+dan insert executemany per batch.
+
+    python scripts/bench_user_import.py --users 2000 --rounds 12
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+def make_rows(prefix, count):
+    return [{
+        'nim': f'{prefix}{i:06d}',
+        'nama': f'Mahasiswa {prefix} {i}',
+        'email': f'{prefix.lower()}{i}@student.amikom.ac.id',
+        'program_studi': 'Teknik Informatika',
+        'password': f'rahasia{i}',
+        'role': 'mahasiswa'
+    } for i in range(count)]
+
+
+def single_row_import(db, bcrypt, rows):
+    from app.models.user import User
+    for row in rows:
+        existing = User.query.filter((User.nim == row['nim']) | (User.email == row['email'])).first()
+        if existing:
+            continue
+        hashed = bcrypt.generate_password_hash(row['password']).decode('utf-8')
+        db.session.add(User(nim=row['nim'], nama=row['nama'], email=row['email'], program_studi=row['program_studi'],
+                            password=hashed, role=row['role']))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import user satu per satu vs massal.')
+    parser.add_argument('--users', type=int, default=2000, help='Jumlah user per jalur')
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_LOG_ROUNDS')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses hashing import massal')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--database-url', default=None, help='Default: file SQLite sementara')
+    args = parser.parse_args()
+
+    tmp_path = None
+    if args.database_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        args.database_url = f'sqlite:///{tmp_path}'
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.BCRYPT_LOG_ROUNDS = args.rounds
+
+    from app import create_app, db, bcrypt
+    from app.utils.user_import import import_users
+
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+
+            start = time.perf_counter()
+            single_row_import(db, bcrypt, make_rows('S', args.users))
+            single = time.perf_counter() - start
+            print(f"Satu per satu : {args.users} user dalam {single:8.2f} s ({args.users / single:8.1f} user/s)")
+
+            start = time.perf_counter()
+            report = import_users(make_rows('B', args.users), workers=args.workers, batch_size=args.batch_size)
+            bulk = time.perf_counter() - start
+            print(f"Import massal : {report['created']} user dalam {bulk:8.2f} s ({report['created'] / bulk:8.1f} user/s), "
+                  f"{report['failed']} gagal")
+            print(f"Percepatan    : {single / bulk:.1f}x (cpu: {os.cpu_count()})")
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark endpoint streaming video (/elearning/video/<id>/stream) dengan banyak
+penonton bersamaan.
+
+Script membuat video acak berukuran --size-mb di storage, menyalakan server WSGI
+berthread di port acak, lalu --clients klien (koneksi keep-alive masing-masing)
+melakukan --requests permintaan: lompatan acak (Range --chunk-kb) atau unduhan
+penuh (--mode full). Hasilnya dibandingkan dengan handler static bawaan Flask untuk
+file yang sama. Laporan: throughput agregat (MB/s), req/s, latensi p50/p99.
+
+    python scripts/bench_video_stream.py --clients 32 --size-mb 64
+    python scripts/bench_video_stream.py --mode full --clients 8
+"""
+import sys
+import os
+import argparse
+import http.client
+import logging
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+def seed(db, bcrypt, size, tmp_dir):
+    from app.models.user import User
+    from app.models.matkul import Course, KRS, Video
+    from app.utils.storage import get_storage
+
+    # File disimpan sebelum menulis baris lain: register_blob memakai transaksi sendiri
+    source = os.path.join(tmp_dir, 'bench.mp4')
+    with open(source, 'wb') as f:
+        for _ in range(size // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+    stored = get_storage().save_path(source, '.mp4', move=True)
+
+    password = bcrypt.generate_password_hash('bench').decode()
+    dosen = User(nim='dosen_bench', nama='Dosen Bench', email='dosen_bench@example.com', password=password,
+                 program_studi='Teknik Informatika', role='dosen')
+    student = User(nim='mhs_bench', nama='Mahasiswa Bench', email='mhs_bench@example.com', password=password,
+                   program_studi='Teknik Informatika', role='mahasiswa')
+    db.session.add_all([dosen, student])
+    db.session.flush()
+    course = Course(kode='BENCH1', nama='Benchmark Video', sks=3, semester=1, dosen_id=dosen.id)
+    db.session.add(course)
+    db.session.flush()
+    db.session.add(KRS(student_id=student.id, course_id=course.id, semester=1, tahun_ajaran='2023/2024', status='approved'))
+
+    video = Video(course_id=course.id, judul='Benchmark', video_path=stored.key, uploaded_by=dosen.id, minggu=1)
+    db.session.add(video)
+    db.session.commit()
+    return video.id, stored.key
+
+
+def login(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/login', body=urlencode({'username': 'mhs_bench', 'password': 'bench'}),
+                       headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    connection.close()
+    return cookie
+
+
+def run_client(port, cookie, path, size, requests, chunk, mode, seed_value):
+    rng = random.Random(seed_value)
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    received = 0
+    for _ in range(requests):
+        headers = {'Cookie': cookie}
+        if mode == 'seek':
+            start = rng.randrange(0, size - chunk)
+            headers['Range'] = f'bytes={start}-{start + chunk - 1}'
+        begin = time.perf_counter()
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        latencies.append((time.perf_counter() - begin) * 1000)
+        if response.status not in (200, 206):
+            raise RuntimeError(f'{path}: HTTP {response.status}')
+        received += len(body)
+    connection.close()
+    return latencies, received
+
+
+def bench(name, port, cookie, path, args, size):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(
+            lambda i: run_client(port, cookie, path, size, args.requests, args.chunk_kb * 1024, args.mode, i),
+            range(args.clients)))
+    wall = time.perf_counter() - start
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    received = sum(received for _, received in results)
+    print(f"{name:<22} {received / wall / (1024 * 1024):>9.1f} MB/s {len(latencies) / wall:>9.0f} req/s "
+          f"p50 {statistics.median(latencies):>7.2f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1]:>7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming video dengan Range request.')
+    parser.add_argument('--size-mb', type=int, default=64, help='Ukuran file video')
+    parser.add_argument('--clients', type=int, default=16, help='Penonton bersamaan')
+    parser.add_argument('--requests', type=int, default=50, help='Permintaan per klien')
+    parser.add_argument('--chunk-kb', type=int, default=1024, help='Ukuran Range per permintaan (mode seek)')
+    parser.add_argument('--mode', choices=('seek', 'full'), default='seek')
+    args = parser.parse_args()
+    if args.mode == 'full':
+        args.requests = min(args.requests, 3)
+
+    tmp_dir = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    Config.UPLOAD_TMP_DIR = os.path.join(tmp_dir, 'uploads_tmp')
+
+    from werkzeug.serving import make_server
+    from app import create_app, db, bcrypt
+    from app.utils.storage import get_storage
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        video_id, key = seed(db, bcrypt, args.size_mb * 1024 * 1024, tmp_dir)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        cookie = login(port)
+        size = args.size_mb * 1024 * 1024
+        print(f"{args.clients} klien x {args.requests} permintaan, mode {args.mode}, "
+              f"file {args.size_mb} MB, Range {args.chunk_kb} KB\n")
+        bench('stream (cek KRS)', port, cookie, f'/elearning/video/{video_id}/stream', args, size)
+        bench('static Flask', port, cookie, f'/static/{key}', args, size)
+    finally:
+        server.shutdown()
+        with app.app_context():
+            get_storage().delete(key)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import sys
+import os
+import time
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Usage: python scripts/build_fulltext_index.py [--flush]
+    #   tanpa argumen: bangun ulang seluruh index full-text dari database
+    #   --flush: tulis perubahan yang masih di log search_change menjadi segmen dan gabungkan
+    #            segmen kecil (cron, sebelum prune); index dibangun dulu jika belum ada
+    with app.app_context():
+        start = time.perf_counter()
+        index = app.extensions['fulltext_index']
+        if '--flush' in sys.argv[1:]:
+            index.maintain(force_flush=True)
+        else:
+            index.build()
+        documents, _ = index.stats()
+        print(f"Index full-text: {documents} dokumen, {len(index.segments)} segmen, "
+              f"posisi log {index.changes.last_id} ({time.perf_counter() - start:.1f} s).")
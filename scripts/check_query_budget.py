@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Cek jumlah query SQL per request untuk view yang sering diakses.
+
+Script membuat database sementara (default SQLite in-memory), mengisinya dengan
+data contoh sebanyak --rows per relasi, lalu memanggil setiap view dan gagal
+(exit code 1) jika jumlah statement SQL melebihi budget view tersebut.
+
+    python scripts/check_query_budget.py --rows 50
+"""
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# (role, url, budget) - budget termasuk query load_user dari Flask-Login (0 jika identity cache hit)
+QUERY_BUDGETS = [
+    # Request pertama ikut membangun index jadwal tahun ajaran aktif (2 query) dan memposisikan
+    # cursor log perubahan (2 query); berikutnya index jadwal cukup satu query sinkron log
+    ('mahasiswa', '/dashboard/mahasiswa', 11),
+    ('mahasiswa', '/akademik/krs', 3),
+    ('mahasiswa', '/akademik/khs', 3),
+    ('mahasiswa', '/akademik/khs/download', 3),
+    ('mahasiswa', '/akademik/nilai-keseluruhan', 3),
+    ('mahasiswa', '/akademik/transkrip', 2),
+    ('mahasiswa', '/akademik/profil', 2),
+    ('mahasiswa', '/akademik/jadwal', 2),
+    ('mahasiswa', '/elearning/progress', 5),
+    ('mahasiswa', '/elearning/materi', 5),
+    ('mahasiswa', '/elearning/api/materi/minggu/1', 3),
+    ('mahasiswa', '/elearning/forum', 3),
+    ('mahasiswa', '/elearning/forum/post/1', 3),
+    ('mahasiswa', '/pengajuan/status', 5),
+    ('dosen', '/dashboard/dosen', 8),
+    ('dosen', '/dosen/courses', 6),
+    ('dosen', '/dosen/submissions', 3),
+    ('dosen', '/elearning/progress/cohort', 5),
+    ('admin', '/admin/reports', 6),
+    ('admin', '/api/matakuliah?per_page=50', 3),
+    ('admin', '/api/users?per_page=50', 3),
+    # Mode cursor: tanpa COUNT(*)
+    ('admin', '/api/matakuliah?after=&per_page=50', 2),
+    ('admin', '/api/users?after=&per_page=50&order=created_at', 2),
+    # Request pencarian pertama ikut membangun index (2 query), berikutnya cukup sinkron log perubahan
+    ('admin', '/api/users?search=mahasiswa', 4),
+    ('admin', '/api/users?search=mahasiswa', 3),
+    ('admin', '/api/matakuliah?search=mata kuliah', 4),
+    # Full-text (index dibangun sebelum request): request pertama memutar ulang log
+    # SEARCH_CHANGE_GAP_SECONDS terakhir (3 query), berikutnya satu query sinkron log
+    ('mahasiswa', '/api/search?q=materi', 6),
+    ('mahasiswa', '/api/search?q=materi video', 4),
+    ('mahasiswa', '/elearning/cari?q=topik&type=forum_post', 4),
+]
+
+
+def seed(db, bcrypt, rows):
+    from app.models.user import User
+    from app.models.matkul import Course, Grade, KRS, Schedule, Submission, Material, Video, VideoWatch, ForumPost, ForumReply
+
+    password = bcrypt.generate_password_hash('password').decode('utf-8')
+    admin = User(nim='admin', nama='Administrator', email='admin@example.com', password=password, program_studi='Sistem Informasi', role='admin')
+    dosen_list = [User(nim=f'dosen{i}', nama=f'Dosen {i}', email=f'dosen{i}@example.com', password=password, program_studi='Teknik Informatika', role='dosen') for i in range(1, 4)]
+    students = [User(nim=f'mahasiswa{i}', nama=f'Mahasiswa {i}', email=f'mhs{i}@example.com', password=password, program_studi='Teknik Informatika', role='mahasiswa') for i in range(1, rows + 1)]
+    db.session.add_all([admin] + dosen_list + students)
+    db.session.flush()
+
+    days = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+    courses = []
+    for i in range(rows):
+        # dosen1 mengampu semua mata kuliah agar view dosen ikut terisi
+        course = Course(kode=f'IF{i:04d}', nama=f'Mata Kuliah {i}', sks=3, semester=1 + i % 8, dosen_id=dosen_list[0].id)
+        courses.append(course)
+    db.session.add_all(courses)
+    db.session.flush()
+
+    student = students[0]
+    for i, course in enumerate(courses):
+        db.session.add(Grade(student_id=student.id, course_id=course.id, nilai=3.0, bobot=3, grade='B', semester=1 + i % 5))
+        db.session.add(KRS(student_id=student.id, course_id=course.id, semester=1, tahun_ajaran='2023/2024'))
+        db.session.add(Schedule(course_id=course.id, hari=days[i % 7], waktu_mulai='08:00', waktu_selesai='10:00', ruangan=f'R{i}', semester=1, tahun_ajaran='2023/2024'))
+        db.session.add(Submission(student_id=students[i % len(students)].id, course_id=course.id, judul=f'Tugas {i}', status='pending'))
+        db.session.add(Material(course_id=course.id, judul=f'Materi {i}', minggu=1 + i % 14, uploaded_by=dosen_list[0].id))
+        video = Video(course_id=course.id, judul=f'Video {i}', video_path=f'videos/{i}.mp4', minggu=1 + i % 14, uploaded_by=dosen_list[0].id)
+        db.session.add(video)
+        db.session.flush()
+        db.session.add(VideoWatch(student_id=student.id, video_id=video.id, watch_time=60, total_duration=60, completed=i % 2 == 0))
+    db.session.flush()
+
+    post = ForumPost(course_id=courses[0].id, student_id=student.id, title='Diskusi', content='Isi')
+    db.session.add(post)
+    db.session.flush()
+    for i in range(rows):
+        db.session.add(ForumPost(course_id=courses[i].id, student_id=students[i % len(students)].id, title=f'Topik {i}', content='Isi'))
+        db.session.add(ForumReply(post_id=post.id, student_id=students[i % len(students)].id, content=f'Balasan {i}'))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cek budget jumlah query per view.')
+    parser.add_argument('--rows', type=int, default=30, help='Jumlah baris contoh per relasi')
+    parser.add_argument('--database-url', default=os.environ.get('QUERY_BUDGET_DATABASE_URL', 'sqlite://'))
+    args = parser.parse_args()
+
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    # Index full-text database contoh tidak boleh menimpa index di instance/cache
+    Config.FULLTEXT_INDEX_DIR = tempfile.mkdtemp(prefix='fulltext-')
+
+    from sqlalchemy import event
+    from app import create_app, db, bcrypt
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        seed(db, bcrypt, args.rows)
+        # Seperti di produksi, index full-text dibangun lewat CLI sebelum request pertama
+        app.extensions['fulltext_index'].build()
+        engine = db.engine
+
+    statements = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Request dijalankan di luar app context agar setiap request punya `g` sendiri
+    failures = 0
+    clients = {}
+    for role, url, budget in QUERY_BUDGETS:
+        client = clients.get(role)
+        if client is None:
+            client = clients[role] = app.test_client()
+            nim = {'admin': 'admin', 'dosen': 'dosen1', 'mahasiswa': 'mahasiswa1'}[role]
+            client.post('/login', data={'username': nim, 'password': 'password'})
+
+        statements.clear()
+        response = client.get(url)
+        response.close()
+        used = len(statements)
+        ok = response.status_code < 400 and used <= budget
+        failures += 0 if ok else 1
+        print(f"{'OK  ' if ok else 'FAIL'} {url:<35} {response.status_code} {used:>3}/{budget} query")
+
+    shutil.rmtree(Config.FULLTEXT_INDEX_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n{failures} view melebihi budget query.")
+        sys.exit(1)
+    print("\nSemua view dalam budget.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import sys
+import os
+import argparse
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.khs_pdf import export_khs_zip, DEFAULT_PERIODE
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ekspor massal KHS PDF ke arsip ZIP.')
+    parser.add_argument('semester', type=int, help='Semester yang diekspor')
+    parser.add_argument('--prodi', help='Filter program studi')
+    parser.add_argument('--output', help='Lokasi file ZIP (default: instance/exports/KHS_semester_<n>.zip)')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses render (0 = tanpa pool)')
+    parser.add_argument('--periode', default=DEFAULT_PERIODE, help='Label periode pada subjudul KHS')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'instance', 'exports', f'KHS_semester_{args.semester}.zip'
+    )
+
+    with app.app_context():
+        stats = export_khs_zip(args.semester, output, program_studi=args.prodi, workers=args.workers, periode=args.periode)
+
+    print(f"{stats['count']} KHS ditulis ke {stats['path']} dalam {stats['seconds']} detik "
+          f"({stats['pdfs_per_second']} PDF/detik).")
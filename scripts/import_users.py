@@ -0,0 +1,39 @@
+import sys
+import os
+import argparse
+import json
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.user_import import detect_format, import_users, parse_import
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import massal user dari file CSV/JSON.')
+    parser.add_argument('file', help='File CSV (header: nim,nama,email,program_studi,password,role) atau JSON')
+    parser.add_argument('--format', choices=['csv', 'json'], help='Default: dari ekstensi file')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah proses hashing bcrypt (0 = tanpa pool)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Jumlah baris per executemany')
+    parser.add_argument('--dry-run', action='store_true', help='Hanya validasi, tidak menulis ke database')
+    parser.add_argument('--report', help='Simpan laporan lengkap (JSON) ke file ini')
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as f:
+        rows = parse_import(f.read(), args.format or detect_format(args.file))
+
+    with app.app_context():
+        report = import_users(rows, workers=args.workers, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{report['created']} dari {report['total']} user {'valid' if args.dry_run else 'diimport'} "
+          f"dalam {report['seconds']} detik, {report['failed']} baris gagal.")
+    for error in report['errors'][:20]:
+        print(f"  baris {error['row']} ({error['nim']}): {'; '.join(error['errors'])}")
+    if len(report['errors']) > 20:
+        print(f"  ... {len(report['errors']) - 20} error lainnya")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Load test pengajuan KRS (/akademik/krs/submit) saat jendela KRS dibuka.
+
+Script mengisi database (default file SQLite sementara; MySQL lewat --database-url)
+dengan --students mahasiswa dan --courses mata kuliah berkuota --capacity, lalu
+mengirim pengajuan secara bersamaan dari --workers thread. Pilihan mata kuliah
+condong ke beberapa mata kuliah favorit agar terjadi rebutan kursi, dan sebagian
+pengajuan dikirim ulang dengan token idempotensi yang sama.
+
+Laporan: latensi p50/p99, jumlah sukses/kuota penuh/replay/error, serta cek
+oversubscription (KRS aktif > kapasitas) dan konsistensi penghitung `terisi`.
+
+    python scripts/load_test_krs.py --students 2000 --workers 32
+    python scripts/load_test_krs.py --database-url mysql+pymysql://root:@localhost/siakad_load
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+TAHUN_AJARAN = '2023/2024'
+
+
+def seed(db, students, courses, capacity):
+    from app.models.user import User
+    from app.models.matkul import Course, CourseQuota
+
+    dosen = User(nim='dosen_load', nama='Dosen Load', email='dosen_load@example.com', password='x',
+                 program_studi='Teknik Informatika', role='dosen')
+    db.session.add(dosen)
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [{
+        'nim': f'LOAD{i:06d}', 'nama': f'Mahasiswa {i}', 'email': f'load{i}@example.com', 'password': 'x',
+        'program_studi': 'Teknik Informatika', 'role': 'mahasiswa'
+    } for i in range(students)])
+    db.session.execute(Course.__table__.insert(), [{
+        'kode': f'LD{i:03d}', 'nama': f'Mata Kuliah {i}', 'sks': 3, 'semester': 1, 'dosen_id': dosen.id
+    } for i in range(courses)])
+    course_ids = [row[0] for row in db.session.query(Course.id).filter(Course.kode.like('LD%')).order_by(Course.id)]
+    db.session.execute(CourseQuota.__table__.insert(), [{
+        'course_id': course_id, 'tahun_ajaran': TAHUN_AJARAN, 'kapasitas': capacity, 'terisi': 0
+    } for course_id in course_ids])
+    db.session.commit()
+    student_ids = [row[0] for row in db.session.query(User.id).filter(User.nim.like('LOAD%')).order_by(User.id)]
+    return student_ids, course_ids
+
+
+def make_requests(student_ids, course_ids, per_student, duplicate_rate, rng):
+    # Bobot Zipf: beberapa mata kuliah jadi rebutan
+    weights = [1 / (rank + 1) for rank in range(len(course_ids))]
+    requests = []
+    for student_id in student_ids:
+        chosen = set()
+        while len(chosen) < per_student:
+            chosen.add(rng.choices(course_ids, weights)[0])
+        token = uuid.uuid4().hex
+        requests.append((student_id, sorted(chosen), token))
+        if rng.random() < duplicate_rate:
+            requests.append((student_id, sorted(chosen), token))
+    rng.shuffle(requests)
+    return requests
+
+
+def submit(app, student_id, course_ids, token):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(student_id)
+        session['_fresh'] = True
+    start = time.perf_counter()
+    response = client.post('/akademik/krs/submit', json={'course_ids': course_ids}, headers={'Idempotency-Key': token})
+    elapsed = (time.perf_counter() - start) * 1000
+    data = response.get_json(silent=True) or {}
+    if response.status_code == 200 and data.get('replayed'):
+        outcome = 'replay'
+    elif response.status_code == 200 and data.get('status') == 'success':
+        outcome = 'sukses'
+    elif response.status_code == 409:
+        outcome = 'kuota penuh'
+    else:
+        outcome = f'error {response.status_code}'
+    return elapsed, outcome
+
+
+def verify(db, course_ids):
+    from sqlalchemy import func
+    from app.models.matkul import CourseQuota, KRS
+
+    counts = dict(db.session.query(KRS.course_id, func.count(KRS.id)).filter(
+        KRS.tahun_ajaran == TAHUN_AJARAN, KRS.status != 'rejected', KRS.course_id.in_(course_ids)
+    ).group_by(KRS.course_id).all())
+    quotas = CourseQuota.query.filter(CourseQuota.course_id.in_(course_ids), CourseQuota.tahun_ajaran == TAHUN_AJARAN).all()
+    oversubscribed = [quota.course_id for quota in quotas if counts.get(quota.course_id, 0) > quota.kapasitas]
+    drift = [quota.course_id for quota in quotas if counts.get(quota.course_id, 0) != quota.terisi]
+    full = sum(1 for quota in quotas if quota.terisi >= quota.kapasitas)
+    return oversubscribed, drift, full, sum(counts.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test pengajuan KRS berkuota.')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--capacity', type=int, default=120)
+    parser.add_argument('--per-student', type=int, default=6, help='Mata kuliah per pengajuan')
+    parser.add_argument('--workers', type=int, default=32, help='Thread pengirim bersamaan')
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help='Porsi pengajuan yang dikirim ulang')
+    parser.add_argument('--database-url', default=None, help='Default: file SQLite sementara')
+    args = parser.parse_args()
+
+    tmp_path = None
+    if args.database_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        args.database_url = f'sqlite:///{tmp_path}'
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.TAHUN_AJARAN = TAHUN_AJARAN
+    Config.DB_POOL_SIZE = max(Config.DB_POOL_SIZE, args.workers)
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config['TESTING'] = True
+    try:
+        with app.app_context():
+            db.create_all()
+            student_ids, course_ids = seed(db, args.students, args.courses, args.capacity)
+
+        requests = make_requests(student_ids, course_ids, args.per_student, args.duplicate_rate, random.Random(42))
+        print(f"{len(requests)} pengajuan ({args.students} mahasiswa, {args.courses} MK x {args.capacity} kursi), "
+              f"{args.workers} worker, {args.database_url.split('://')[0]}")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(lambda request: submit(app, *request), requests))
+        wall = time.perf_counter() - start
+
+        latencies = sorted(elapsed for elapsed, _ in results)
+        outcomes = Counter(outcome for _, outcome in results)
+        print(f"\nSelesai dalam {wall:.1f} s ({len(requests) / wall:.0f} req/s)")
+        print(f"Latensi p50 {statistics.median(latencies):.1f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms  "
+              f"max {latencies[-1]:.1f} ms")
+        for outcome, count in sorted(outcomes.items()):
+            print(f"  {outcome:<12} {count:>7}")
+
+        with app.app_context():
+            oversubscribed, drift, full, seats = verify(db, course_ids)
+        print(f"\nKursi terisi: {seats}, MK penuh: {full}/{len(course_ids)}")
+        print(f"Oversubscription: {len(oversubscribed)} MK {oversubscribed if oversubscribed else ''}")
+        print(f"Penghitung `terisi` tidak cocok dengan KRS: {len(drift)} MK {drift if drift else ''}")
+        if oversubscribed or drift:
+            sys.exit(1)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
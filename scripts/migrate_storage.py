@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Pindahkan file lama (path bertimestamp di app/static/uploads, app/static/modul, ...)
+yang diacu kolom file_path/video_path ke storage content-addressed.
+
+Setiap file di-hash (SHA-256); isi yang sama hanya disimpan sekali, kolom model
+diubah ke key baru (ref_count ikut dihitung oleh listener storage), lalu laporan
+menampilkan byte sebelum/sesudah dan ruang yang dihemat.
+
+    python scripts/migrate_storage.py --dry-run
+    python scripts/migrate_storage.py --remove-originals   # hanya file di UPLOAD_FOLDER
+    python scripts/migrate_storage.py --gc --gc-grace 0
+"""
+import sys
+import os
+import argparse
+from collections import Counter
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.utils.storage import (FILE_REFERENCES, collect_garbage, file_digest, get_storage, normalize_key,
+                               recount_references)
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+
+
+def legacy_source(static_folder, path, default_dir):
+    """Path absolute file lama di bawah static, atau None jika keluar dari static."""
+    key = normalize_key(path, default_dir)
+    source = os.path.realpath(os.path.join(static_folder, key))
+    if not source.startswith(os.path.realpath(static_folder) + os.sep):
+        return None
+    return source
+
+
+def migrate(static_folder, dry_run=False, batch_size=500):
+    storage = get_storage()
+    stats = Counter()
+    digests = {}          # source -> digest
+    sizes = {}            # digest -> ukuran
+    migrated_sources = set()
+
+    for model, attr, default_dir in FILE_REFERENCES:
+        column = getattr(model, attr)
+        ids = [row[0] for row in db.session.query(model.id).filter(column.isnot(None), column != '').order_by(model.id)]
+        for start in range(0, len(ids), batch_size):
+            for obj in model.query.filter(model.id.in_(ids[start:start + batch_size])):
+                path = getattr(obj, attr)
+                if storage.is_managed(path):
+                    stats['sudah di storage'] += 1
+                    continue
+                if path.startswith(('http://', 'https://')):
+                    stats['url eksternal'] += 1
+                    continue
+                source = legacy_source(static_folder, path, default_dir)
+                if source is None or not os.path.isfile(source):
+                    stats['file hilang'] += 1
+                    print(f"  hilang: {model.__name__}#{obj.id} {path}")
+                    continue
+
+                if source not in digests:
+                    digests[source] = file_digest(source)
+                    sizes[digests[source]] = os.path.getsize(source)
+                    stats['bytes sebelum'] += sizes[digests[source]]
+                digest = digests[source]
+                stats[f'referensi {model.__name__}'] += 1
+
+                if not dry_run:
+                    extension = os.path.splitext(source)[1].lower()
+                    stored = storage.save_path(source, extension, digest=digest)
+                    setattr(obj, attr, stored.key)
+                    migrated_sources.add(source)
+            if not dry_run:
+                db.session.commit()
+
+    stats['file unik'] = len(sizes)
+    stats['bytes sesudah'] = sum(sizes.values())
+    stats['file duplikat'] = len(digests) - len(sizes)
+    return stats, migrated_sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrasi file lama ke storage content-addressed.')
+    parser.add_argument('--dry-run', action='store_true', help='Hanya hitung hash dan laporan, tanpa mengubah apa pun')
+    parser.add_argument('--remove-originals', action='store_true', help='Hapus file lama setelah kolom model dipindah')
+    parser.add_argument('--gc', action='store_true', help='Jalankan garbage collection blob tanpa referensi')
+    parser.add_argument('--gc-grace', type=int, default=None, help='Masa tenggang GC dalam detik (default STORAGE_GC_GRACE)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        static_folder = app.static_folder
+        stats, migrated_sources = migrate(static_folder, dry_run=args.dry_run)
+
+        for name in sorted(stats):
+            if not name.startswith('bytes'):
+                print(f"{name:<28} {stats[name]:>8}")
+        saved = stats['bytes sebelum'] - stats['bytes sesudah']
+        print(f"{'ukuran file lama':<28} {format_bytes(stats['bytes sebelum']):>12}")
+        print(f"{'ukuran di storage':<28} {format_bytes(stats['bytes sesudah']):>12}")
+        print(f"{'ruang dihemat':<28} {format_bytes(saved):>12}"
+              + (f" ({saved / stats['bytes sebelum']:.0%})" if stats['bytes sebelum'] else ''))
+
+        if args.dry_run:
+            return
+
+        corrected = recount_references()
+        if corrected:
+            print(f"ref_count dikoreksi untuk {corrected} blob")
+
+        if args.remove_originals:
+            # Hanya file di UPLOAD_FOLDER; static/modul dan static/videos juga ditampilkan langsung dari folder
+            upload_folder = os.path.realpath(app.config['UPLOAD_FOLDER']) + os.sep
+            removed = kept = 0
+            for source in migrated_sources:
+                if not source.startswith(upload_folder):
+                    kept += 1
+                elif os.path.exists(source):
+                    os.remove(source)
+                    removed += 1
+            print(f"{removed} file lama dihapus" + (f", {kept} file di luar UPLOAD_FOLDER dibiarkan" if kept else ''))
+        elif migrated_sources:
+            print("File lama tidak dihapus; jalankan ulang dengan --remove-originals untuk membebaskan ruang.")
+
+        if args.gc:
+            gc = collect_garbage(args.gc_grace)
+            print(f"GC: {gc['blobs']} blob tanpa referensi, {gc['untracked']} file tak tercatat, "
+                  f"{format_bytes(gc['bytes'])} dibebaskan")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import sys
+import os
+from datetime import timedelta
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.search import prune_search_changes
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Usage: python scripts/prune_search_changes.py [jam]  (jalankan via cron, default 24 jam)
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    with app.app_context():
+        # Index full-text membaca log sejak manifest terakhir; tulis dulu agar tidak ada yang terbuang
+        app.extensions['fulltext_index'].maintain(force_flush=True)
+        deleted = prune_search_changes(timedelta(hours=hours))
+        print(f"search_change: {deleted} baris lama dihapus.")
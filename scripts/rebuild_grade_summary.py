@@ -0,0 +1,17 @@
+import sys
+import os
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.grade_summary import rebuild_grade_summary
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Usage: python scripts/rebuild_grade_summary.py [student_id ...]
+    student_ids = [int(arg) for arg in sys.argv[1:]] or None
+    with app.app_context():
+        written = rebuild_grade_summary(student_ids)
+        print(f"grade_summary rebuilt: {written} baris agregat ditulis.")
@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.forum import recount_forum_posts
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Setelah impor/penghapusan balasan lewat SQL langsung (melewati listener ORM)
+    with app.app_context():
+        corrected = recount_forum_posts()
+        print(f"Penghitung forum dikoreksi untuk {corrected} post.")
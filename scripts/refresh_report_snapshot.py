@@ -0,0 +1,27 @@
+import sys
+import os
+import time
+import argparse
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.utils.reports import refresh_course_snapshot
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Jalankan dari cron, atau dengan --interval sebagai proses latar belakang
+    parser = argparse.ArgumentParser(description='Perbarui snapshot laporan per mata kuliah.')
+    parser.add_argument('--interval', type=int, default=0, help='Ulangi setiap N detik (0 = sekali jalan)')
+    args = parser.parse_args()
+
+    while True:
+        with app.app_context():
+            written = refresh_course_snapshot()
+            db.session.remove()
+        print(f"Snapshot laporan diperbarui: {written} mata kuliah.")
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)